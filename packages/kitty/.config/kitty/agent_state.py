@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Record a Claude / Codex agent's state for the custom tab bar.
+
+Run from the agents' command hooks. The hook payload on stdin names the event
+(`hook_event_name`); the state is written to a per-kitty spool directory keyed by
+KITTY_WINDOW_ID, which tab_bar.py indexes to draw exact markers without
+inspecting processes:
+    python3 ~/.config/kitty/agent_state.py claude
+    python3 ~/.config/kitty/agent_state.py codex
+    python3 ~/.config/kitty/agent_state.py codex error   # event を引数で上書きする
+
+These dotfiles do not install the hooks into any agent's settings; the kitty
+README has the exact Claude and Codex hook entries to add by hand.
+
+Each record carries the agent's pid, found by walking up past the shells and
+interpreters the hook runs under, so that tab_bar.py can drop the state of an
+agent that was killed without a SessionEnd hook.
+
+Outside kitty (no KITTY_WINDOW_ID) it does nothing. It never prints and always
+exits 0 so that it cannot block or alter the hook it runs in.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# tab_bar.py の AGENT_STATE_DIR と同じ場所。kitty の pid ごとに分け、window id の衝突を避ける。
+SPOOL_ROOT = Path(os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()) / f"kitty-agent-state-{os.getuid()}"
+
+# hook event -> 状態。None はファイルを消す (= エージェントが居ない)。
+EVENT_STATES: Dict[str, Optional[str]] = {
+    "SessionStart": "waiting",
+    "UserPromptSubmit": "running",
+    "PreToolUse": "running",
+    "PostToolUse": "running",
+    "PermissionRequest": "approval",
+    "Stop": "waiting",
+    "SubagentStop": "running",
+    "StopFailure": "error",
+    "SessionEnd": None,
+    # 引数で直接指定する場合の別名
+    "running": "running",
+    "waiting": "waiting",
+    "approval": "approval",
+    "error": "error",
+    "end": None,
+}
+
+# hook とエージェント本体の間に挟まるプロセス。これらを飛ばした最初の祖先をエージェントとみなす。
+HOOK_WRAPPERS = {"sh", "bash", "dash", "zsh", "fish", "env", "timeout"}
+
+
+def _read_payload() -> Dict[str, Any]:
+    if sys.stdin is None or sys.stdin.isatty():
+        return {}
+    try:
+        payload = json.loads(sys.stdin.read() or "{}")
+    except Exception:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def _state_for(event: str, payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    """(既知の event か, 状態)。Claude の Notification は種類で承認待ちかどうかが分かれる。"""
+    if event == "Notification":
+        kind = str(payload.get("notification_type") or "")
+        if kind == "permission_prompt":
+            return True, "approval"
+        if kind == "idle_prompt":
+            return True, "waiting"
+        return False, None
+    if event in EVENT_STATES:
+        return True, EVENT_STATES[event]
+    return False, None
+
+
+def _parent_of(pid: int) -> Optional[Tuple[int, str]]:
+    """(親の pid, pid の実行ファイル名)。Linux は /proc、それ以外は ps で引く。"""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8", errors="replace") as handle:
+            stat = handle.read()
+        # comm は空白や括弧を含みうるので、最後の ')' を境に分ける。
+        return int(stat[stat.rindex(")") + 2 :].split()[1]), stat[stat.index("(") + 1 : stat.rindex(")")]
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        out = subprocess.run(
+            ["ps", "-o", "ppid=,comm=", "-p", str(pid)], capture_output=True, text=True, timeout=1
+        ).stdout
+        ppid, comm = out.split(None, 1)
+        return int(ppid), os.path.basename(comm.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def _agent_pid() -> Optional[int]:
+    """hook を起動したエージェントの pid。分からなければ None (tab_bar.py は pid で状態を捨てない)。"""
+    pid = os.getppid()
+    for _ in range(8):
+        info = _parent_of(pid)
+        if info is None:
+            return None
+        ppid, comm = info
+        comm = comm.lstrip("-")
+        if comm not in HOOK_WRAPPERS and not comm.startswith("python"):
+            return pid
+        if ppid <= 1:
+            return None
+        pid = ppid
+    return None
+
+
+def _write(path: Path, record: Dict[str, Any]) -> None:
+    # 同じディレクトリで書いて rename する。読み手が書きかけを見ることはなく、
+    # ディレクトリの mtime が変わるので tab_bar.py は stat 1 回で変化に気づく。
+    fd, tmp = tempfile.mkstemp(prefix=".", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(record, handle)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def main(args: List[str]) -> int:
+    window_id = os.getenv("KITTY_WINDOW_ID", "")
+    kitty_pid = os.getenv("KITTY_PID", "")
+    payload = _read_payload()
+    if not window_id.isdigit() or not kitty_pid.isdigit() or len(args) < 2:
+        return 0
+
+    agent = args[1]
+    event = args[2] if len(args) > 2 else str(payload.get("hook_event_name") or "")
+    known, state = _state_for(event, payload)
+    if not known:
+        return 0
+
+    path = SPOOL_ROOT / kitty_pid / window_id
+    try:
+        if state is None:
+            # unlink でもディレクトリの mtime は変わる。
+            path.unlink(missing_ok=True)
+            return 0
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        record: Dict[str, Any] = {"agent": agent, "state": state, "event": event, "at": time.time()}
+        pid = _agent_pid()
+        if pid is not None:
+            record["pid"] = pid
+        _write(path, record)
+    except Exception:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Print the custom tab bar's instrumentation snapshot.
+
+Run through remote control so the JSON is printed in the calling terminal:
+    kitty @ kitten kittens/tab_bar_stats.py
+    kitty @ kitten kittens/tab_bar_stats.py --reset
+    kitty @ kitten kittens/tab_bar_stats.py --trace ~/tab_bar_trace.jsonl
+    kitty @ kitten kittens/tab_bar_stats.py --no-trace
+"""
+
+import json
+import sys
+from typing import List
+
+TAB_BAR_MODULE = "kitty_custom_tab_bar"
+
+
+def main(args: List[str]) -> str:
+    return ""
+
+
+def handle_result(args: List[str], answer: str, target_window_id: int, boss) -> str:
+    module = sys.modules.get(TAB_BAR_MODULE)
+    if module is None:
+        return "tab_bar.py is not loaded (tab_bar_style custom?)"
+
+    options = args[1:]
+    if "--trace" in options:
+        position = options.index("--trace")
+        path = options[position + 1] if position + 1 < len(options) else ""
+        module.stats.set_trace(path or None)
+    if "--no-trace" in options:
+        module.stats.set_trace(None)
+
+    snapshot = module.stats_snapshot()
+    if "--reset" in options:
+        module.stats.reset()
+    return json.dumps(snapshot, indent=2, ensure_ascii=False)
+
+
+handle_result.no_ui = True
@@ -3,20 +3,74 @@
 
 from __future__ import annotations
 
+import asyncio
+import bisect
+import concurrent.futures
+import ctypes
+import ctypes.util
+import fcntl
+import importlib.util
+import itertools
 import json
 import os
 import queue
+import re
+import signal
+import struct
 import subprocess
+import sys
+import tempfile
 import threading
 import time
+import weakref
+from collections import OrderedDict, deque
 from pathlib import Path
 from typing import Any
 
-from kitty.fast_data_types import Screen, add_timer, get_boss, get_options, wcswidth
+from kitty.fast_data_types import (
+    Screen,
+    add_timer,
+    current_focused_os_window_id,
+    get_boss,
+    get_options,
+    remove_timer,
+)
 from kitty.rgb import to_color
 from kitty.tab_bar import DrawData, ExtraData, TabAccessor, TabBarData
 from kitty.utils import color_as_int
 
+# tab_bar_watcher.py など、別ファイルとして読み込まれる kitty 拡張からこのモジュールの状態に
+# 触れるための登録名。kitty は tab_bar.py を runpy で読むため、通常の import では参照できない。
+TAB_BAR_MODULE = "kitty_custom_tab_bar"
+if __name__ in sys.modules:
+    # 設定の再読み込み (や kitty が tab_bar.py を読み直すたび) に新しいモジュールができる。
+    # 前のモジュールの thread / timer / inotify fd を片付けてから登録し直す。
+    _previous = sys.modules.get(TAB_BAR_MODULE)
+    if _previous is not None and _previous is not sys.modules[__name__]:
+        try:
+            _previous._shutdown()
+        except Exception:
+            pass
+    sys.modules[TAB_BAR_MODULE] = sys.modules[__name__]
+
+
+def _load_sibling(name: str) -> Any:
+    """tab_bar.py と同じディレクトリにあるモジュールを読む。
+
+    kitty の設定ディレクトリは sys.path に無く、設定の再読み込みでは tab_bar.py ごと読み直すので、
+    sys.modules に残っている前回のものは使い回さず、毎回読み直して置き換える。
+    """
+    spec = importlib.util.spec_from_file_location(name, Path(__file__).with_name(f"{name}.py"))
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+tab_bar_git = _load_sibling("tab_bar_git")
+tab_bar_text = _load_sibling("tab_bar_text")
+
 try:
     opts = get_options()
 except Exception:
@@ -65,19 +119,129 @@ OK_COLOR = _color("#a6da95", GREEN)
 ERR_COLOR = _color("#ed8796", RED)
 DIM_COLOR = _color("#7f849c", DIM)
 
-REFRESH_TIME = 1.0
+# worker の結果待ちがある間だけ回す one-shot timer の間隔。待ちが無ければ timer は張らない。
+RESULT_POLL_INTERVAL = 0.1
+# 監視イベントを読む最小間隔 (PollingWatcher は 1 回で監視対象を全部 stat する)。
+# kitty の timer には fd の読み取り待ちが無いので、監視中の repo がある間は one-shot timer で読みに起きる。
+# 変化の無い読み取りが続くたびに間隔を倍にし、WATCH_POLL_MAX_INTERVAL で頭打ちにする。変化があれば最小間隔に戻す。
+WATCH_POLL_INTERVAL = 1.0
+WATCH_POLL_MAX_INTERVAL = 16.0
+# 計測ヒストグラムのバケット上限 (μs) と、JSONL trace の出力先を指定する環境変数。
+STATS_BUCKETS_US = (50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+TRACE_ENV = "KITTY_TAB_BAR_TRACE"
+# TabAccessor 経由の cwd / exe (= /proc 読み) を使い回す時間。タイトル変化や watcher の通知で即座に捨てる。
+TAB_META_TTL = 5.0
+# cwd -> repo の解決結果を再検証なしで使い回す時間と、キャッシュするディレクトリ数の上限。
+RESOLVE_TTL = 5.0
+RESOLVE_CACHE_SIZE = 512
+# repo status を取り直すまでの初期間隔。失敗した repo は ERROR_TTL 後に取り直す。
 REPO_TTL = 45.0
 ERROR_TTL = 15.0
+# repo ごとの再取得間隔は、取り直して表示が変わったら REFRESH_SPEEDUP 倍、変わらなければ REFRESH_SLOWDOWN 倍にし、
+# REFRESH_MIN_INTERVAL..REFRESH_MAX_INTERVAL に収める。よく変わる repo ほど早く、放置された repo ほど遅く取り直す。
+REFRESH_MIN_INTERVAL = 10.0
+REFRESH_MAX_INTERVAL = 900.0
+REFRESH_SPEEDUP = 0.5
+REFRESH_SLOWDOWN = 1.5
+# focus の移動やコマンドの終了で即座に取り直すとき、直前の取得からこの秒数未満なら取り直さない。
+FOCUS_REFRESH_MIN_AGE = 2.0
+# worker に積んだ要求の結果がこの秒数で届かなければ、worker が止まったとみなして積み直せるようにする。
+IN_FLIGHT_DEADLINE = 30.0
+# repo status を取得する常駐 worker の数と、git/gh 子プロセスの同時実行上限。
+# タブを素早く切り替えても fork が積み上がらないよう、どちらも固定値で抑える。
+# 子プロセスは ProcessSupervisor の asyncio ループ 1 本がまとめて起動・回収する。
+WORKER_COUNT = 2
+# 1 件の処理から IN_FLIGHT_DEADLINE を過ぎても戻らない worker は止まったとみなし、代わりを起こす。
+# 止まった thread は殺せないので、代わりはこの本数までに抑える。
+WORKER_SPARE_LIMIT = 2
+MAX_CHILD_PROCESSES = 3
+PRIORITY_ACTIVE = 0
+PRIORITY_VISIBLE = 1
+PRIORITY_BACKGROUND = 2
+# repo status を取りに行く範囲。"active": アクティブタブの repo のみ、
+# "all": 全タブの repo も背景で取得し、中央タブに dirty / PR の印を付ける。
+REPO_STATUS_SCOPE = "active"
+# "all" のとき、TAB_REPO_INTERVAL 秒ごとに新たに要求する repo の数の上限。
+TAB_REPO_INTERVAL = 1.0
+TAB_REPO_REQUESTS_PER_CYCLE = 2
+# 1 分あたりに起動する git/gh の上限。アクティブな repo の分も含めて MAX_SPAWNS_PER_MINUTE 回、
+# そのうちアクティブでない repo と CI の一括取得のための起動は BACKGROUND_SPAWNS_PER_MINUTE 回まで。
+# 枠を使い切った repo は失敗扱いにせず、枠が空く時刻まで要求を保留する。
+MAX_SPAWNS_PER_MINUTE = 30
+BACKGROUND_SPAWNS_PER_MINUTE = 12
+# repository ごとの open な PR 一覧を取り直す間隔と、1 回で取る件数。
+# 一覧に無い branch は merge / close 済みの PR を branch 単位で引き、PR_LOOKUP_TTL の間使い回す。
+PR_INDEX_TTL = REPO_TTL
+PR_INDEX_LIMIT = 200
+PR_LOOKUP_TTL = REFRESH_MAX_INTERVAL
+# gh が offline / 認証切れ / rate limit で失敗したら、全 repo 共通で gh を止める時間。
+# 連続失敗のたびに倍にし、GH_BACKOFF_MAX で頭打ちにする。
+GH_BACKOFF_BASE = 30.0
+GH_BACKOFF_MAX = 600.0
+GH_AUTH_EXIT = 4
+GH_RATE_LIMIT_ERRORS = ("rate limit", "abuse detection")
+GH_AUTH_ERRORS = ("gh auth login", "bad credentials", "http 401", "authentication required")
+GH_OFFLINE_ERRORS = (
+    "could not resolve host",
+    "no such host",
+    "network is unreachable",
+    "connection refused",
+    "connection reset",
+    "i/o timeout",
+    "tls handshake timeout",
+    "error connecting to",
+)
+OPEN_PR_STATES = {"open", "draft"}
+# 全タブの open な PR の CI / review 状態を、host ごとに 1 回の gh api graphql でまとめて取る間隔。
+# 実行中 (pending) の check があれば短い間隔で取り直す。1 回の query に載せる (repo, branch) の上限。
+CHECKS_INTERVAL = 60.0
+CHECKS_PENDING_INTERVAL = 20.0
+CHECKS_BATCH_LIMIT = 50
+# ProcessSupervisor の group。タブを切り替えても打ち切らない。
+CHECKS_GROUP = "checks"
+# gh が優先する remote の順 (それ以外の remote はこの後)。
+GH_REMOTE_ORDER = ("upstream", "github", "origin")
+GITHUB_REMOTE_RE = re.compile(r"^(?:[\w.+-]+://)?(?:[^@/]+@)?([^/:]+)(?::\d+)?[:/]+([^/]+)/([^/]+?)(?:\.git)?/?$")
+CHECK_STATES = {"SUCCESS": "success", "FAILURE": "failure", "ERROR": "failure", "PENDING": "pending", "EXPECTED": "pending"}
+REVIEW_STATES = {"APPROVED": "approved", "CHANGES_REQUESTED": "changes", "REVIEW_REQUIRED": "review"}
+# repo status を kitty プロセス間で共有する永続キャッシュ。起動直後から前回の結果を表示できる。
+CACHE_FILE = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "kitty" / "tab_bar_repo_status.json"
+CACHE_VERSION = 1
+CACHE_WRITE_INTERVAL = 5.0
+CACHE_MAX_REPOS = 256
+# メモリ上の repo_cache も同じ件数までの LRU にし、最後に表示してから REPO_CACHE_MAX_AGE 秒で捨てる。
+REPO_CACHE_SIZE = CACHE_MAX_REPOS
+REPO_CACHE_MAX_AGE = 3 * 24 * 3600.0
+PERSISTED_FIELDS = ("branch", "dirty", "ahead", "behind", "pr_number", "pr_state", "checks", "review", "updated_at", "error_at")
+# HEAD / index / refs を監視できている repo は、変化の通知で invalidate する。
+# worktree 内のファイル編集や remote 側の PR 更新は通知されないため、取り直す間隔は監視の有無に依らず
+# REPO_TTL から始める。通知は次の取り直しを早めるだけで、間隔を延ばす理由にはしない。
+MAX_WATCHED_REPOS = 64
+WATCH_DIRS_PER_REPO = 64
+WATCHED_GIT_FILES = {"HEAD", "index", "packed-refs", "FETCH_HEAD", "ORIG_HEAD"}
 MAX_LENGTH_PATH = 3
+# Claude / Codex の hook が agent_state.py で書くエージェント状態の置き場 (kitty の pid ごと、window id 毎に 1 ファイル)。
+# agent_state.py の SPOOL_ROOT と揃えること。
+AGENT_STATE_DIR = (
+    Path(os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()) / f"kitty-agent-state-{os.getuid()}" / str(os.getpid())
+)
+# 置き場は repo と同じ watcher で監視する。repo key (パス) と衝突しない監視用の key。
+AGENT_WATCH_KEY = "<agent-state>"
+# 1 つのタブに複数のエージェントが居るときは、優先度の高い (= 数値の小さい) 状態を出す。
+AGENT_STATE_PRIORITY = {"error": 0, "approval": 1, "running": 2, "waiting": 3}
 # 中央タブを省略表示する際、タブ名は先頭 NAME_ABBREV 桁までに切り詰める。
 # AI エージェントのマーカー (index + claude/codex アイコン) は icon 側に置くため常に残る。
 NAME_ABBREV = 10
-# cell.draw / cell.length に「クリップ不要」を伝えるための十分大きな値
-FULL_SIZE = 10_000
+# 省略時の配分方法。"uniform": 全タブ一律に k 桁、"fair": 短い name は残して長い name だけ詰める。
+CENTER_LAYOUT_MODE = "uniform"
+# icon のみでも全タブが入らないとき、アクティブタブ周辺だけを描き、左右に隠れた数を出す。
+OVERFLOW_LEFT = "‹"
+OVERFLOW_RIGHT = "›"
 
 FOLDER_ICON = " "
 BRANCH_ICON = " "
 PR_ICON = " "
+PR_BADGE = PR_ICON.strip()
 CLOCK_ICON = "󰥔 "
 CODEX_ICON = ""
 CLAUDE_ICON = "󰋦"
@@ -86,8 +250,13 @@ DOT_IDLE = "·"
 DOT_WAITING = "?"
 DOT_RUNNING = "󰐊"
 DOT_ERROR = "󰅚"
+DOT_APPROVAL = "!"
 DIRTY_ICON = "✎"
+AHEAD_ICON = "↑"
+BEHIND_ICON = "↓"
 LOADING_ICON = "…"
+CHECK_ICONS = {"success": "✓", "failure": "✗", "pending": "●"}
+CHECK_NONE_ICON = "○"
 
 GENERIC_TITLES = {
     "",
@@ -105,58 +274,462 @@ GENERIC_TITLES = {
 }
 
 RepoStatus = dict[str, Any]
-repo_cache: dict[str, RepoStatus] = {}
-in_flight: set[str] = set()
+PrInfo = dict[str, Any]
+# 表示に使った順 (LRU)。先頭ほど長く使われていない。
+repo_cache: OrderedDict[str, RepoStatus] = OrderedDict()
+# repo key -> 結果を待つ期限
+in_flight: dict[str, float] = {}
 result_queue: queue.Queue[tuple[str, RepoStatus]] = queue.Queue()
+# (priority, -seq, key, repo, git_dir)。同一 priority では新しい要求を先に処理する。
+work_queue: queue.PriorityQueue[tuple[int, int, str, Path, Path]] = queue.PriorityQueue()
+work_seq = itertools.count()
+workers: list[threading.Thread] = []
+# thread ident -> 今の要求を処理し始めた時刻 (monotonic)。処理中でない worker は載らない。
+worker_started: dict[int, float] = {}
+workers_lock = threading.Lock()
+# _shutdown() 済みか。新しいモジュールに置き換えられた後も kitty が古い draw_tab を呼ぶことがあるので、そちらへ転送する。
+retired = False
+# 現在アクティブなタブの repo key。これと異なる要求は worker 側で破棄する。
+active_repo_key = ""
+# active_repo_key の共通 git dir。linked worktree 間で共有する PR 表などはこちらをキーにする。
+active_common_key = ""
+# REPO_STATUS_SCOPE == "all" で追跡中の他タブの repo key と共通 git dir。worker はこれらも破棄しない。
+tracked_keys: set[str] = set()
+tab_repos_scheduled_at = 0.0
+tab_repos_backlog = False
+# kitty の OS window のいずれかに focus があるか。無い間は取得済みの repo を取り直さない。
+app_focused = True
+watcher: "InotifyWatcher | PollingWatcher | None" = None
+watched_repos: OrderedDict[str, None] = OrderedDict()
+# cwd -> (checked_at, 親方向の mtime, (repo root, git_dir) | None)
+repo_resolution: dict[str, tuple[float, tuple[int, ...] | None, tuple[Path, Path] | None]] = {}
+# repo key -> (git_dir, HEAD の mtime_ns, branch)
+head_cache: dict[str, tuple[Path, int, str | None]] = {}
+# 共通 git dir -> (fetched_at, branch -> PR)。worker が丸ごと差し替え、描画側は読むだけ。
+pr_indexes: dict[str, tuple[float, dict[str, PrInfo]]] = {}
+# 同じ repository の PR 表を複数 worker が同時に取りに行かないための repository 単位の lock。
+# 誰も握っていない (参照していない) lock は自然に消えるので、明示的に捨てない。
+pr_index_locks: weakref.WeakValueDictionary[str, threading.Lock] = weakref.WeakValueDictionary()
+# pr_index_locks の取り出しと作成を 1 本にまとめる。WeakValueDictionary.setdefault は原子的ではない。
+pr_index_locks_guard = threading.Lock()
+# (共通 git dir, branch) -> (looked_up_at, merge / close 済みの PR | None)。open な PR の一覧に無い branch の照会結果。
+pr_lookups: dict[tuple[str, str], tuple[float, PrInfo | None]] = {}
+# 共通 git dir -> (host, owner, name) | None。GitHub 上の repository が分からなければ None。
+github_remotes: dict[str, tuple[str, str, str] | None] = {}
+# CI / review の一括取得。checks_fetching の間は結果待ちの poll を回し、届いたら checks_changed が立つ。
+checks_scheduled_at = 0.0
+checks_scanned_at = 0.0
+checks_fetching = False
+checks_changed = False
+checks_pending = False
+# 最後に描画へ反映した gh_breaker の開閉 (= PR を古いものとして薄く表示するか)。
+pr_stale_shown = False
+cache_mtime_ns = 0
+cache_pending = False
+cache_written_at = 0.0
 
 tab_snapshots: list["TabSnapshot"] = []
-# for_layout パスで収集した全タブ。real パスの先頭で tab_snapshots に流し込む。
+# for_layout パスで収集した全タブ。real パスの先頭で tab_snapshots と入れ替える。
 layout_snapshots: list["TabSnapshot"] = []
+# layout_snapshots を詰め直したレイアウトパスの後、まだ入れ替えていないか。
+# レイアウトパスを挟まずに実描画パスが続いたら、古いリストへ戻さず tab_snapshots をそのまま使う。
+layout_ready = False
+# tab_id -> TabSnapshot。描画のたびに作り直さず、入力が変わった項目だけ差し替える。
+tab_records: dict[int, "TabSnapshot"] = {}
+# いずれかの TabSnapshot の中身、またはタブの並びが変わるたびに進める。
+tabs_version = 0
 # 中央タブごとの描画セル範囲 (1-based index -> (start_col, end_col))。
 # kitty のクリック判定 (tab_id_at) 用に draw_tab がこの範囲を返す。
 center_tab_ranges: dict[int, tuple[int, int] | None] = {}
 active_index = 0
-timer_id = None
-clock_minute = ""
+clock_timer_id: int | None = None
+poll_timer_id: int | None = None
+poll_due_at = 0.0
+watch_polled_at = 0.0
+# 次に監視イベントを読むまでの間隔。変化の無い読み取りが続くと WATCH_POLL_MAX_INTERVAL まで延びる。
+watch_interval = WATCH_POLL_INTERVAL
+last_layout: "BarLayout | None" = None
+# tab_id -> (fetched_at, title, cwd, exe, oldest_exe, window ids)
+tab_meta: dict[int, tuple[float, str, Path | None, str, str, tuple[int, ...]]] = {}
+# kitty window id -> (agent, state)。AGENT_STATE_DIR の中身を、ディレクトリの mtime が変わったときだけ読み直す。
+agent_states: dict[int, tuple[str, str]] = {}
+# kitty window id -> 状態を書いたエージェントの pid。SessionEnd を出さずに kill されたエージェントの状態を捨てるのに使う。
+agent_pids: dict[int, int] = {}
+agent_state_mtime_ns = 0
+# AGENT_STATE_DIR を watcher に登録済みか。置き場ごと消されたら戻し、次のレイアウトパスで張り直す。
+agent_watched = False
+
+
+class Histogram:
+    """固定バケット (μs) の度数分布。分位点はバケット上限で近似する。"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.buckets = [0] * (len(STATS_BUCKETS_US) + 1)
+
+    def observe(self, value_us: float) -> None:
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+        self.buckets[bisect.bisect_left(STATS_BUCKETS_US, value_us)] += 1
+
+    def _quantile(self, fraction: float) -> float:
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(STATS_BUCKETS_US[i], round(self.max_us, 1)) if i < len(STATS_BUCKETS_US) else round(self.max_us, 1)
+        return self.max_us
+
+    def summary(self) -> dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_us / self.count, 1),
+            "p50_us": self._quantile(0.50),
+            "p90_us": self._quantile(0.90),
+            "p99_us": self._quantile(0.99),
+            "max_us": round(self.max_us, 1),
+        }
+
+
+class Stats:
+    """描画パスと worker の軽量な計測値。kittens/tab_bar_stats.py が snapshot を読む。
+
+    KITTY_TAB_BAR_TRACE (または kitten の --trace) にパスを渡すと、各観測値を JSONL でも書き出す。
+    """
+
+    def __init__(self, trace_path: str | None) -> None:
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self.trace = None
+        self.set_trace(trace_path)
+
+    def set_trace(self, path: str | None) -> None:
+        with self.lock:
+            if self.trace is not None:
+                self.trace.close()
+                self.trace = None
+            if path:
+                try:
+                    self.trace = open(os.path.expanduser(path), "a", encoding="utf-8", buffering=1)
+                except Exception:
+                    self.trace = None
+
+    def _emit(self, event: str, value: float) -> None:
+        if self.trace is not None:
+            self.trace.write(json.dumps({"t": round(time.time(), 6), "event": event, "value": value}) + "\n")
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self._emit(name, value)
+
+    def adjust(self, name: str, delta: int) -> None:
+        with self.lock:
+            self.gauges[name] = self.gauges.get(name, 0) + delta
+
+    def observe(self, name: str, seconds: float) -> None:
+        value_us = seconds * 1_000_000
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value_us)
+            self._emit(name, round(value_us, 1))
+
+    def reset(self) -> None:
+        with self.lock:
+            self.started_at = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "histograms": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "trace": getattr(self.trace, "name", None),
+            }
+
+
+stats = Stats(os.getenv(TRACE_ENV))
 
 
 class TabSnapshot:
-    def __init__(
+    """tab_id ごとに 1 つだけ作り、描画のたびに update() で中身を差し替える。
+
+    タブの中央セル (cell) も抱えておき、index / marker / name が変わったときだけ更新する。
+    """
+
+    __slots__ = (
+        "tab_id",
+        "index",
+        "tab",
+        "is_active",
+        "needs_attention",
+        "has_activity",
+        "title",
+        "session_name",
+        "cwd",
+        "exe",
+        "oldest_exe",
+        "agent",
+        "name",
+        "marker",
+        "badge",
+        "cell",
+    )
+
+    def __init__(self, tab_id: int) -> None:
+        self.tab_id = tab_id
+        self.index = 0
+        self.tab: TabBarData | None = None
+        self.is_active = False
+        self.needs_attention = False
+        self.has_activity = False
+        self.title = ""
+        self.session_name = ""
+        self.cwd: Path | None = None
+        self.exe = ""
+        self.oldest_exe = ""
+        # hook から通知された (agent, state)。無ければ title / exe から推測する。
+        self.agent: tuple[str, str] | None = None
+        self.name = ""
+        self.marker = ""
+        self.badge = ""
+        self.cell = Cell("", None)
+
+    def update(
         self,
         index: int,
         tab: TabBarData,
         cwd: Path | None,
         exe: str,
         oldest_exe: str,
-    ) -> None:
-        self.index = index
+        agent: tuple[str, str] | None = None,
+        badge: str = "",
+    ) -> bool:
+        """入力が前回と同じなら何も作らずに False を返す。"""
         self.tab = tab
-        self.tab_id = tab.tab_id
+        title = str(tab.title or "")
+        session_name = tab.session_name or "none"
+        if (
+            index == self.index
+            and tab.is_active == self.is_active
+            and tab.needs_attention == self.needs_attention
+            and tab.has_activity_since_last_focus == self.has_activity
+            and title == self.title
+            and session_name == self.session_name
+            and exe == self.exe
+            and oldest_exe == self.oldest_exe
+            and agent == self.agent
+            and badge == self.badge
+            and (cwd is self.cwd or cwd == self.cwd)
+        ):
+            return False
+        self.index = index
         self.is_active = tab.is_active
         self.needs_attention = tab.needs_attention
         self.has_activity = tab.has_activity_since_last_focus
-        self.title = str(tab.title or "")
-        self.session_name = tab.session_name or "none"
+        self.title = title
+        self.session_name = session_name
         self.cwd = cwd
         self.exe = exe
         self.oldest_exe = oldest_exe
+        self.agent = agent
+        self.badge = badge
         self.name = _tab_name(self)
         self.marker = _agent_marker(self)
+        # index と AI マーカー (と repo の印) は icon (常時描画される chip) に入れ、省略対象の name のみ text にする。
+        self.cell.update(f"{index} {self.marker}{badge}", self.name, ACTIVE_TAB if self.is_active else INACTIVE_TAB)
+        return True
 
 
 class RepoSnapshot:
-    def __init__(self, root: Path, git_dir: Path, branch: str | None, cached: RepoStatus) -> None:
+    """アクティブタブの repo 表示用。描画ごとに作らず repo_record を update() で使い回す。"""
+
+    __slots__ = (
+        "root",
+        "git_dir",
+        "key",
+        "branch",
+        "dirty",
+        "ahead",
+        "behind",
+        "pr_number",
+        "pr_state",
+        "checks",
+        "review",
+        "pr_stale",
+        "loading",
+    )
+
+    def __init__(self) -> None:
+        self.root = Path()
+        self.git_dir = Path()
+        self.key = ""
+        self.branch = ""
+        self.dirty = False
+        self.ahead = 0
+        self.behind = 0
+        self.pr_number: int | None = None
+        self.pr_state = "open"
+        # PR の CI の集計 ("success" / "failure" / "pending") と review の判定 ("approved" / "changes" / "review")。
+        self.checks: str | None = None
+        self.review: str | None = None
+        # gh_breaker が開いている間は、取得済みの PR を古いものとして薄く表示する。
+        self.pr_stale = False
+        self.loading = False
+
+    def update(self, root: Path, git_dir: Path, branch: str | None, cached: RepoStatus) -> None:
         self.root = root
         self.git_dir = git_dir
         self.key = str(root)
-        self.branch = str(cached.get("branch") or branch or "")
+        self.branch = str(branch or cached.get("branch") or "")
         self.dirty = bool(cached.get("dirty"))
+        self.ahead = int(cached.get("ahead") or 0)
+        self.behind = int(cached.get("behind") or 0)
         self.pr_number = cached.get("pr_number")
         self.pr_state = str(cached.get("pr_state") or "open")
+        self.checks = cached.get("checks")
+        self.review = cached.get("review")
+        self.pr_stale = gh_breaker.is_open()
         self.loading = bool(cached.get("loading"))
 
 
+repo_record = RepoSnapshot()
+
+
+class RenderList:
+    """1 フレーム分の (fg, bg, bold, text) の run 列。Cell.draw はここに積み、_flush_runs がまとめて screen に書く。
+
+    見た目が同じ隣接 run は 1 つに繋げる。空白だけの run は bg さえ同じなら fg / bold を問わず繋げる。
+    exact では中央タブの境界 (mark) と列揃えの空白 (pad_to) で run を切る。kitty の文字幅が tab_bar_text.text_width と
+    食い違ったときに、実際の cursor.x で範囲と空白を合わせ直すためのもの。
+    """
+
+    __slots__ = ("runs", "x", "exact", "sealed")
+
+    def __init__(self, exact: bool = False) -> None:
+        # run は [fg, bg, bold, text, 積み終えたときの x, 列揃えの空白か]。
+        self.runs: list[list[Any]] = []
+        # 積んだ文字列の総幅 (= 描き終えたときの cursor.x)。
+        self.x = 0
+        self.exact = exact
+        # True なら次の put は直前の run に繋げない。
+        self.sealed = False
+
+    def put(self, fg: int, bg: int, bold: bool, text: str) -> None:
+        if not text:
+            return
+        self.x += tab_bar_text.text_width(text)
+        if self.runs and not self.sealed:
+            last = self.runs[-1]
+            if last[1] == bg:
+                if (last[0] == fg and last[2] == bold) or not text.strip(" "):
+                    last[3] += text
+                    last[4] = self.x
+                    return
+                if not last[3].strip(" "):
+                    last[0] = fg
+                    last[2] = bold
+                    last[3] += text
+                    last[4] = self.x
+                    return
+        self.sealed = False
+        self.runs.append([fg, bg, bold, text, self.x, False])
+
+    def pad(self, width: int) -> None:
+        if width > 0:
+            self.put(FG, BAR_BG, False, " " * width)
+
+    def pad_to(self, column: int) -> None:
+        """column まで空白で埋める。exact では独立した run にし、描くときに実際の cursor.x から幅を決め直す。"""
+        if not self.exact:
+            self.pad(column - self.x)
+            return
+        width = max(0, column - self.x)
+        self.x += width
+        self.runs.append([FG, BAR_BG, False, " " * width, self.x, True])
+        self.sealed = True
+
+    def mark(self) -> int:
+        """中央タブの境界の x。exact では次の run を新しく始め、境界が必ず run の終端に来るようにする。"""
+        if self.exact:
+            self.sealed = True
+        return self.x
+
+
+def _flush_runs(screen: Screen, runs: list[list[Any]]) -> bool:
+    """run 列を描く。cursor の属性は前の run から変わるものだけを設定する。
+
+    どの run の後でも cursor.x が積んだときの x と一致した (= kitty と文字幅が食い違わなかった) かを返す。
+    """
+    cursor = screen.cursor
+    cursor.dim = False
+    cursor.italic = False
+    fg = bg = bold = None
+    aligned = True
+    for run_fg, run_bg, run_bold, text, end, _ in runs:
+        if run_bg != bg:
+            cursor.bg = bg = run_bg
+        if run_fg != fg:
+            cursor.fg = fg = run_fg
+        if run_bold != bold:
+            cursor.bold = bold = run_bold
+        if text:
+            screen.draw(text)
+        if cursor.x != end:
+            aligned = False
+    return aligned
+
+
+def _align_runs(screen: Screen, runs: list[list[Any]]) -> dict[int, int]:
+    """exact な run 列を描き、列揃えの空白を実際の cursor.x に合わせて書き換える。
+
+    積んだときの run 終端の x -> 実際の cursor.x を返す。書き換えた run 列は、以後そのまま _flush_runs で描ける。
+    """
+    cursor = screen.cursor
+    cursor.dim = False
+    cursor.italic = False
+    actual = {0: 0}
+    for run in runs:
+        cursor.bg = run[1]
+        cursor.fg = run[0]
+        cursor.bold = run[2]
+        if run[5]:
+            run[3] = " " * max(0, run[4] - cursor.x)
+        if run[3]:
+            screen.draw(run[3])
+        actual[run[4]] = cursor.x
+    return actual
+
+
 class Cell:
+    __slots__ = (
+        "icon",
+        "text",
+        "bg",
+        "fg",
+        "color",
+        "separator",
+        "border",
+        "text_length_overhead",
+        "icon_length",
+        "fitted",
+    )
+
     def __init__(
         self,
         icon: str,
@@ -167,103 +740,210 @@ class Cell:
         separator: str = "",
         border: tuple[str, str] = ("", ""),
     ) -> None:
-        self.icon = icon
-        self.text = text
         self.bg = bg
         self.fg = fg
-        self.color = color
         self.separator = separator
         self.border = border
-        self.text_length_overhead = wcswidth(self.border[0] + self.border[1] + self.separator + self.icon) + 1
+        self.icon = ""
+        self.text: str | None = None
+        self.color = color
+        self.text_length_overhead = 0
+        self.icon_length = 0
+        # (max_size, 描画する " {text}")。同じ幅で描き直すときは文字列を作り直さない。
+        self.fitted: tuple[int, str] = (-1, "")
+        self.update(icon, text, color)
+
+    def update(self, icon: str, text: str | None, color: int) -> None:
+        """icon が変わったときだけ幅を測り直し、text か幅が変わったときだけ描画文字列を捨てる。"""
+        if icon != self.icon or not self.text_length_overhead:
+            self.icon = icon
+            overhead = tab_bar_text.text_width(self.border[0] + self.border[1] + self.separator + icon) + 1
+            if overhead != self.text_length_overhead:
+                # text に使える幅が変わるので、同じ max_size でも切り詰め方が変わる。
+                self.text_length_overhead = overhead
+                self.fitted = (-1, "")
+            self.icon_length = tab_bar_text.text_width(icon + self.border[0] + self.border[1])
+        if text != self.text:
+            self.text = text
+            self.fitted = (-1, "")
+        self.color = color
 
     def _fit_text(self, max_size: int) -> str | None:
         if self.text is None:
             return None
         if max_size <= 0:
             return ""
-        return _clip_end(self.text, max_size)
-
-    def draw(self, screen: Screen, max_size: int) -> None:
-        text = self._fit_text(max_size - self.text_length_overhead)
-        if text is None:
-            return
+        # 1 文字も入らないなら text を捨てて icon だけ残す。
+        return tab_bar_text.clip_end(self.text, max_size) or ""
 
-        screen.cursor.dim = False
-        screen.cursor.bold = False
-        screen.cursor.italic = False
-        screen.cursor.bg = BAR_BG
-        screen.cursor.fg = self.color
-        screen.draw(self.border[0])
+    def text_cells(self, max_size: int) -> int | None:
+        """_fit_text(max_size) の描画幅を文字列を作らずに求める。icon のみになる場合は None。"""
+        if not self.text or max_size <= 0:
+            return None
+        metrics = tab_bar_text.text_metrics(self.text)
+        if metrics.width <= max_size:
+            return metrics.width
+        count = bisect.bisect_right(metrics.prefix, max_size - 1) - 1
+        return metrics.prefix[count] + 1 if count else None
 
-        screen.cursor.bg = self.color
-        screen.cursor.fg = BG
-        screen.cursor.bold = True
-        screen.draw(self.icon)
-        screen.cursor.bold = False
+    def draw(self, out: RenderList, max_size: int) -> None:
+        if self.text is None:
+            return
+        if self.fitted[0] != max_size:
+            text = self._fit_text(max_size - self.text_length_overhead)
+            self.fitted = (max_size, f" {text}" if text else "")
+        text = self.fitted[1]
 
+        out.put(self.color, BAR_BG, False, self.border[0])
+        out.put(BG, self.color, True, self.icon)
         if text == "":
-            screen.cursor.bg = BAR_BG
-            screen.cursor.fg = self.color
-            screen.draw(self.border[1])
+            out.put(self.color, BAR_BG, False, self.border[1])
             return
-
-        screen.cursor.bg = self.bg
-        screen.cursor.fg = self.color
-        screen.draw(self.separator)
-        screen.cursor.fg = self.fg
-        screen.draw(f" {text}")
-        screen.cursor.fg = self.bg
-        screen.cursor.bg = BAR_BG
-        screen.draw(self.border[1])
+        out.put(self.color, self.bg, False, self.separator)
+        out.put(self.fg, self.bg, False, text)
+        out.put(self.bg, BAR_BG, False, self.border[1])
 
     def length(self, max_size: int) -> int:
-        text = self._fit_text(max_size - self.text_length_overhead)
-        if text is None:
+        if self.text is None:
             return 0
-        if text == "":
-            return wcswidth(self.icon + self.border[0] + self.border[1])
-        return wcswidth(text) + self.text_length_overhead
+        width = self.text_cells(max_size - self.text_length_overhead)
+        return self.icon_length if width is None else width + self.text_length_overhead
 
 
-def _clip_end(text: str, max_size: int) -> str | None:
-    if max_size < 1:
-        return None
-    if wcswidth(text) <= max_size:
-        return text
-    out = ""
-    used = 0
-    for ch in text:
-        width = max(0, wcswidth(ch))
-        if used + width + 1 > max_size:
-            break
-        out += ch
-        used += width
-    return out + "…" if out else None
+def invalidate_tab_meta(tab_id: int | None = None) -> None:
+    """tab_bar_watcher.py から呼ばれる。tab_id を省略すると全タブ分を捨てる。"""
+    if tab_id is None:
+        tab_meta.clear()
+    else:
+        tab_meta.pop(tab_id, None)
 
 
-def _clip_middle(text: str, max_size: int) -> str | None:
-    if max_size < 1:
-        return None
-    if wcswidth(text) <= max_size:
-        return text
-    if max_size <= 3:
-        return _clip_end(text, max_size)
-    left_size = max(1, (max_size - 1) // 2)
-    right_size = max(1, max_size - 1 - left_size)
-    left = _clip_end(text, left_size)
-    if left is None:
-        return None
-    if left.endswith("…"):
-        left = left[:-1]
-    right = ""
-    used = 0
-    for ch in reversed(text):
-        width = max(0, wcswidth(ch))
-        if used + width > right_size:
-            break
-        right = ch + right
-        used += width
-    return f"{left}…{right}" if right else _clip_end(text, max_size)
+def _cached_tab_meta(tab: TabBarData) -> tuple[Path | None, str, str, tuple[int, ...]]:
+    title = str(tab.title or "")
+    now = time.time()
+    cached = tab_meta.get(tab.tab_id)
+    if cached is not None and cached[1] == title and now - cached[0] < TAB_META_TTL:
+        return cached[2], cached[3], cached[4], cached[5]
+    cwd, exe, oldest_exe = _tab_accessor_snapshot(tab)
+    window_ids = _tab_window_ids(tab.tab_id)
+    tab_meta[tab.tab_id] = (now, title, cwd, exe, oldest_exe, window_ids)
+    return cwd, exe, oldest_exe, window_ids
+
+
+def _tab_window_ids(tab_id: int) -> tuple[int, ...]:
+    """agent_states を引くための、タブ内の kitty window id。watcher が focus 変化で tab_meta ごと捨てる。"""
+    try:
+        tab = get_boss().tab_for_id(tab_id)
+        return tuple(window.id for window in tab) if tab is not None else ()
+    except Exception:
+        return ()
+
+
+def _watch_agent_states() -> None:
+    """AGENT_STATE_DIR を作って watcher に載せる。以後の変化は _drain_watch_events が拾う。"""
+    global agent_watched
+    if agent_watched:
+        return
+    agent_watched = True
+    try:
+        AGENT_STATE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _ensure_watcher().watch_dir(AGENT_WATCH_KEY, AGENT_STATE_DIR)
+    except Exception:
+        pass
+
+
+def _agent_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # EPERM 等は「居るが signal を送れない」なので生きているとみなす。
+        return True
+    return True
+
+
+def _drop_agent_state(window_id: int, pid: int) -> None:
+    """死んだエージェントの状態ファイルを消す。その間に同じ window で別のエージェントが書き直していたら残す。"""
+    path = AGENT_STATE_DIR / str(window_id)
+    try:
+        record = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(record, dict) and record.get("pid") == pid:
+            path.unlink()
+    except Exception:
+        pass
+
+
+def _expire_agent_states() -> bool:
+    """SessionEnd を出さずに終わった (kill された) エージェントの状態を捨て、表示が変わるかを返す。"""
+    dead = [(window_id, pid) for window_id, pid in agent_pids.items() if not _agent_alive(pid)]
+    for window_id, pid in dead:
+        del agent_pids[window_id]
+        agent_states.pop(window_id, None)
+        _drop_agent_state(window_id, pid)
+    if dead:
+        stats.incr("agent_states.expired", len(dead))
+    return bool(dead)
+
+
+def _sync_agent_states() -> bool:
+    """AGENT_STATE_DIR が変わっていれば agent_states を読み直し、変わったかを返す。
+
+    書き手は rename / unlink で更新するので、変化はディレクトリの mtime だけで分かる。
+    """
+    global agent_state_mtime_ns, agent_watched
+    try:
+        mtime_ns = AGENT_STATE_DIR.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+        if agent_watched and watcher is not None:
+            # 置き場ごと消されると inotify の監視も外れる。次のレイアウトパスで作り直して張り直す。
+            watcher.unwatch(AGENT_WATCH_KEY)
+            agent_watched = False
+    if mtime_ns == agent_state_mtime_ns:
+        return False
+    agent_state_mtime_ns = mtime_ns
+
+    states: dict[int, tuple[str, str]] = {}
+    pids: dict[int, int] = {}
+    if mtime_ns:
+        try:
+            names = os.listdir(AGENT_STATE_DIR)
+        except OSError:
+            names = []
+        for name in names:
+            if not name.isdigit():
+                continue
+            try:
+                record = json.loads((AGENT_STATE_DIR / name).read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            if not isinstance(record, dict) or record.get("state") not in AGENT_STATE_PRIORITY:
+                continue
+            pid = record.get("pid")
+            if isinstance(pid, int) and pid > 0:
+                if not _agent_alive(pid):
+                    _drop_agent_state(int(name), pid)
+                    continue
+                pids[int(name)] = pid
+            states[int(name)] = (str(record.get("agent") or "").lower(), record["state"])
+    agent_pids.clear()
+    agent_pids.update(pids)
+    if states == agent_states:
+        return False
+    agent_states.clear()
+    agent_states.update(states)
+    stats.incr("agent_states.reload")
+    return True
+
+
+def _agent_for(window_ids: tuple[int, ...]) -> tuple[str, str] | None:
+    best: tuple[str, str] | None = None
+    for window_id in window_ids:
+        state = agent_states.get(window_id)
+        if state is not None and (best is None or AGENT_STATE_PRIORITY[state[1]] < AGENT_STATE_PRIORITY[best[1]]):
+            best = state
+    return best
 
 
 def _tab_accessor_snapshot(tab: TabBarData) -> tuple[Path | None, str, str]:
@@ -313,10 +993,10 @@ def _compact_path(path: Path, max_size: int) -> str | None:
     parts_cnt = 1 + int(compressed)
     while parts_cnt != len(parts):
         candidate = "/".join(parts[0 : 1 + int(compressed)] + parts[parts_cnt:])
-        if wcswidth(candidate) <= max_size:
+        if tab_bar_text.text_width(candidate) <= max_size:
             return candidate
         parts_cnt += 1
-    return _clip_end(parts[-1], max_size)
+    return tab_bar_text.clip_end(parts[-1], max_size)
 
 
 def _explicit_title(snapshot: TabSnapshot) -> str | None:
@@ -341,6 +1021,17 @@ def _tab_name(snapshot: TabSnapshot) -> str:
 
 
 def _agent_marker(snapshot: TabSnapshot) -> str:
+    if snapshot.agent is not None:
+        agent, state = snapshot.agent
+        icon = CLAUDE_ICON if "claude" in agent else CODEX_ICON if "codex" in agent else SHELL_ICON
+        if state == "error":
+            return f"{icon}{DOT_ERROR}"
+        if state == "approval":
+            return f"{icon}{DOT_APPROVAL}"
+        if state == "running":
+            return f"{icon}{DOT_RUNNING}"
+        return f"{icon}{DOT_WAITING}"
+
     haystack = " ".join([snapshot.title, snapshot.exe, snapshot.oldest_exe]).lower()
     if "claude" in haystack:
         icon = CLAUDE_ICON
@@ -358,132 +1049,1223 @@ def _agent_marker(snapshot: TabSnapshot) -> str:
     return f"{icon}{DOT_IDLE}"
 
 
-def _git_dir_for(root: Path) -> Path | None:
-    dotgit = root / ".git"
-    if dotgit.is_dir():
-        return dotgit
-    if dotgit.is_file():
+def _dir_chain_signature(path: Path, stop: Path | None) -> tuple[int, ...] | None:
+    """path から stop (repo root。repo 外なら /) までの各ディレクトリの mtime。
+
+    .git の作成・削除はそのディレクトリの mtime を変えるので、これが同じなら解決結果も同じ。
+    """
+    signature = []
+    for candidate in [path, *path.parents]:
         try:
-            text = dotgit.read_text(encoding="utf-8", errors="ignore").strip()
-        except Exception:
+            signature.append(os.stat(candidate).st_mtime_ns)
+        except OSError:
             return None
-        prefix = "gitdir:"
-        if text.startswith(prefix):
-            path = Path(text[len(prefix) :].strip())
-            return path if path.is_absolute() else (root / path).resolve()
-    return None
+        if candidate == stop:
+            break
+    return tuple(signature)
 
 
 def _repo_for(path: Path | None) -> tuple[Path, Path] | None:
+    """cwd -> (repo root, git_dir) を解決する。repo 外という結果も含めてキャッシュする。
+
+    RESOLVE_TTL の間は syscall なしで返し、過ぎたら親方向の mtime だけ stat して再検証する。
+    """
     if path is None:
         return None
-    current = path if path.is_dir() else path.parent
-    for candidate in [current, *current.parents]:
-        git_dir = _git_dir_for(candidate)
-        if git_dir is not None:
-            return candidate, git_dir
+    key = str(path)
+    now = time.time()
+    cached = repo_resolution.get(key)
+    if cached is not None:
+        checked_at, signature, result = cached
+        if now - checked_at < RESOLVE_TTL:
+            return result
+        if signature is not None and _dir_chain_signature(path, result[0] if result else None) == signature:
+            repo_resolution[key] = (now, signature, result)
+            return result
+
+    result = tab_bar_git.resolve_repo(path)
+    if len(repo_resolution) >= RESOLVE_CACHE_SIZE:
+        repo_resolution.clear()
+    repo_resolution[key] = (now, _dir_chain_signature(path, result[0] if result else None), result)
+    return result
+
+
+def _cached_branch(key: str, git_dir: Path) -> str | None:
+    """HEAD を mtime で検証しつつ使い回す。inotify で監視中なら変更通知が来るまで stat もしない。"""
+    cached = head_cache.get(key)
+    if cached is not None and cached[0] == git_dir and key in watched_repos and isinstance(watcher, InotifyWatcher):
+        return cached[2]
+    try:
+        mtime = os.stat(git_dir / "HEAD").st_mtime_ns
+    except OSError:
+        mtime = 0
+    if cached is not None and cached[0] == git_dir and cached[1] == mtime:
+        return cached[2]
+    branch = tab_bar_git.branch_from_git_dir(git_dir)
+    head_cache[key] = (git_dir, mtime, branch)
+    return branch
+
+
+def _watch_dirs(git_dir: Path) -> list[Path]:
+    """HEAD / index / refs の変化を捉えるために監視するディレクトリ一覧。"""
+    common = tab_bar_git.common_dir_for(git_dir)
+    dirs = [git_dir]
+    if common != git_dir:
+        dirs.append(common)
+    for sub in ("refs/heads", "refs/remotes"):
+        base = common / sub
+        if not base.is_dir():
+            continue
+        for current, children, _ in os.walk(base):
+            dirs.append(Path(current))
+            if len(dirs) >= WATCH_DIRS_PER_REPO:
+                return dirs
+            children[:] = [child for child in children if not child.startswith(".")]
+    return dirs
+
+
+def _is_relevant_change(directory: Path, git_dirs: tuple[Path, ...], name: str) -> bool:
+    if not name or name.endswith(".lock"):
+        return False
+    if directory in git_dirs:
+        return name in WATCHED_GIT_FILES
+    return True
+
+
+class InotifyWatcher:
+    """inotify で git_dir 配下の HEAD / index / refs を監視し、変化した repo key を返す。"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    MASK = (
+        IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+        | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    )
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # wd -> (そのディレクトリを監視している repo key 群, 監視ディレクトリ)
+        self.watches: dict[int, tuple[set[str], Path]] = {}
+        self.repos: dict[str, tuple[tuple[Path, ...], list[int]]] = {}
+
+    def _add(self, key: str, directory: Path) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            return
+        # 同じディレクトリには同じ wd が返る。linked worktree 同士は共通 git dir の refs を
+        # 共有するので、wd は複数の repo key から参照される。
+        watched = self.watches.get(wd)
+        if watched is None:
+            self.watches[wd] = ({key}, directory)
+        else:
+            watched[0].add(key)
+        self.repos[key][1].append(wd)
+
+    def _add_tree(self, key: str, root: Path) -> None:
+        # 監視を張る前に作られた子ディレクトリ (refs/heads/a/b/c 等) も取りこぼさないよう再帰する。
+        for current, _, _ in os.walk(root):
+            if len(self.repos[key][1]) >= WATCH_DIRS_PER_REPO:
+                return
+            self._add(key, Path(current))
+
+    def watch(self, key: str, git_dir: Path) -> bool:
+        if key in self.repos:
+            return True
+        git_dirs = (git_dir, tab_bar_git.common_dir_for(git_dir))
+        self.repos[key] = (git_dirs, [])
+        for directory in _watch_dirs(git_dir):
+            self._add(key, directory)
+        return bool(self.repos[key][1])
+
+    def watch_dir(self, key: str, directory: Path) -> bool:
+        """git dir ではないディレクトリを 1 つ監視する。中の名前の変化はすべて key の変化として返す。"""
+        if key in self.repos:
+            return True
+        self.repos[key] = ((), [])
+        self._add(key, directory)
+        if not self.repos[key][1]:
+            del self.repos[key]
+            return False
+        return True
+
+    def unwatch(self, key: str) -> None:
+        entry = self.repos.pop(key, None)
+        if entry is None:
+            return
+        for wd in entry[1]:
+            watched = self.watches.get(wd)
+            if watched is None:
+                continue
+            watched[0].discard(key)
+            if not watched[0]:
+                del self.watches[wd]
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self.watches.clear()
+        self.repos.clear()
+
+    def poll(self) -> set[str]:
+        changed: set[str] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + self.EVENT.size <= len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                raw_name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    changed.update(self.repos)
+                    continue
+                watched = self.watches.get(wd)
+                if watched is None:
+                    continue
+                keys, directory = watched
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                name = os.fsdecode(raw_name)
+                for key in list(keys):
+                    git_dirs = self.repos[key][0]
+                    if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        if directory not in git_dirs:
+                            self._add_tree(key, directory / name)
+                    if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF) or _is_relevant_change(directory, git_dirs, name):
+                        changed.add(key)
+        return changed
+
+
+class PollingWatcher:
+    """inotify が使えない環境 (macOS 等) 向け。監視対象の mtime を redraw 毎に比較する。"""
+
+    def __init__(self) -> None:
+        self.repos: dict[str, tuple[list[Path], tuple[int, ...]]] = {}
+
+    @staticmethod
+    def _signature(paths: list[Path]) -> tuple[int, ...]:
+        out = []
+        for path in paths:
+            try:
+                out.append(path.stat().st_mtime_ns)
+            except OSError:
+                out.append(0)
+        return tuple(out)
+
+    def watch(self, key: str, git_dir: Path) -> bool:
+        if key in self.repos:
+            return True
+        common = tab_bar_git.common_dir_for(git_dir)
+        paths = [git_dir / "HEAD", git_dir / "index", common / "packed-refs", common / "refs" / "heads", common / "refs" / "remotes"]
+        self.repos[key] = (paths, self._signature(paths))
+        return True
+
+    def watch_dir(self, key: str, directory: Path) -> bool:
+        if key not in self.repos:
+            self.repos[key] = ([directory], self._signature([directory]))
+        return True
+
+    def unwatch(self, key: str) -> None:
+        self.repos.pop(key, None)
+
+    def close(self) -> None:
+        self.repos.clear()
+
+    def poll(self) -> set[str]:
+        changed: set[str] = set()
+        for key, (paths, signature) in self.repos.items():
+            current = self._signature(paths)
+            if current != signature:
+                self.repos[key] = (paths, current)
+                changed.add(key)
+        return changed
+
+
+def _make_watcher() -> InotifyWatcher | PollingWatcher:
+    try:
+        return InotifyWatcher()
+    except Exception:
+        return PollingWatcher()
+
+
+def _ensure_watcher() -> InotifyWatcher | PollingWatcher:
+    global watcher
+    if watcher is None:
+        watcher = _make_watcher()
+    return watcher
+
+
+def _watch_repo(key: str, git_dir: Path) -> bool:
+    watcher = _ensure_watcher()
+    if key in watched_repos:
+        watched_repos.move_to_end(key)
+        return True
+    try:
+        ok = watcher.watch(key, git_dir)
+    except Exception:
+        ok = False
+    if not ok:
+        return False
+    watched_repos[key] = None
+    while len(watched_repos) > MAX_WATCHED_REPOS:
+        oldest, _ = watched_repos.popitem(last=False)
+        watcher.unwatch(oldest)
+    return True
+
+
+def _drain_watch_events() -> bool:
+    """監視中 repo の変化を repo_cache に invalidated_at として反映し、エージェント状態の置き場を読み直す。"""
+    if watcher is None:
+        return False
+    try:
+        changed = watcher.poll()
+    except Exception:
+        return False
+    agent_changed = False
+    if AGENT_WATCH_KEY in changed:
+        changed.discard(AGENT_WATCH_KEY)
+        agent_changed = _sync_agent_states()
+    now = time.time()
+    for key in changed:
+        head_cache.pop(key, None)
+        cached = repo_cache.get(key)
+        if cached is not None:
+            cached["invalidated_at"] = now
+    return bool(changed) or agent_changed
+
+
+class ProcessResult:
+    """ProcessSupervisor.run の結果。timeout した場合は returncode が None。"""
+
+    __slots__ = ("returncode", "stdout", "stderr")
+
+    def __init__(self, returncode: int | None, stdout: str, stderr: str) -> None:
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class ProcessSupervisor:
+    """git / gh の子プロセスを専用スレッド上の asyncio ループ 1 本でまとめて扱う。
+
+    - 同時に走る子プロセスは limit 個まで。timeout は空きを待つ間ではなく起動した時点から数える
+    - 同じ (cwd, cmd) が実行中なら新たに起動せず、その結果を共有する
+    - timeout や cancel の際はプロセスグループごと SIGKILL し、wait まで済ませる
+    - cancel_stale() でアクティブでなくなった repo (group) 向けのコマンドを打ち切る
+
+    worker スレッドからは run() で同期的に結果を待つ。
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.slots: asyncio.Semaphore | None = None
+        self.lock = threading.RLock()
+        self.closed = False
+        # (cwd, cmd) -> (group, 実行中の Future, 起動したら完了する Future)。group は既定で cwd (= worktree の repo key)、
+        # repository 単位のコマンドでは共通 git dir。
+        self.running: dict[
+            tuple[str, tuple[str, ...]],
+            tuple[str, concurrent.futures.Future[ProcessResult | None], concurrent.futures.Future[None]],
+        ] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None or self.loop.is_closed():
+                loop = asyncio.new_event_loop()
+                self.slots = asyncio.Semaphore(self.limit)
+                threading.Thread(target=self._run_loop, args=(loop,), name="tab-bar-subprocess", daemon=True).start()
+                self.loop = loop
+            return self.loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def run(self, cmd: list[str], cwd: Path, timeout: float, group: str | None = None) -> ProcessResult | None:
+        """cancel された場合、起動に失敗した場合と close() 後は None を返す。"""
+        key = (str(cwd), tuple(cmd))
+        with self.lock:
+            if self.closed:
+                return None
+            running = self.running.get(key)
+            if running is None:
+                spawned: concurrent.futures.Future[None] = concurrent.futures.Future()
+                future = asyncio.run_coroutine_threadsafe(self._spawn(cmd, cwd, timeout, spawned), self._ensure_loop())
+                self.running[key] = (group or str(cwd), future, spawned)
+                future.add_done_callback(lambda done, key=key: self._forget(key, done))
+            else:
+                _, future, spawned = running
+                stats.incr("subprocess.merged")
+        try:
+            # slots の空き待ちは timeout に数えない。起動するか、起動せずに終わる (cancel など) まで待つ。
+            concurrent.futures.wait((future, spawned), return_when=concurrent.futures.FIRST_COMPLETED)
+            # 起動後はループ側で timeout + kill されるので、ここの上限は保険にすぎない。
+            return future.result(timeout + 5.0)
+        except concurrent.futures.CancelledError:
+            return None
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return None
+
+    def _forget(self, key: tuple[str, tuple[str, ...]], done: concurrent.futures.Future[ProcessResult | None]) -> None:
+        with self.lock:
+            running = self.running.get(key)
+            if running is not None and running[1] is done:
+                del self.running[key]
+
+    def cancel_stale(self, keep: tuple[str, ...]) -> None:
+        """group が keep のいずれでもないコマンドを打ち切る。"""
+        with self.lock:
+            stale = [future for group, future, _ in self.running.values() if group not in keep]
+        for future in stale:
+            if future.cancel():
+                stats.incr("subprocess.cancelled")
+
+    def close(self) -> None:
+        """実行中・空き待ちのコマンドを打ち切り (子プロセスは kill して wait する)、ループのスレッドを終わらせる。"""
+        with self.lock:
+            self.closed = True
+            loop, self.loop = self.loop, None
+        if loop is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._stop(), loop)
+
+    @staticmethod
+    async def _stop() -> None:
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        # _spawn の finally で kill と wait を済ませてからループを止める。
+        await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.get_running_loop().stop()
+
+    async def _spawn(
+        self, cmd: list[str], cwd: Path, timeout: float, spawned: concurrent.futures.Future[None]
+    ) -> ProcessResult | None:
+        name = "subprocess." + " ".join(cmd[:2])
+        assert self.slots is not None
+        async with self.slots:
+            stats.adjust("children_running", 1)
+            started = time.perf_counter()
+            proc: asyncio.subprocess.Process | None = None
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    cwd=str(cwd),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    # git status が index を書き戻すと監視に引っかかり、自分で自分を invalidate してしまう。
+                    env={**os.environ, "GIT_OPTIONAL_LOCKS": "0"},
+                    # gh が起動する git などの孫プロセスもまとめて kill できるよう、別グループにする。
+                    start_new_session=True,
+                )
+                spawned.set_result(None)
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                stats.incr(f"{name}.timeout")
+                return ProcessResult(None, "", "")
+            except asyncio.CancelledError:
+                stats.incr(f"{name}.cancelled")
+                raise
+            except Exception:
+                stats.incr(f"{name}.error")
+                return None
+            finally:
+                if proc is not None and proc.returncode is None:
+                    await self._kill(proc)
+                stats.adjust("children_running", -1)
+                stats.observe(name, time.perf_counter() - started)
+        return ProcessResult(
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace").strip(),
+            stderr.decode("utf-8", errors="replace").strip(),
+        )
+
+    @staticmethod
+    async def _kill(proc: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            await proc.wait()
+        except Exception:
+            pass
+
+
+supervisor = ProcessSupervisor(MAX_CHILD_PROCESSES)
+
+
+def _run(cmd: list[str], cwd: Path, timeout: float = 2.0) -> str | None:
+    result = supervisor.run(cmd, cwd, timeout)
+    if result is None or result.returncode is None:
+        return None
+    if result.returncode != 0 and not result.stdout:
+        return None
+    return result.stdout
+
+
+class CircuitBreaker:
+    """gh の失敗を全 repo 共通で数え、指数 backoff の間は gh を呼ばせない。
+
+    閉じている間は常に通す。失敗すると retry_at まで開き、その後は probe を 1 本だけ
+    通して (half-open) 結果次第で閉じるか、倍の時間だけ開き直す。
+    """
+
+    def __init__(self, base: float, limit: float) -> None:
+        self.base = base
+        self.limit = limit
+        self.failures = 0
+        self.retry_at = 0.0
+        self.reason = ""
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return self.failures > 0
+
+    def allow(self) -> bool:
+        with self.lock:
+            if not self.failures:
+                return True
+            if self.probing or time.time() < self.retry_at:
+                return False
+            self.probing = True
+            return True
+
+    def release(self) -> None:
+        """probe が結果を得ずに終わった (cancel など) ときに、次の probe を通せるようにする。"""
+        with self.lock:
+            self.probing = False
+
+    def record(self, reason: str | None) -> None:
+        """reason が None なら成功 (gh が GitHub まで届いた) として閉じる。"""
+        with self.lock:
+            self.probing = False
+            if reason is None:
+                if self.failures:
+                    stats.incr("gh_breaker.closed")
+                self.failures = 0
+                self.reason = ""
+                return
+            self.failures += 1
+            self.reason = reason
+            self.retry_at = time.time() + min(self.limit, self.base * 2 ** (self.failures - 1))
+            stats.incr(f"gh_breaker.open.{reason}")
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "failures": self.failures,
+                "reason": self.reason or None,
+                "retry_in": round(max(0.0, self.retry_at - time.time()), 1) if self.failures else None,
+            }
+
+
+gh_breaker = CircuitBreaker(GH_BACKOFF_BASE, GH_BACKOFF_MAX)
+
+
+class SpawnBudget:
+    """直近 window 秒に許可した子プロセス起動を数え、limit 回を超える要求を断る。
+
+    背景の起動はそのうち background_limit 回までに抑え、アクティブな repo の枠を残す。
+    """
+
+    def __init__(self, limit: int, background_limit: int, window: float = 60.0) -> None:
+        self.limit = limit
+        self.background_limit = background_limit
+        self.window = window
+        # (許可した時刻, 背景の起動か)
+        self.granted: deque[tuple[float, bool]] = deque()
+        self.lock = threading.Lock()
+
+    def take(self, background: bool) -> bool:
+        now = time.time()
+        with self.lock:
+            while self.granted and now - self.granted[0][0] >= self.window:
+                self.granted.popleft()
+            if len(self.granted) >= self.limit or (
+                background and sum(1 for _, bg in self.granted if bg) >= self.background_limit
+            ):
+                stats.incr("spawn_budget.denied")
+                return False
+            self.granted.append((now, background))
+            return True
+
+    def available_at(self, background: bool) -> float:
+        """次に take(background) が通る時刻の見込み。"""
+        with self.lock:
+            at = 0.0
+            if len(self.granted) >= self.limit:
+                at = self.granted[len(self.granted) - self.limit][0] + self.window
+            if background:
+                granted = [when for when, bg in self.granted if bg]
+                if len(granted) >= self.background_limit:
+                    at = max(at, granted[len(granted) - self.background_limit] + self.window)
+            return at
+
+
+class SpawnDeferred(Exception):
+    """spawn_budget の枠が空くまで git/gh を起動できない。worker は retry_at まで要求を保留させる。"""
+
+    def __init__(self, retry_at: float) -> None:
+        super().__init__(retry_at)
+        self.retry_at = retry_at
+
+
+spawn_budget = SpawnBudget(MAX_SPAWNS_PER_MINUTE, BACKGROUND_SPAWNS_PER_MINUTE)
+
+
+def _take_spawn(background: bool) -> None:
+    if not spawn_budget.take(background):
+        raise SpawnDeferred(spawn_budget.available_at(background))
+
+
+def _gh_failure(result: ProcessResult) -> str | None:
+    """repository に依らない gh の失敗 (offline / auth / rate_limit) を分類する。"""
+    if result.returncode is None:
+        return "offline"
+    if result.returncode == 0:
+        return None
+    stderr = result.stderr.lower()
+    if any(pattern in stderr for pattern in GH_RATE_LIMIT_ERRORS):
+        return "rate_limit"
+    if result.returncode == GH_AUTH_EXIT or any(pattern in stderr for pattern in GH_AUTH_ERRORS):
+        return "auth"
+    if any(pattern in stderr for pattern in GH_OFFLINE_ERRORS):
+        return "offline"
+    # remote が無いなど repository 固有の失敗。GitHub には届いているので breaker は閉じてよい。
     return None
 
 
-def _branch_from_git_dir(git_dir: Path) -> str | None:
+def _parse_pr_index(raw: str) -> dict[str, PrInfo] | None:
     try:
-        head = (git_dir / "HEAD").read_text(encoding="utf-8", errors="ignore").strip()
+        parsed = json.loads(raw)
     except Exception:
         return None
-    ref_prefix = "ref: refs/heads/"
-    if head.startswith(ref_prefix):
-        return head[len(ref_prefix) :]
-    if head.startswith("ref: "):
-        return head[5:].split("/")[-1]
-    return head[:7] if head else None
+    if not isinstance(parsed, list):
+        return None
+    index: dict[str, PrInfo] = {}
+    # gh pr list は新しい順。同じ branch に複数 PR があれば open/draft を優先し、次に新しいものを採る。
+    for pr in parsed:
+        if not isinstance(pr, dict) or pr.get("isCrossRepository"):
+            continue
+        branch = str(pr.get("headRefName") or "")
+        if not branch:
+            continue
+        state = "draft" if pr.get("isDraft") else str(pr.get("state") or "open").lower()
+        current = index.get(branch)
+        if current is None or (current["pr_state"] not in OPEN_PR_STATES and state in OPEN_PR_STATES):
+            index[branch] = {"pr_number": pr.get("number"), "pr_state": state}
+    return index
 
 
-def _run(cmd: list[str], cwd: Path, timeout: float = 2.0) -> str | None:
+def _pr_index_lock(key: str) -> threading.Lock:
+    with pr_index_locks_guard:
+        lock = pr_index_locks.get(key)
+        if lock is None:
+            lock = pr_index_locks[key] = threading.Lock()
+        return lock
+
+
+def _gh_pr_list(args: list[str], repo: Path, key: str, background: bool) -> dict[str, PrInfo] | None:
+    """gh pr list を 1 回実行して branch -> PR 表にする。gh を起動できない・一時的に失敗したときは None。
+
+    GitHub の repository でないなど repository 固有の失敗は、PR の無い空の表として返す。
+    起動枠を使い切っていれば SpawnDeferred を送出する。
+    """
+    if not gh_breaker.allow():
+        stats.incr("gh_breaker.skipped")
+        return None
+    if not spawn_budget.take(background):
+        gh_breaker.release()
+        raise SpawnDeferred(spawn_budget.available_at(background))
+    result = supervisor.run(["gh", "pr", "list", *args, "--json", "number,state,isDraft,headRefName,isCrossRepository"], repo, 4.0, group=key)
+    if result is None:
+        gh_breaker.release()
+        return None
+    failure = _gh_failure(result)
+    gh_breaker.record(failure)
+    if failure is not None:
+        return None
+    if result.returncode != 0:
+        return {}
+    return _parse_pr_index(result.stdout or "[]")
+
+
+def _pr_index_for(repo: Path, git_dir: Path, background: bool = False) -> dict[str, PrInfo] | None:
+    """repository 単位の、open な PR の branch -> PR 表を返す。TTL 内なら gh を呼ばずに共有する。
+
+    linked worktree も共通 git dir をキーにするため、同じ repository のタブは 1 回の
+    gh pr list で済む。gh が失敗したら fetched_at を進めずに None を返し、呼び出し側は
+    直前の表を表示したまま ERROR_TTL 後に取り直す。
+    """
+    key = str(tab_bar_git.common_dir_for(git_dir))
+    with _pr_index_lock(key):
+        cached = pr_indexes.get(key)
+        if cached is not None and time.time() - cached[0] < PR_INDEX_TTL:
+            return cached[1]
+        index = _gh_pr_list(["--state", "open", "--limit", str(PR_INDEX_LIMIT)], repo, key, background)
+        if index is None:
+            return None
+        previous = cached[1] if cached is not None else {}
+        _carry_checks(previous, index)
+        for branch in previous.keys() - index.keys():
+            # open でなくなった PR は merge / close された。古い照会結果を捨てて引き直させる。
+            pr_lookups.pop((key, branch), None)
+        pr_indexes[key] = (time.time(), index)
+        return index
+
+
+def _closed_pr_for(repo: Path, git_dir: Path, branch: str, background: bool = False) -> tuple[PrInfo | None, bool]:
+    """open な PR の無い branch について、merge / close 済みの PR を引く。(PR, 引けたか) を返す。
+
+    open な PR の一覧に載らない branch だけを branch 単位で照会し、結果は PR_LOOKUP_TTL の間使い回す。
+    """
+    key = str(tab_bar_git.common_dir_for(git_dir))
+    with _pr_index_lock(key):
+        cached = pr_lookups.get((key, branch))
+        if cached is not None and time.time() - cached[0] < PR_LOOKUP_TTL:
+            return cached[1], True
+        index = _gh_pr_list(["--head", branch, "--state", "all", "--limit", "5"], repo, key, background)
+        if index is None:
+            return None, False
+        pr = index.get(branch)
+        pr_lookups[(key, branch)] = (time.time(), pr)
+        return pr, True
+
+
+def _carry_checks(previous: dict[str, PrInfo], index: dict[str, PrInfo]) -> None:
+    """gh pr list は CI / review を返さない。同じ PR のままなら、一括取得した値を引き継ぐ。"""
+    for branch, pr in index.items():
+        old = previous.get(branch)
+        if old is not None and old.get("pr_number") == pr.get("pr_number") and "checks" in old:
+            pr["checks"] = old["checks"]
+            pr["review"] = old.get("review")
+
+
+def _github_remote(common: Path) -> tuple[str, str, str] | None:
+    """gh pr list と同じ remote の優先順で、GitHub 上の (host, owner, name) を求める。"""
+    key = str(common)
+    if key in github_remotes:
+        return github_remotes[key]
+    config = tab_bar_git.read_git_config(common / "config")
+    urls = {name[len("remote.") : -len(".url")]: url for name, url in config.items() if name.startswith("remote.") and name.endswith(".url")}
+    resolved = [name for name in urls if config.get(f"remote.{name}.gh-resolved") == "base"]
+    ordered = resolved + [name for name in GH_REMOTE_ORDER if name in urls] + sorted(urls)
+    found = None
+    for name in ordered:
+        match = GITHUB_REMOTE_RE.match(urls[name])
+        # GitHub 以外の host に gh を向けると認証エラーで gh_breaker が開いてしまう。
+        if match is not None and "github" in match.group(1).lower():
+            found = (match.group(1).lower(), match.group(2), match.group(3))
+            break
+    github_remotes[key] = found
+    return found
+
+
+def _checks_query(batch: list[tuple[str, str, str, str, str]]) -> tuple[str, dict[str, tuple[str, str]]]:
+    """(共通 git dir, host, owner, name, branch) 群を 1 つの GraphQL query にする。alias -> (共通 git dir, branch) も返す。"""
+    repos: dict[tuple[str, str], list[tuple[str, str]]] = {}
+    for key, _, owner, name, branch in batch:
+        repos.setdefault((owner, name), []).append((key, branch))
+    aliases: dict[str, tuple[str, str]] = {}
+    parts = []
+    for i, ((owner, name), branches) in enumerate(repos.items()):
+        fields = []
+        for key, branch in branches:
+            alias = f"p{len(aliases)}"
+            aliases[alias] = (key, branch)
+            fields.append(
+                f"{alias}: pullRequests(headRefName: {json.dumps(branch)}, states: [OPEN], first: 1, "
+                "orderBy: {field: CREATED_AT, direction: DESC}) { nodes { number isDraft isCrossRepository reviewDecision "
+                "commits(last: 1) { nodes { commit { statusCheckRollup { state } } } } } }"
+            )
+        parts.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {' '.join(fields)} }}")
+    return "query { " + " ".join(parts) + " }", aliases
+
+
+def _parse_checks(raw: str, aliases: dict[str, tuple[str, str]]) -> dict[tuple[str, str], PrInfo] | None:
+    """GraphQL の応答から (共通 git dir, branch) -> PR の CI / review を取り出す。一部の repository のエラーは無視する。"""
     try:
-        proc = subprocess.run(
-            cmd,
-            cwd=str(cwd),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            text=True,
-            timeout=timeout,
-            check=False,
-        )
+        parsed = json.loads(raw)
     except Exception:
         return None
-    if proc.returncode != 0 and not proc.stdout.strip():
+    data = parsed.get("data") if isinstance(parsed, dict) else None
+    if not isinstance(data, dict):
         return None
-    return proc.stdout.strip()
+    found: dict[tuple[str, str], PrInfo] = {}
+    for repository in data.values():
+        if not isinstance(repository, dict):
+            continue
+        for alias, connection in repository.items():
+            nodes = connection.get("nodes") if isinstance(connection, dict) else None
+            pr = next((node for node in nodes or () if isinstance(node, dict) and not node.get("isCrossRepository")), None)
+            if alias not in aliases or pr is None:
+                continue
+            commits = (pr.get("commits") or {}).get("nodes") or [{}]
+            rollup = ((commits[-1] or {}).get("commit") or {}).get("statusCheckRollup") or {}
+            found[aliases[alias]] = {
+                "pr_number": pr.get("number"),
+                "pr_state": "draft" if pr.get("isDraft") else "open",
+                "checks": CHECK_STATES.get(str(rollup.get("state") or "")),
+                "review": REVIEW_STATES.get(str(pr.get("reviewDecision") or "")),
+            }
+    return found
+
+
+def _store_checks(found: dict[tuple[str, str], PrInfo]) -> bool:
+    """取得した CI / review を PR 表の該当 branch に書き込む。PR 表の fetched_at は進めない。
+
+    PR 表に無い branch の open な PR は表に加える。PR 表がまだ無い repository では、
+    gh pr list の取得期限を過ぎた表として作り、次の要求で一覧を取り直させる。
+    """
+    changed = False
+    for (key, branch), info in found.items():
+        with _pr_index_lock(key):
+            cached = pr_indexes.get(key)
+            if cached is None:
+                cached = (time.time() - PR_INDEX_TTL, {})
+            pr = cached[1].get(branch)
+            if pr is not None and pr.get("pr_number") != info["pr_number"]:
+                continue
+            updated = {**(pr or {}), **info}
+            if updated != pr:
+                # 描画側が読んでいる表は書き換えず、差し替える。
+                pr_indexes[key] = (cached[0], {**cached[1], branch: updated})
+                pr_lookups.pop((key, branch), None)
+                changed = True
+    return changed
 
 
-def _worker(repo: Path, git_dir: Path) -> None:
-    status: RepoStatus = {"updated_at": time.time(), "loading": False}
-    branch = _branch_from_git_dir(git_dir)
+def _checks_worker(pairs: list[tuple[str, str, str, str, str, Path]]) -> None:
+    """host ごとに CHECKS_BATCH_LIMIT 件ずつ gh api graphql を 1 回呼び、全タブの PR の CI / review を更新する。"""
+    global checks_fetching, checks_changed, checks_pending
+    try:
+        by_host: dict[str, list[tuple[str, str, str, str, str, Path]]] = {}
+        for pair in pairs:
+            by_host.setdefault(pair[1], []).append(pair)
+        pending = False
+        for host, items in by_host.items():
+            for start in range(0, len(items), CHECKS_BATCH_LIMIT):
+                batch = items[start : start + CHECKS_BATCH_LIMIT]
+                if not gh_breaker.allow():
+                    stats.incr("gh_breaker.skipped")
+                    return
+                if not spawn_budget.take(True):
+                    gh_breaker.release()
+                    return
+                query, aliases = _checks_query([pair[:5] for pair in batch])
+                result = supervisor.run(["gh", "api", "graphql", "--hostname", host, "-f", f"query={query}"], batch[0][5], 6.0, group=CHECKS_GROUP)
+                if result is None:
+                    gh_breaker.release()
+                    return
+                failure = _gh_failure(result)
+                gh_breaker.record(failure)
+                if failure is not None:
+                    return
+                # 一部の repository が見つからないと gh は非 0 で終わるが、残りの data は使える。
+                found = _parse_checks(result.stdout, aliases) if result.stdout else None
+                if found is None:
+                    continue
+                pending = pending or any(info["checks"] == "pending" for info in found.values())
+                if _store_checks(found):
+                    checks_changed = True
+        checks_pending = pending
+    finally:
+        checks_fetching = False
+
+
+def _schedule_checks() -> None:
+    """表示中の全タブから open な PR のある (repo, branch) を集め、期限が来ていれば一括取得を始める。
+
+    PR 表に載っていない branch (PR 表をまだ取っていない repo など) も対象にし、GraphQL の応答の
+    PR 番号で PR 表を補う。merge / close 済みと分かっている branch だけを除く。
+    """
+    global checks_scheduled_at, checks_scanned_at, checks_fetching
+    now = time.time()
+    interval = CHECKS_PENDING_INTERVAL if checks_pending else CHECKS_INTERVAL
+    if checks_fetching or not app_focused or now - checks_scheduled_at < interval:
+        return
+    # PR 表が届くまでは対象が無い。タブの走査は TAB_REPO_INTERVAL ごとに留める。
+    if now - checks_scanned_at < TAB_REPO_INTERVAL:
+        return
+    checks_scanned_at = now
+    pairs: dict[tuple[str, str], tuple[str, str, str, str, str, Path]] = {}
+    for snapshot in tab_snapshots:
+        repo_info = _repo_for(snapshot.cwd)
+        if repo_info is None:
+            continue
+        repo, git_dir = repo_info
+        common = tab_bar_git.common_dir_for(git_dir)
+        key = str(common)
+        branch = _cached_branch(str(repo), git_dir)
+        if not branch or (key, branch) in pairs:
+            continue
+        index = pr_indexes.get(key)
+        pr = index[1].get(branch) if index is not None else None
+        if pr is None:
+            lookup = pr_lookups.get((key, branch))
+            pr = lookup[1] if lookup is not None else None
+        if pr is not None and pr.get("pr_state") not in OPEN_PR_STATES:
+            continue
+        remote = _github_remote(common)
+        if remote is not None:
+            pairs[(key, branch)] = (key, *remote, branch, repo)
+    if not pairs:
+        return
+    checks_scheduled_at = now
+    checks_fetching = True
+    stats.incr("checks.batch")
+    threading.Thread(target=_checks_worker, args=(list(pairs.values()),), name="tab-bar-checks", daemon=True).start()
+
+
+def _pr_status(pr: PrInfo | None) -> RepoStatus:
+    if pr is None:
+        return {"pr_number": None, "pr_state": None}
+    return dict(pr)
+
+
+def _is_stale(key: str) -> bool:
+    """key (worktree の repo key または共通 git dir) がもう誰にも表示されていないか。"""
+    return key != active_repo_key and key != active_common_key and key not in tracked_keys
+
+
+def _worker(repo: Path, git_dir: Path, priority: int = PRIORITY_ACTIVE) -> None:
+    key = str(repo)
+    background = priority > PRIORITY_ACTIVE
+    status: RepoStatus = {"updated_at": time.time(), "error_at": None, "loading": False}
+    branch = tab_bar_git.branch_from_git_dir(git_dir)
     if branch:
         status["branch"] = branch
 
-    dirty = _run(["git", "status", "--porcelain"], repo, timeout=1.5)
-    status["dirty"] = bool(dirty)
+    started = time.perf_counter()
+    dirty = tab_bar_git.index_dirty(repo, git_dir)
+    stats.observe("dirty.index", time.perf_counter() - started)
+    if dirty is None:
+        stats.incr("dirty.fallback")
+        _take_spawn(background)
+        output = _run(["git", "status", "--porcelain"], repo, timeout=1.5)
+        if output is None and _is_stale(key):
+            result_queue.put((key, {"loading": False}))
+            return
+        dirty = bool(output)
+    status["dirty"] = dirty
+
+    started = time.perf_counter()
+    counts = tab_bar_git.ahead_behind(git_dir)
+    stats.observe("ahead_behind", time.perf_counter() - started)
+    status["ahead"], status["behind"] = counts if counts is not None else (None, None)
 
-    pr_raw = None
+    if branch and _is_stale(key):
+        # 既に別タブへ移っているなら gh は呼ばない。updated_at を付けず、次回訪問時に取り直させる。
+        result_queue.put((key, {"dirty": status["dirty"], "ahead": status["ahead"], "behind": status["behind"], "loading": False}))
+        return
     if branch:
-        pr_raw = _run(["gh", "pr", "view", branch, "--json", "number,state,isDraft"], repo, timeout=2.5)
-        if not pr_raw:
-            pr_raw = _run(["gh", "pr", "list", "--head", branch, "--json", "number,state,isDraft", "--limit", "1"], repo, timeout=2.5)
-    if pr_raw:
+        index = _pr_index_for(repo, git_dir, background)
+        ok = index is not None
+        pr = index.get(branch) if index is not None else None
+        if pr is None and ok:
+            pr, ok = _closed_pr_for(repo, git_dir, branch, background)
+        if _is_stale(key):
+            # gh の途中で打ち切られた可能性がある。不完全な PR 情報で TTL を進めない。
+            result_queue.put((key, {"dirty": status["dirty"], "loading": False}))
+            return
+        if ok:
+            status.update(_pr_status(pr))
+        else:
+            # gh が失敗した。表示中の PR はそのまま残し、ERROR_TTL 後に取り直す。
+            status["error_at"] = time.time()
+
+    result_queue.put((key, status))
+
+
+def _worker_loop() -> None:
+    ident = threading.get_ident()
+    while True:
+        priority, _, key, repo, git_dir = work_queue.get()
+        if not key:
+            # _shutdown() が積んだ終了の合図。
+            return
+        if _is_stale(key):
+            result_queue.put((key, {"loading": False}))
+            continue
+        worker_started[ident] = time.monotonic()
         try:
-            parsed = json.loads(pr_raw)
-            pr = parsed[0] if isinstance(parsed, list) and parsed else parsed
-            if isinstance(pr, dict):
-                state = str(pr.get("state") or "open").lower()
-                if pr.get("isDraft"):
-                    state = "draft"
-                status["pr_number"] = pr.get("number")
-                status["pr_state"] = state
+            _worker(repo, git_dir, priority)
+        except SpawnDeferred as deferred:
+            # 起動枠を使い切った。失敗ではないので error_at は付けず、枠が空くまで要求を保留する。
+            result_queue.put((key, {"loading": False, "retry_at": deferred.retry_at}))
         except Exception:
-            status["error_at"] = time.time()
+            result_queue.put((key, {"loading": False, "error_at": time.time()}))
+        finally:
+            worker_started.pop(ident, None)
+        if _retire_surplus_worker():
+            return
 
-    result_queue.put((str(repo), status))
 
+def _hung_workers(now: float) -> int:
+    return sum(1 for thread in workers if now - worker_started.get(thread.ident or 0, now) > IN_FLIGHT_DEADLINE)
 
-def _request_repo(repo: Path, git_dir: Path, branch: str | None) -> None:
+
+def _retire_surplus_worker() -> bool:
+    """止まっていた worker が戻ってきて WORKER_COUNT を超えたら、呼び出した worker を減らす側に回す。"""
+    with workers_lock:
+        if len(workers) - _hung_workers(time.monotonic()) <= WORKER_COUNT:
+            return False
+        current = threading.current_thread()
+        if current in workers:
+            workers.remove(current)
+        return True
+
+
+def _ensure_workers() -> None:
+    """落ちた worker を入れ替え、1 件の処理から戻らない worker の代わりを WORKER_SPARE_LIMIT 本まで起こす。"""
+    with workers_lock:
+        workers[:] = [thread for thread in workers if thread.is_alive()]
+        hung = min(_hung_workers(time.monotonic()), WORKER_SPARE_LIMIT)
+        while len(workers) < WORKER_COUNT + hung:
+            if len(workers) >= WORKER_COUNT:
+                stats.incr("worker.replaced")
+            thread = threading.Thread(target=_worker_loop, name=f"tab-bar-repo-{len(workers)}", daemon=True)
+            thread.start()
+            workers.append(thread)
+
+
+def _request_repo(repo: Path, git_dir: Path, branch: str | None, priority: int = PRIORITY_ACTIVE) -> bool:
+    """必要なら worker に status の取得を積み、積んだかどうかを返す。"""
     key = str(repo)
     now = time.time()
     cached = repo_cache.get(key)
+    if cached is not None:
+        cached["used_at"] = now
+        repo_cache.move_to_end(key)
     if key in in_flight:
-        return
+        stats.incr("repo_cache.in_flight")
+        return False
     if cached is not None:
-        ttl = ERROR_TTL if cached.get("error_at") else REPO_TTL
-        if now - float(cached.get("updated_at", 0)) < ttl:
-            return
-
-    in_flight.add(key)
-    existing = repo_cache.setdefault(key, {"updated_at": now})
+        if cached.get("updated_at") and not app_focused:
+            stats.incr("refresh.paused")
+            return False
+        if now < _refresh_due_at(key, cached):
+            stats.incr("repo_cache.hit")
+            return False
+
+    stats.incr("repo_cache.miss")
+    in_flight[key] = now + IN_FLIGHT_DEADLINE
+    existing = repo_cache.setdefault(key, {"updated_at": 0.0, "used_at": now})
     if branch:
         existing["branch"] = branch
     existing["loading"] = True
-    thread = threading.Thread(target=_worker, args=(repo, git_dir), daemon=True)
-    thread.start()
+    _ensure_workers()
+    work_queue.put((priority, -next(work_seq), key, repo, git_dir))
+    return True
 
 
-def _repo_snapshot(active: TabSnapshot | None) -> RepoSnapshot | None:
-    if active is None:
+def _refresh_due_at(key: str, cached: RepoStatus) -> float:
+    """cached を取り直す時刻。invalidate されていれば直近の取得時刻、起動枠待ちなら枠が空く時刻。"""
+    updated_at = float(cached.get("updated_at", 0))
+    error_at = float(cached.get("error_at") or 0)
+    since = max(updated_at, error_at)
+    due = since + (ERROR_TTL if error_at else _refresh_interval(key, cached))
+    if since < float(cached.get("invalidated_at", 0)):
+        due = since
+    return max(due, float(cached.get("retry_at") or 0))
+
+
+def _next_refresh_at() -> float | None:
+    """アクティブな repo と追跡中の他タブの repo のうち、最も早く取り直す時刻。"""
+    if not app_focused:
         return None
-    repo_info = _repo_for(active.cwd)
+    due = None
+    for key in (active_repo_key, *tracked_keys):
+        cached = repo_cache.get(key)
+        if cached is None or key in in_flight:
+            continue
+        at = _refresh_due_at(key, cached)
+        if due is None or at < due:
+            due = at
+    return due
+
+
+def _refresh_repos() -> None:
+    """描画を待たずに、期限の来たアクティブな repo と (REPO_STATUS_SCOPE == "all" なら) 他タブの repo を要求する。"""
+    if active_repo_key and repo_record.key == active_repo_key:
+        _request_repo(repo_record.root, repo_record.git_dir, _cached_branch(active_repo_key, repo_record.git_dir))
+    if REPO_STATUS_SCOPE == "all":
+        _schedule_tab_repos()
+
+
+def _refresh_interval(key: str, status: RepoStatus) -> float:
+    interval = status.get("interval")
+    if interval:
+        return float(interval)
+    return REPO_TTL
+
+
+def _adapt_interval(key: str, previous: RepoStatus, current: RepoStatus) -> None:
+    """取り直した結果で表示が変わったかに応じて、その repo の再取得間隔を縮めるか延ばす。"""
+    interval = _refresh_interval(key, previous)
+    if _visible_status(previous)[:-1] != _visible_status(current)[:-1]:
+        interval = max(REFRESH_MIN_INTERVAL, interval * REFRESH_SPEEDUP)
+    else:
+        interval = min(REFRESH_MAX_INTERVAL, interval * REFRESH_SLOWDOWN)
+    current["interval"] = interval
+
+
+def request_refresh(tab_id: int) -> None:
+    """tab_bar_watcher.py から呼ばれる。focus を得たタブやコマンドが終わったタブの repo を次の描画で取り直させる。"""
+    record = tab_records.get(tab_id)
+    repo_info = _repo_for(record.cwd) if record is not None else None
+    cached = repo_cache.get(str(repo_info[0])) if repo_info is not None else None
+    if cached is None:
+        return
+    now = time.time()
+    if now - float(cached.get("updated_at", 0)) >= FOCUS_REFRESH_MIN_AGE:
+        cached["invalidated_at"] = now
+        stats.incr("refresh.requested")
+        # 次の描画を待たずに起きて取り直す。
+        _mark_tab_bar_dirty()
+        _schedule_poll()
+
+
+def focus_changed(focused: bool) -> None:
+    """tab_bar_watcher.py から focus イベントのたびに呼ばれる。OS window の focus が外れている間は repo の取り直しと監視イベントの読み取りを止める。
+
+    OS window 間の移動で focus を失う / 得るイベントがどの順に届くかには頼らず、kitty に focus を持つ
+    OS window があるかを問い合わせる。問い合わせに失敗したときだけイベントの focused を使う。
+    """
+    global app_focused, watch_polled_at, watch_interval
+    try:
+        focused = bool(current_focused_os_window_id())
+    except Exception:
+        pass
+    if focused == app_focused:
+        return
+    app_focused = focused
+    if focused:
+        # focus の無い間に溜まった監視イベントを 1 度だけまとめて読み、止めていた取り直しと check の期限を張り直す。
+        watch_polled_at = 0.0
+        watch_interval = WATCH_POLL_INTERVAL
+        if _drain_pending():
+            _mark_tab_bar_dirty()
+        _schedule_poll()
+
+
+def _set_active_repo(key: str, common_key: str) -> None:
+    global active_repo_key, active_common_key
+    if key != active_repo_key:
+        active_repo_key = key
+        active_common_key = common_key
+        # 同じ repository の別 worktree へ移っただけなら、共有する gh の取得は続けさせる。
+        supervisor.cancel_stale((key, common_key, CHECKS_GROUP, *tracked_keys))
+
+
+def _tab_badge(cwd: Path | None) -> str:
+    """REPO_STATUS_SCOPE == "all" のとき、中央タブの chip に添える dirty / PR の印。"""
+    repo_info = _repo_for(cwd)
+    if repo_info is None:
+        return ""
+    cached = repo_cache.get(str(repo_info[0]))
+    if not cached:
+        return ""
+    return (DIRTY_ICON if cached.get("dirty") else "") + (PR_BADGE if cached.get("pr_number") else "")
+
+
+def _schedule_tab_repos() -> None:
+    """全タブの repo を重複なく洗い出し、背景で status を取りに行く。
+
+    アクティブタブの repo は _repo_snapshot が最優先で扱う。残りは表示中のタブ → 画面外の
+    タブの順に、TAB_REPO_INTERVAL 秒あたり TAB_REPO_REQUESTS_PER_CYCLE 件まで要求する。
+    """
+    global tracked_keys, tab_repos_scheduled_at, tab_repos_backlog
+    now = time.time()
+    if now - tab_repos_scheduled_at < TAB_REPO_INTERVAL:
+        return
+    tab_repos_scheduled_at = now
+    sizes = last_layout.sizes if last_layout is not None else []
+    wanted: dict[str, tuple[int, Path, Path]] = {}
+    for i, snapshot in enumerate(tab_snapshots):
+        repo_info = _repo_for(snapshot.cwd)
+        if repo_info is None:
+            continue
+        key = str(repo_info[0])
+        priority = PRIORITY_BACKGROUND if i < len(sizes) and sizes[i] < 0 else PRIORITY_VISIBLE
+        if key not in wanted or priority < wanted[key][0]:
+            wanted[key] = (priority, *repo_info)
+    keys = set(wanted)
+    keys.update(str(tab_bar_git.common_dir_for(git_dir)) for _, _, git_dir in wanted.values())
+    tracked_keys = keys
+
+    budget = TAB_REPO_REQUESTS_PER_CYCLE
+    for key, (priority, repo, git_dir) in sorted(wanted.items(), key=lambda item: item[1][0]):
+        if budget <= 0:
+            break
+        if key == active_repo_key:
+            continue
+        _watch_repo(key, git_dir)
+        if _request_repo(repo, git_dir, _cached_branch(key, git_dir), priority):
+            budget -= 1
+    # 1 周期の上限で打ち切った。残りは描画を待たずに次の周期で要求する。
+    tab_repos_backlog = budget <= 0
+
+
+def _repo_snapshot(active: TabSnapshot | None) -> RepoSnapshot | None:
+    repo_info = _repo_for(active.cwd) if active is not None else None
     if repo_info is None:
+        _set_active_repo("", "")
         return None
     repo, git_dir = repo_info
-    branch = _branch_from_git_dir(git_dir)
+    _set_active_repo(str(repo), str(tab_bar_git.common_dir_for(git_dir)))
+    _watch_repo(active_repo_key, git_dir)
+    branch = _cached_branch(active_repo_key, git_dir)
     _request_repo(repo, git_dir, branch)
-    cached = repo_cache.get(str(repo), {})
-    return RepoSnapshot(repo, git_dir, branch, cached)
-
-
-def _tab_cell(snapshot: TabSnapshot) -> Cell:
-    color = ACTIVE_TAB if snapshot.is_active else INACTIVE_TAB
-    # index と AI マーカーは icon (常時描画される chip) に入れ、省略対象の name のみ text にする。
-    icon = f"{snapshot.index} {snapshot.marker}"
-    return Cell(icon, snapshot.name, color=color)
+    cached = repo_cache.get(active_repo_key, {})
+    repo_record.update(repo, git_dir, branch, cached)
+    index = pr_indexes.get(active_common_key)
+    if index is not None and branch:
+        # branch を切り替えた直後や、同じ repository の別 worktree を初めて開いたときでも、
+        # 取得済みの PR 表 (open な PR が無ければ merge / close 済みの照会結果) から即座に引ける。
+        pr = index[1].get(branch)
+        if pr is None:
+            lookup = pr_lookups.get((active_common_key, branch))
+            pr = lookup[1] if lookup is not None else None
+        repo_record.pr_number = pr.get("pr_number") if pr else None
+        repo_record.pr_state = str(pr.get("pr_state") or "open") if pr else "open"
+        repo_record.checks = pr.get("checks") if pr else None
+        repo_record.review = pr.get("review") if pr else None
+    return repo_record
 
 
 def _left_cell(active: TabSnapshot) -> Cell:
@@ -491,87 +2273,55 @@ def _left_cell(active: TabSnapshot) -> Cell:
     return Cell(FOLDER_ICON, text, color=LEFT_COLOR)
 
 
-def _right_cells(repo: RepoSnapshot | None, active: TabSnapshot | None) -> list[Cell]:
+def _right_cells(repo: RepoSnapshot | None, active: TabSnapshot | None, clock: str) -> list[Cell]:
     cells: list[Cell] = []
     if repo is not None and repo.branch:
+        divergence = ""
+        if repo.ahead or repo.behind:
+            divergence = " " + (f"{AHEAD_ICON}{repo.ahead}" if repo.ahead else "") + (f"{BEHIND_ICON}{repo.behind}" if repo.behind else "")
         dirty = f" {DIRTY_ICON}" if repo.dirty else ""
-        cells.append(Cell(BRANCH_ICON, f"{repo.branch}{dirty}", color=RIGHT_COLOR))
+        cells.append(Cell(BRANCH_ICON, f"{repo.branch}{divergence}{dirty}", color=RIGHT_COLOR))
         if repo.pr_number:
-            cells.append(Cell(PR_ICON, f"#{repo.pr_number}", color=RIGHT_COLOR))
+            cells.append(Cell(PR_ICON, f"#{repo.pr_number}", color=DIM_COLOR if repo.pr_stale else RIGHT_COLOR))
+            if repo.checks or repo.review:
+                cells.append(_checks_cell(repo))
         elif repo.loading:
             cells.append(Cell(PR_ICON, LOADING_ICON, color=RIGHT_COLOR))
-    cells.append(Cell(CLOCK_ICON, time.strftime("%H:%M"), color=DIM_COLOR))
+    cells.append(Cell(CLOCK_ICON, clock, color=DIM_COLOR))
     return cells
 
 
-def _layout_width(cells: list[Cell], sizes: list[int]) -> int:
-    """sizes に従って中央タブ群を描画したときの総幅 (セパレータ込み) を返す。
-
-    sizes[i] は cell.draw に渡す max_size。負値はそのセルを非表示にする。
-    """
-    total = 0
-    first = True
-    for cell, size in zip(cells, sizes):
-        if size < 0:
-            continue
-        width = cell.length(size)
-        if width <= 0:
-            continue
-        total += width + (0 if first else 1)
-        first = False
-    return total
+def _checks_cell(repo: RepoSnapshot) -> Cell:
+    """PR の CI を icon に、review の判定を省略可能な text にした chip。"""
+    if repo.pr_stale:
+        color = DIM_COLOR
+    elif repo.checks == "failure" or repo.review == "changes":
+        color = ERR_COLOR
+    elif repo.checks == "pending":
+        color = YELLOW
+    else:
+        color = OK_COLOR if repo.checks == "success" else DIM_COLOR
+    return Cell(CHECK_ICONS.get(repo.checks or "", CHECK_NONE_ICON), repo.review or "", color=color)
 
 
-def _center_layout(cells: list[Cell], max_width: int) -> tuple[list[int], int]:
-    """中央タブ群の各セルに割り当てる max_size のリストと総幅を返す。
+def _draw_center(
+    out: RenderList, cells: list[Cell], sizes: list[int], window: tuple[int, int], ranges: dict[int, tuple[int, int] | None]
+) -> None:
+    """窓の中の中央タブ群を積みつつ、各タブのセル範囲を ranges に記録する。
 
-    優先順位 (= 中央をできる限り表示する戦略):
-      1. 全タブをフル名で表示できるならそうする
-      2. 入らないなら、全タブ一律に name を k 桁 (NAME_ABBREV..1) まで詰めて最大 k で表示
-      3. それでも入らないなら icon のみ (index + AI マーカーは残る)
-      4. 限界ならアクティブタブのみ表示
+    窓の外のタブは ranges に載せない (draw_tab は幅 0 のタブとして扱う)。
     """
-    n = len(cells)
-    if n == 0:
-        return [], 0
-
-    sizes = [FULL_SIZE] * n
-    total = _layout_width(cells, sizes)
-    if total <= max_width:
-        return sizes, total
-
-    for k in range(NAME_ABBREV, 0, -1):
-        sizes = [cell.text_length_overhead + k for cell in cells]
-        total = _layout_width(cells, sizes)
-        if total <= max_width:
-            return sizes, total
-
-    sizes = [0] * n
-    total = _layout_width(cells, sizes)
-    if total <= max_width:
-        return sizes, total
-
-    sizes = [-1] * n
-    if cells[active_index].length(FULL_SIZE) <= max_width:
-        sizes[active_index] = FULL_SIZE
-        return sizes, cells[active_index].length(FULL_SIZE)
-    sizes[active_index] = 0
-    return sizes, cells[active_index].length(0)
-
-
-def _draw_center(screen: Screen, cells: list[Cell], sizes: list[int]) -> None:
-    """中央タブ群を描画しつつ、各タブのセル範囲を center_tab_ranges に記録する。"""
-    first = True
-    for cell, snapshot, size in zip(cells, tab_snapshots, sizes):
-        if size < 0:
-            center_tab_ranges[snapshot.index] = None
-            continue
-        if not first:
-            screen.draw(" ")
-        start = screen.cursor.x
-        cell.draw(screen, size)
-        center_tab_ranges[snapshot.index] = (start, screen.cursor.x)
-        first = False
+    lo, hi = window
+    if lo > 0:
+        out.put(DIM_COLOR, BAR_BG, False, f"{OVERFLOW_LEFT}{lo} ")
+    for i in range(lo, hi + 1):
+        if i > lo:
+            out.pad(1)
+        start = out.mark()
+        cells[i].draw(out, sizes[i])
+        ranges[tab_snapshots[i].index] = (start, out.mark())
+    if hi < len(cells) - 1:
+        out.put(DIM_COLOR, BAR_BG, False, f" {len(cells) - 1 - hi}{OVERFLOW_RIGHT}")
 
 
 def _cells_width(cells: list[Cell], max_width: int) -> int:
@@ -583,7 +2333,7 @@ def _cells_width(cells: list[Cell], max_width: int) -> int:
     return width
 
 
-def draw_right(screen: Screen, cells: list[Cell], max_width: int) -> None:
+def draw_right(out: RenderList, cells: list[Cell], max_width: int, columns: int) -> None:
     visible: list[tuple[Cell, int]] = []
     total = 0
     for cell in cells:
@@ -598,75 +2348,476 @@ def draw_right(screen: Screen, cells: list[Cell], max_width: int) -> None:
 
     if total <= 0:
         return
-    offset = max(0, screen.columns - total - screen.cursor.x)
-    screen.draw(" " * offset)
+    out.pad_to(columns - total)
     for idx, (cell, max_cell) in enumerate(visible):
         if idx:
-            screen.draw(" ")
-        cell.draw(screen, max_cell)
+            out.pad(1)
+        cell.draw(out, max_cell)
+
+
+def _persisted_status(status: RepoStatus) -> RepoStatus:
+    return {field: status[field] for field in PERSISTED_FIELDS if field in status}
+
+
+def _read_cache_file() -> dict[str, Any] | None:
+    try:
+        data = json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return None
+    return data
+
+
+def _merge_cache(data: dict[str, Any]) -> bool:
+    """他プロセスが書いた結果のうち、手元より新しいものだけを取り込む。"""
+    changed = False
+    repos = data.get("repos")
+    for key, status in (repos.items() if isinstance(repos, dict) else ()):
+        if not isinstance(status, dict):
+            continue
+        current = repo_cache.get(key)
+        if current is not None and float(current.get("updated_at", 0)) >= float(status.get("updated_at", 0)):
+            continue
+        repo_cache[key] = {**(current or {}), **_persisted_status(status)}
+        changed = True
+    indexes = data.get("pr_indexes")
+    for key, entry in (indexes.items() if isinstance(indexes, dict) else ()):
+        if not isinstance(entry, list) or len(entry) != 2 or not isinstance(entry[1], dict):
+            continue
+        current_index = pr_indexes.get(key)
+        if current_index is not None and current_index[0] >= float(entry[0]):
+            continue
+        pr_indexes[key] = (float(entry[0]), entry[1])
+        changed = True
+    return changed
+
+
+def _load_persistent_cache() -> bool:
+    global cache_mtime_ns
+    try:
+        mtime_ns = CACHE_FILE.stat().st_mtime_ns
+    except OSError:
+        return False
+    if mtime_ns == cache_mtime_ns:
+        return False
+    cache_mtime_ns = mtime_ns
+    data = _read_cache_file()
+    return _merge_cache(data) if data is not None else False
+
+
+def _write_persistent_cache() -> None:
+    """他プロセスの書き込みと merge してから、一時ファイル + rename で原子的に置き換える。"""
+    global cache_mtime_ns
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(CACHE_FILE.with_suffix(".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = _read_cache_file()
+        if data is not None:
+            _merge_cache(data)
+        repos = sorted(repo_cache.items(), key=lambda item: float(item[1].get("updated_at", 0)), reverse=True)
+        payload = {
+            "version": CACHE_VERSION,
+            "repos": {key: _persisted_status(status) for key, status in repos[:CACHE_MAX_REPOS] if status.get("updated_at")},
+            "pr_indexes": {key: [fetched_at, index] for key, (fetched_at, index) in list(pr_indexes.items())},
+        }
+        tmp = CACHE_FILE.with_name(f".{CACHE_FILE.name}.{os.getpid()}")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, CACHE_FILE)
+        cache_mtime_ns = CACHE_FILE.stat().st_mtime_ns
+
+
+def _sync_persistent_cache() -> bool:
+    global cache_pending, cache_written_at
+    try:
+        changed = _load_persistent_cache()
+        now = time.time()
+        if cache_pending and now - cache_written_at >= CACHE_WRITE_INTERVAL:
+            cache_pending = False
+            cache_written_at = now
+            _write_persistent_cache()
+    except Exception:
+        return False
+    return changed
+
+
+def _visible_status(status: RepoStatus) -> tuple[Any, ...]:
+    pr_number = status.get("pr_number")
+    return (
+        status.get("branch"),
+        bool(status.get("dirty")),
+        status.get("ahead"),
+        status.get("behind"),
+        pr_number,
+        status.get("pr_state"),
+        bool(status.get("loading")) and not pr_number,
+    )
 
 
 def _drain_results() -> bool:
+    global cache_pending
     changed = False
     while True:
         try:
             key, status = result_queue.get_nowait()
         except queue.Empty:
             break
+        cache_pending = True
         previous = repo_cache.get(key, {})
-        repo_cache[key] = {**previous, **status, "loading": False}
-        in_flight.discard(key)
-        changed = True
+        current = {**previous, **status, "loading": False}
+        if status.get("updated_at") and not status.get("error_at") and previous.get("updated_at"):
+            _adapt_interval(key, previous, current)
+        repo_cache[key] = current
+        in_flight.pop(key, None)
+        # 取り直しても表示が変わらないなら tab bar を dirty にしない。
+        changed = changed or _visible_status(previous) != _visible_status(current)
     return changed
 
 
-def redraw_tab_bar(_: float) -> None:
-    global clock_minute
+def _drain_pending() -> bool:
+    """監視イベント・worker の結果・他プロセスのキャッシュを取り込み、表示が変わるかを返す。"""
+    global watch_polled_at, watch_interval, checks_changed, cache_pending, pr_stale_shown
     changed = _drain_results()
-    minute = time.strftime("%H:%M")
-    if minute != clock_minute:
-        clock_minute = minute
+    # gh_breaker は worker / 一括取得の thread で開閉する。PR を薄く表示するかは repo ごとの status ではなく
+    # breaker で決まるので、_visible_status とは別にここで開閉を拾って描き直させる。
+    if gh_breaker.is_open() != pr_stale_shown:
+        pr_stale_shown = not pr_stale_shown
+        changed = True
+    if checks_changed:
+        checks_changed = False
+        cache_pending = True
         changed = True
+    now = time.time()
+    # watch_interval 後に張った timer が僅かに早く発火しても読み飛ばさないよう、poll 1 回分の余裕を見る。
+    if now - watch_polled_at >= watch_interval - RESULT_POLL_INTERVAL:
+        watch_polled_at = now
+        if _drain_watch_events():
+            watch_interval = WATCH_POLL_INTERVAL
+            changed = True
+        else:
+            watch_interval = min(watch_interval * 2, WATCH_POLL_MAX_INTERVAL)
+        changed = _expire_agent_states() or changed
+        changed = _sync_persistent_cache() or changed
+        changed = _expire_repo_state(now) or changed
+    return changed
+
+
+def _forget_repo(key: str) -> None:
+    repo_cache.pop(key, None)
+    tab_bar_git.forget(key)
+    head_cache.pop(key, None)
+    if key in watched_repos:
+        del watched_repos[key]
+        if watcher is not None:
+            watcher.unwatch(key)
+
+
+def _expire_repo_state(now: float) -> bool:
+    """期限切れの in_flight を回収し、repo_cache などを件数と経過時間で上限内に収める。
+
+    worker が結果を返さずに止まっても、期限を過ぎれば止まった worker の代わりを起こし、次の描画で要求し直せる。
+    表示中の repo と結果待ちの repo は捨てない。
+    """
+    changed = False
+    expired = [key for key, deadline in in_flight.items() if deadline <= now]
+    for key in expired:
+        del in_flight[key]
+        stats.incr("in_flight.expired")
+        cached = repo_cache.get(key)
+        if cached is not None and cached.get("loading"):
+            cached["loading"] = False
+            changed = True
+    if expired:
+        _ensure_workers()
+
+    keep = {active_repo_key, *tracked_keys, *in_flight}
+    for _ in range(len(repo_cache)):
+        key, status = next(iter(repo_cache.items()))
+        used_at = float(status.get("used_at") or status.get("updated_at") or 0)
+        if len(repo_cache) <= REPO_CACHE_SIZE and now - used_at < REPO_CACHE_MAX_AGE:
+            break
+        if key in keep:
+            repo_cache.move_to_end(key)
+            continue
+        _forget_repo(key)
+        stats.incr("repo_cache.evicted")
+
+    # repository 単位のキャッシュ。PR 表は期限で、ファイル由来のものは件数で抑える。
+    for key in [key for key, (fetched_at, _) in pr_indexes.items() if now - fetched_at >= REPO_CACHE_MAX_AGE]:
+        if key != active_common_key and key not in tracked_keys:
+            del pr_indexes[key]
+    for lookup in [lookup for lookup, (looked_up_at, _) in pr_lookups.items() if now - looked_up_at >= PR_LOOKUP_TTL]:
+        del pr_lookups[lookup]
+    tab_bar_git.trim_caches(repo_cache, REPO_CACHE_SIZE)
+    if len(github_remotes) > REPO_CACHE_SIZE:
+        github_remotes.clear()
+    return changed
+
+
+def _mark_tab_bar_dirty() -> None:
     boss = get_boss()
     tm = boss.active_tab_manager if boss is not None else None
-    if changed and tm is not None:
+    if tm is not None:
         tm.mark_tab_bar_dirty()
 
 
-def _draw_all(screen: Screen) -> None:
-    if not tab_snapshots:
+def _poll_interval() -> float | None:
+    if in_flight or checks_fetching:
+        return RESULT_POLL_INTERVAL
+    intervals = []
+    # エージェント状態の置き場は常に監視しているが、状態を持つエージェントが居ない間はそのために起きない。
+    # 最初の書き込みはタイトル変化などの次の描画で拾う。focus が無い間も起きず、focus を得たときにまとめて読む。
+    if watcher is not None and app_focused and (watched_repos or agent_states):
+        intervals.append(max(RESULT_POLL_INTERVAL, watch_polled_at + watch_interval - time.time()))
+    if tab_repos_backlog and REPO_STATUS_SCOPE == "all":
+        intervals.append(TAB_REPO_INTERVAL)
+    refresh_at = _next_refresh_at()
+    if refresh_at is not None:
+        # 描画が無くても、期限の来た repo を取り直しに起きる。
+        intervals.append(max(TAB_REPO_INTERVAL, refresh_at - time.time()))
+    if checks_pending and app_focused:
+        # 実行中の check がある間は、描画が無くても次の一括取得の期限に起きる。
+        intervals.append(max(RESULT_POLL_INTERVAL, checks_scheduled_at + CHECKS_PENDING_INTERVAL - time.time()))
+    if cache_pending:
+        intervals.append(CACHE_WRITE_INTERVAL)
+    return min(intervals, default=None)
+
+
+def _schedule_poll() -> None:
+    """_poll_interval() が起きる理由を返したときだけ one-shot timer を張る。張ってある timer より早く起きる必要が出たら張り直す。
+
+    worker の結果待ちの間は RESULT_POLL_INTERVAL ごとに起きる。監視中の repo や状態を通知しているエージェントが
+    あるときは、前回監視イベントを読んでから watch_interval 後 (変化が無い間は倍々に延びる) に起きる。
+    ほかに取り直しの期限、check の期限、未書き込みのキャッシュの書き出しに起きる。
+    """
+    global poll_timer_id, poll_due_at
+    interval = _poll_interval()
+    if interval is None:
         return
+    due_at = time.monotonic() + interval
+    if poll_timer_id is not None:
+        if poll_due_at <= due_at:
+            return
+        remove_timer(poll_timer_id)
+    poll_timer_id = add_timer(_on_poll, interval, False)
+    poll_due_at = due_at
 
-    active = tab_snapshots[active_index] if 0 <= active_index < len(tab_snapshots) else tab_snapshots[0]
-    repo = _repo_snapshot(active)
-    left = _left_cell(active)
-    center_cells = [_tab_cell(snapshot) for snapshot in tab_snapshots]
-    right_cells = _right_cells(repo, active)
 
-    screen.cursor.x = 0
-    screen.cursor.bg = BAR_BG
-    screen.cursor.fg = FG
+def _on_poll(_: int) -> None:
+    global poll_timer_id
+    poll_timer_id = None
+    stats.incr("wakeup.poll")
+    if _drain_pending():
+        _mark_tab_bar_dirty()
+    _refresh_repos()
+    _schedule_checks()
+    _schedule_poll()
+
+
+def _schedule_clock() -> None:
+    """次の分の境界で 1 回だけ発火する timer。時計の更新以外では起こさない。"""
+    global clock_timer_id
+    if clock_timer_id is None:
+        clock_timer_id = add_timer(_on_clock, 60.05 - time.time() % 60, False)
+
+
+def _on_clock(_: int) -> None:
+    global clock_timer_id
+    clock_timer_id = None
+    stats.incr("wakeup.clock")
+    _drain_pending()
+    _mark_tab_bar_dirty()
+    _schedule_clock()
+    _schedule_poll()
 
-    left_max = min(36, max(8, screen.columns // 4))
+
+def _shutdown() -> None:
+    """新しい tab_bar.py に置き換えられるときに、前のモジュールとして呼ばれる。
+
+    timer を外し、worker と子プロセスのループを止め、inotify fd と commit-graph の mmap を閉じる。
+    未書き込みのキャッシュは書いておき、新しいモジュールが読み継ぐ。
+    """
+    global retired, clock_timer_id, poll_timer_id, watcher
+    retired = True
+    for timer_id in (clock_timer_id, poll_timer_id):
+        if timer_id is not None:
+            try:
+                remove_timer(timer_id)
+            except Exception:
+                pass
+    clock_timer_id = poll_timer_id = None
+    for _ in workers:
+        work_queue.put((-1, -next(work_seq), "", Path(), Path()))
+    workers.clear()
+    supervisor.close()
+    if watcher is not None:
+        watcher.close()
+        watcher = None
+    watched_repos.clear()
+    tab_bar_git.close()
+    if cache_pending:
+        try:
+            _write_persistent_cache()
+        except Exception:
+            pass
+
+
+class BarLayout:
+    """_draw_all が計算したレイアウト。入力の fingerprint が同じなら描画だけやり直す。"""
+
+    __slots__ = (
+        "fingerprint",
+        "left",
+        "left_max",
+        "center_cells",
+        "sizes",
+        "window",
+        "center_start",
+        "right_cells",
+        "runs",
+        "ranges",
+        "exact",
+    )
+
+    def __init__(
+        self,
+        fingerprint: tuple[Any, ...],
+        left: Cell,
+        left_max: int,
+        center_cells: list[Cell],
+        sizes: list[int],
+        center_start: int,
+        right_cells: list[Cell],
+    ) -> None:
+        self.fingerprint = fingerprint
+        self.left = left
+        self.left_max = left_max
+        self.center_cells = center_cells
+        self.sizes = sizes
+        self.window = tab_bar_text.visible_window(sizes)
+        self.center_start = center_start
+        self.right_cells = right_cells
+        # 初回の描画で積んだ run 列と中央タブのセル範囲。fingerprint が同じ間はこれを書き直すだけで済む。
+        self.runs: list[list[Any]] | None = None
+        self.ranges: dict[int, tuple[int, int] | None] = {}
+        # runs を exact (境界で切り、実際の cursor.x に合わせ直したもの) で積み直したか。
+        self.exact = False
+
+
+def _fingerprint(columns: int, repo: RepoSnapshot | None, clock: str) -> tuple[Any, ...]:
+    # タブ側の変化は tabs_version に畳み込まれているので、タブ数に比例するタプルは作らない。
+    if repo is None:
+        return (columns, active_index, clock, tabs_version)
+    return (
+        columns,
+        active_index,
+        clock,
+        tabs_version,
+        repo.key,
+        repo.branch,
+        repo.dirty,
+        repo.ahead,
+        repo.behind,
+        repo.pr_number,
+        repo.checks,
+        repo.review,
+        repo.pr_stale,
+        repo.loading,
+    )
+
+
+def _compute_layout(columns: int, active: TabSnapshot, repo: RepoSnapshot | None, clock: str, fingerprint: tuple[Any, ...]) -> BarLayout:
+    left = _left_cell(active)
+    center_cells = [snapshot.cell for snapshot in tab_snapshots]
+    right_cells = _right_cells(repo, active, clock)
+
+    left_max = min(36, max(8, columns // 4))
     left_width = left.length(left_max)
-    right_budget = max(0, screen.columns - max(left_width + 2, screen.columns // 2))
+    right_budget = max(0, columns - max(left_width + 2, columns // 2))
     right_width = min(_cells_width(right_cells, right_budget), right_budget)
-    center_max = max(0, screen.columns - left_width - right_width - 4)
-    sizes, center_width = _center_layout(center_cells, center_max)
+    center_max = max(0, columns - left_width - right_width - 4)
+    sizes, center_width = tab_bar_text.center_layout(
+        center_cells, center_max, active_index, NAME_ABBREV, CENTER_LAYOUT_MODE
+    )
 
-    center_start = max(left_width + 1, (screen.columns - center_width) // 2)
-    right_start = screen.columns - right_width if right_width else screen.columns
+    center_start = max(left_width + 1, (columns - center_width) // 2)
+    right_start = columns - right_width if right_width else columns
     if center_start + center_width >= right_start:
         center_start = max(left_width + 1, right_start - center_width - 1)
+    return BarLayout(fingerprint, left, left_max, center_cells, sizes, center_start, right_cells)
 
-    left.draw(screen, left_max)
-    if screen.cursor.x < center_start:
-        screen.draw(" " * (center_start - screen.cursor.x))
-    _draw_center(screen, center_cells, sizes)
-    draw_right(screen, right_cells, max(0, screen.columns - screen.cursor.x - 1))
 
-    if screen.cursor.x < screen.columns:
-        screen.draw(" " * (screen.columns - screen.cursor.x))
+def _draw_all(screen: Screen) -> None:
+    global last_layout
+    if not tab_snapshots:
+        return
+
+    started = time.perf_counter()
+    active = tab_snapshots[active_index] if 0 <= active_index < len(tab_snapshots) else tab_snapshots[0]
+    repo = _repo_snapshot(active)
+    clock = time.strftime("%H:%M")
+    fingerprint = _fingerprint(screen.columns, repo, clock)
+    layout = last_layout
+    if layout is None or layout.fingerprint != fingerprint:
+        layout = _compute_layout(screen.columns, active, repo, clock, fingerprint)
+        last_layout = layout
+        stats.incr("layout.computed")
+    else:
+        stats.incr("layout.reused")
+
+    if layout.runs is None:
+        _render(layout, screen.columns)
+    screen.cursor.x = 0
+    if not _flush_runs(screen, layout.runs) and not layout.exact:
+        # kitty の文字幅が tab_bar_text.text_width と食い違った (絵文字の表示幅など)。境界で run を切って描き直し、
+        # 中央タブの範囲と列揃えの空白を実際の cursor.x に合わせる。この layout の間は合わせ直した run 列を使う。
+        stats.incr("layout.realigned")
+        _render(layout, screen.columns, exact=True)
+        screen.cursor.x = 0
+        actual = _align_runs(screen, layout.runs)
+        layout.ranges = {
+            index: None if rng is None else (actual.get(rng[0], rng[0]), actual.get(rng[1], rng[1]))
+            for index, rng in layout.ranges.items()
+        }
+    center_tab_ranges.update(layout.ranges)
+    stats.observe("draw", time.perf_counter() - started)
+
+
+def _render(layout: BarLayout, columns: int, exact: bool = False) -> None:
+    out = RenderList(exact)
+    layout.left.draw(out, layout.left_max)
+    out.pad_to(layout.center_start)
+    _draw_center(out, layout.center_cells, layout.sizes, layout.window, layout.ranges)
+    draw_right(out, layout.right_cells, max(0, columns - out.x - 1), columns)
+    out.pad_to(columns)
+    layout.runs = out.runs
+    layout.exact = exact
+
+
+def stats_snapshot() -> dict[str, Any]:
+    """kittens/tab_bar_stats.py 向け。計測値に現在のキュー深さやキャッシュ規模を添えて返す。"""
+    snapshot = stats.snapshot()
+    counters = snapshot["counters"]
+    hits = counters.get("repo_cache.hit", 0)
+    lookups = hits + counters.get("repo_cache.miss", 0)
+    snapshot["gauges"].update(
+        {
+            "in_flight": len(in_flight),
+            "result_queue": result_queue.qsize(),
+            "work_queue": work_queue.qsize(),
+            "workers_alive": sum(1 for thread in workers if thread.is_alive()),
+            "subprocess_commands": len(supervisor.running),
+            "tracked_keys": len(tracked_keys),
+            "repo_cache": len(repo_cache),
+            "watched_repos": len(watched_repos),
+            "pr_indexes": len(pr_indexes),
+            "tab_meta": len(tab_meta),
+            "agent_states": len(agent_states),
+        }
+    )
+    snapshot["repo_cache_hit_rate"] = round(hits / lookups, 3) if lookups else None
+    snapshot["gh_breaker"] = gh_breaker.snapshot()
+    return snapshot
 
 
 def draw_tab(
@@ -679,10 +2830,16 @@ def draw_tab(
     is_last: bool,
     extra_data: ExtraData,
 ) -> int:
-    global active_index, tab_snapshots, layout_snapshots, center_tab_ranges, timer_id
+    global active_index, tab_snapshots, layout_snapshots, layout_ready, tabs_version, watch_interval
+
+    if retired:
+        current = sys.modules.get(TAB_BAR_MODULE)
+        forward = getattr(current, "draw_tab", None)
+        if forward is not None and forward is not draw_tab:
+            return forward(draw_data, screen, tab, before, max_title_length, index, is_last, extra_data)
 
-    if timer_id is None:
-        timer_id = add_timer(redraw_tab_bar, REFRESH_TIME, True)
+    if clock_timer_id is None:
+        _schedule_clock()
 
     # kitty は update() で「レイアウト計測パス (for_layout=True)」→「実描画パス」の順に
     # 全タブを 2 周する。レイアウトパスで全 TabSnapshot を集めておき、実描画パスの先頭
@@ -690,16 +2847,46 @@ def draw_tab(
     # セル終端 x」を返せるようになり、kitty のクリック判定 (tab_id_at) が正しく機能する。
     if getattr(extra_data, "for_layout", False):
         if index == 1:
-            layout_snapshots = []
-        cwd, exe, oldest_exe = _tab_accessor_snapshot(tab)
-        layout_snapshots.append(TabSnapshot(index, tab, cwd, exe, oldest_exe))
+            layout_snapshots.clear()
+            layout_ready = True
+            _watch_agent_states()
+            _sync_agent_states()
+        cwd, exe, oldest_exe, window_ids = _cached_tab_meta(tab)
+        agent = _agent_for(window_ids) if agent_states else None
+        badge = _tab_badge(cwd) if REPO_STATUS_SCOPE == "all" else ""
+        record = tab_records.get(tab.tab_id)
+        if record is None:
+            record = tab_records[tab.tab_id] = TabSnapshot(tab.tab_id)
+        if record.update(index, tab, cwd, exe, oldest_exe, agent, badge):
+            tabs_version += 1
+            # タブが変わった (= 操作されている) 間は、監視イベントも最小間隔で読む。
+            watch_interval = WATCH_POLL_INTERVAL
+        layout_snapshots.append(record)
         return screen.cursor.x
 
     if index == 1:
-        tab_snapshots = list(layout_snapshots)
+        if layout_ready:
+            layout_ready = False
+            if layout_snapshots != tab_snapshots:
+                tabs_version += 1
+            # 2 本のリストを入れ替えて使い回す。次のレイアウトパスは古い方を clear() して詰め直す。
+            tab_snapshots, layout_snapshots = layout_snapshots, tab_snapshots
         active_index = next((i for i, s in enumerate(tab_snapshots) if s.is_active), 0)
-        center_tab_ranges = {}
+        center_tab_ranges.clear()
+        _drain_pending()
+        if len(tab_records) > len(tab_snapshots):
+            live = {snapshot.tab_id for snapshot in tab_snapshots}
+            for tab_id in [tab_id for tab_id in tab_records if tab_id not in live]:
+                del tab_records[tab_id]
+        if len(tab_meta) > len(tab_snapshots):
+            live = {snapshot.tab_id for snapshot in tab_snapshots}
+            for tab_id in [tab_id for tab_id in tab_meta if tab_id not in live]:
+                del tab_meta[tab_id]
         _draw_all(screen)
+        if REPO_STATUS_SCOPE == "all":
+            _schedule_tab_repos()
+        _schedule_checks()
+        _schedule_poll()
 
     # 実描画は index==1 で完了済み。各タブは記録済みのセル範囲の終端 x を返し、
     # cursor.x をそこへ移すことで kitty に連続したクリック領域を構築させる。
@@ -0,0 +1,1175 @@
+"""tab_bar.py が git を起動せずに読む repository の状態。
+
+HEAD / config / index (split index を含む) / refs / loose・pack object / commit-graph / gitignore を
+直接読み、branch・dirty・upstream との ahead/behind を求める。kitty に依存しないので単体で import できる。
+読めない形式に出会ったら None を返し、呼び出し側は git の子プロセスに任せる。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import itertools
+import mmap
+import os
+import re
+import stat
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# upstream との ahead/behind を数える commit walk の上限。超えたら数えずに諦める。
+AHEAD_BEHIND_LIMIT = 2000
+# 全候補が共通祖先になった後も、commit time の前後に備えて余分に辿る歩数 (git の SLOP と同じ)。
+AHEAD_BEHIND_SLOP = 5
+AHEAD_BEHIND_CACHE_SIZE = 256
+# git_dir -> 共通 git dir の件数の上限。
+COMMON_DIRS_CACHE_SIZE = 512
+# index の stat 比較に使ってよい時間 (秒)。超えたら None を返し、timeout 付きの git status に任せる。
+DIRTY_SCAN_BUDGET = 0.1
+# 経過時間を確かめる間隔 (index エントリ数)。
+DIRTY_SCAN_CHECK_EVERY = 256
+
+dirty_scanners: dict[str, DirtyScanner] = {}
+# git_dir -> 共通 git dir。commondir は worktree を作った時点で決まり、以後は変わらない。
+common_dirs: dict[str, Path] = {}
+# 共通 git dir -> (packed-refs の (mtime_ns, size, ino), ref -> oid)
+packed_refs_cache: dict[str, tuple[tuple[int, int, int], dict[str, str]]] = {}
+# 共通 git dir -> (commit-graph ファイル群の mtime_ns, CommitGraph | None)
+commit_graphs: dict[str, tuple[tuple[int, ...], "CommitGraph | None"]] = {}
+# (共通 git dir, HEAD oid, upstream oid) -> (ahead, behind) | None。oid が同じなら結果も変わらない。
+ahead_behind_cache: dict[tuple[str, str, str], tuple[int, int] | None] = {}
+
+
+def git_dir_for(root: Path) -> Path | None:
+    dotgit = root / ".git"
+    if dotgit.is_dir():
+        return dotgit
+    if dotgit.is_file():
+        try:
+            text = dotgit.read_text(encoding="utf-8", errors="ignore").strip()
+        except Exception:
+            return None
+        prefix = "gitdir:"
+        if text.startswith(prefix):
+            path = Path(text[len(prefix) :].strip())
+            return path if path.is_absolute() else (root / path).resolve()
+    return None
+
+
+def resolve_repo(path: Path) -> tuple[Path, Path] | None:
+    current = path if path.is_dir() else path.parent
+    for candidate in [current, *current.parents]:
+        git_dir = git_dir_for(candidate)
+        if git_dir is not None:
+            return candidate, git_dir
+    return None
+
+
+def branch_from_git_dir(git_dir: Path) -> str | None:
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8", errors="ignore").strip()
+    except Exception:
+        return None
+    if head.startswith("ref: "):
+        ref = head[5:]
+        for prefix in ("refs/heads/", "refs/remotes/", "refs/tags/", "refs/"):
+            if ref.startswith(prefix):
+                return ref[len(prefix) :]
+        return ref
+    return head[:7] if head else None
+
+
+def common_dir_for(git_dir: Path) -> Path:
+    """linked worktree の git_dir から refs / packed-refs を持つ共通 git dir を返す。
+
+    repository 単位のデータ (PR 表、packed-refs、commit-graph 等) はこれをキーにし、
+    同じ repository の worktree 群で共有する。
+    """
+    key = str(git_dir)
+    cached = common_dirs.get(key)
+    if cached is not None:
+        return cached
+    try:
+        text = (git_dir / "commondir").read_text(encoding="utf-8", errors="ignore").strip()
+    except Exception:
+        text = ""
+    if not text:
+        common = git_dir
+    else:
+        path = Path(text)
+        common = path if path.is_absolute() else (git_dir / path).resolve()
+    if len(common_dirs) >= COMMON_DIRS_CACHE_SIZE:
+        common_dirs.clear()
+    common_dirs[key] = common
+    return common
+
+
+def read_git_config(path: Path) -> dict[str, str]:
+    """git config を `section.subsection.key` -> value の平坦な dict として読む (include は追わない)。"""
+    config: dict[str, str] = {}
+    try:
+        lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+    except Exception:
+        return config
+    section = ""
+    for raw in lines:
+        line = raw.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            header = line[1 : line.find("]")] if "]" in line else line[1:]
+            if '"' in header:
+                name, _, sub = header.partition('"')
+                sub = sub.rstrip('"')
+                section = f"{name.strip().lower()}.{sub}"
+            elif "." in header:
+                name, _, sub = header.partition(".")
+                section = f"{name.strip().lower()}.{sub.strip()}"
+            else:
+                section = header.strip().lower()
+            continue
+        key, sep, value = line.partition("=")
+        value = value.strip() if sep else "true"
+        for marker in (" #", " ;"):
+            if marker in value and not value.startswith('"'):
+                value = value.split(marker, 1)[0].rstrip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        config[f"{section}.{key.strip().lower()}"] = value
+    return config
+
+
+def _global_git_config() -> dict[str, str]:
+    config: dict[str, str] = {}
+    xdg = Path(os.getenv("XDG_CONFIG_HOME") or Path.home() / ".config")
+    for path in (xdg / "git" / "config", Path.home() / ".gitconfig"):
+        config.update(read_git_config(path))
+    return config
+
+
+def _is_true(value: str | None) -> bool:
+    return (value or "").lower() in {"true", "yes", "on", "1"}
+
+
+def _index_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """index v4 のパス接頭辞長 (pack の OFS_DELTA と同じ可変長整数) を読む。"""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+def _ewah_bits(data: bytes) -> list[int]:
+    """split index の EWAH bitmap を、立っている bit 位置のリストに展開する。"""
+    _, word_count = struct.unpack_from(">II", data, 0)
+    words = struct.unpack_from(f">{word_count}Q", data, 8)
+    bits: list[int] = []
+    pos = 0
+    i = 0
+    while i < word_count:
+        rlw = words[i]
+        i += 1
+        running_bit = rlw & 1
+        running_len = (rlw >> 1) & 0xFFFFFFFF
+        literal_len = rlw >> 33
+        if running_bit:
+            bits.extend(range(pos, pos + running_len * 64))
+        pos += running_len * 64
+        for word in words[i : i + literal_len]:
+            while word:
+                low = word & -word
+                bits.append(pos + low.bit_length() - 1)
+                word ^= low
+            pos += 64
+        i += literal_len
+    return bits
+
+
+# IndexEntry = (mtime_s, mtime_ns, ino, mode, size, oid, flags)
+IndexEntry = tuple[int, int, int, int, int, bytes, int]
+INDEX_ASSUME_VALID = 0x8000
+INDEX_EXTENDED = 0x4000
+INDEX_STAGE_MASK = 0x3000
+INDEX_SKIP_WORKTREE = 0x4000 << 16
+INDEX_INTENT_TO_ADD = 0x2000 << 16
+GITLINK_MODE = 0o160000
+SYMLINK_MODE = 0o120000
+
+
+def _parse_index(data: bytes, hash_size: int) -> tuple[list[tuple[str, IndexEntry]], dict[bytes, bytes]] | None:
+    if len(data) < 12 + hash_size or data[:4] != b"DIRC":
+        return None
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        return None
+    entries: list[tuple[str, IndexEntry]] = []
+    pos = 12
+    previous = b""
+    for _ in range(count):
+        start = pos
+        (_, _, mtime_s, mtime_ns, _, ino, mode, _, _, size) = struct.unpack_from(">10I", data, pos)
+        pos += 40
+        oid = data[pos : pos + hash_size]
+        pos += hash_size
+        (flags,) = struct.unpack_from(">H", data, pos)
+        pos += 2
+        if flags & INDEX_EXTENDED:
+            (extended,) = struct.unpack_from(">H", data, pos)
+            pos += 2
+            flags |= extended << 16
+        if version == 4:
+            strip, pos = _index_varint(data, pos)
+            end = data.index(b"\0", pos)
+            name = previous[: len(previous) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b"\0", pos)
+            name = data[pos:end]
+            pos = start + ((end - start) // 8 + 1) * 8
+        previous = name
+        entries.append((os.fsdecode(name), (mtime_s, mtime_ns, ino, mode, size, oid, flags)))
+
+    extensions: dict[bytes, bytes] = {}
+    limit = len(data) - hash_size
+    while pos + 8 <= limit:
+        signature = data[pos : pos + 4]
+        (length,) = struct.unpack_from(">I", data, pos + 4)
+        extensions[signature] = data[pos + 8 : pos + 8 + length]
+        pos += 8 + length
+    return entries, extensions
+
+
+def _cache_tree_root(tree: bytes | None, hash_size: int) -> bytes | None:
+    """TREE 拡張のルートエントリが有効ならその tree oid を返す。"""
+    if not tree:
+        return None
+    try:
+        end = tree.index(b"\n", tree.index(b"\0"))
+        count = int(tree[tree.index(b"\0") + 1 : end].split(b" ")[0])
+    except ValueError:
+        return None
+    if count < 0:
+        return None
+    return tree[end + 1 : end + 1 + hash_size]
+
+
+class GitIndex:
+    """dirty 判定に必要な範囲だけ読み出した .git/index。"""
+
+    def __init__(self, entries: dict[str, IndexEntry], root_tree: bytes | None) -> None:
+        self.entries = entries
+        self.root_tree = root_tree
+        self.dirs: set[str] = {""}
+        self.unmerged = False
+        self.intent_to_add = False
+        # 追跡されている .gitattributes (入れ子のものを含む)。
+        self.attribute_files: list[str] = []
+        for name, entry in entries.items():
+            flags = entry[6]
+            if flags & INDEX_STAGE_MASK:
+                self.unmerged = True
+            if flags & INDEX_INTENT_TO_ADD:
+                self.intent_to_add = True
+            if name == ".gitattributes" or name.endswith("/.gitattributes"):
+                self.attribute_files.append(name)
+            parent, _, _ = name.rpartition("/")
+            while parent and parent not in self.dirs:
+                self.dirs.add(parent)
+                parent, _, _ = parent.rpartition("/")
+
+
+def load_index(git_dir: Path, hash_size: int) -> GitIndex | None:
+    try:
+        data = (git_dir / "index").read_bytes()
+    except FileNotFoundError:
+        return GitIndex({}, None)
+    except Exception:
+        return None
+    parsed = _parse_index(data, hash_size)
+    if parsed is None:
+        return None
+    entries, extensions = parsed
+    if b"sdir" in extensions:
+        # sparse index のディレクトリエントリは展開しない。git status に任せる。
+        return None
+
+    link = extensions.get(b"link")
+    if link is None:
+        merged = dict(entries)
+    else:
+        shared_oid = link[:hash_size].hex()
+        try:
+            shared_data = (git_dir / f"sharedindex.{shared_oid}").read_bytes()
+        except Exception:
+            return None
+        shared = _parse_index(shared_data, hash_size)
+        if shared is None:
+            return None
+        shared_entries = shared[0]
+        bitmaps = link[hash_size:]
+        deleted: set[int] = set()
+        replaced: list[int] = []
+        if bitmaps:
+            delete_size = 12 + struct.unpack_from(">I", bitmaps, 4)[0] * 8
+            deleted = set(_ewah_bits(bitmaps[:delete_size]))
+            replaced = _ewah_bits(bitmaps[delete_size:])
+        # split-index.c の merge_base_index と同じく、split 側の先頭から replace bitmap の bit 数だけが
+        # 名前を省いた置き換えエントリで、bit の立った順に共有 index の位置を置き換える。残りは追加分。
+        if len(replaced) > len(entries) or any(name for name, _ in entries[: len(replaced)]):
+            return None
+        replacements = {position: entry for position, (_, entry) in zip(replaced, entries)}
+        merged = {}
+        for position, (name, entry) in enumerate(shared_entries):
+            if position in deleted:
+                continue
+            merged[name] = replacements.pop(position, entry)
+        if replacements:
+            # 共有 index の範囲外を指す bitmap は壊れている。git status に任せる。
+            return None
+        for name, entry in entries[len(replaced) :]:
+            merged[name] = entry
+    return GitIndex(merged, _cache_tree_root(extensions.get(b"TREE"), hash_size))
+
+
+def _packed_refs(common: Path) -> dict[str, str]:
+    """packed-refs を ref -> oid の dict として読む。ファイルが差し替わるまで使い回す。"""
+    path = common / "packed-refs"
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = packed_refs_cache.get(str(common))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    refs: dict[str, str] = {}
+    try:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+    except Exception:
+        return refs
+    for line in text.splitlines():
+        # "# pack-refs with: ..." ヘッダと、annotated tag の peel 行 (^oid) は読み飛ばす。
+        if not line or line[0] in "#^":
+            continue
+        oid, _, name = line.partition(" ")
+        refs[name] = oid
+    packed_refs_cache[str(common)] = (signature, refs)
+    return refs
+
+
+def _resolve_ref(git_dir: Path, ref: str) -> str | None:
+    """loose ref → packed-refs の順に ref を commit oid (hex) へ解決する。"""
+    common = common_dir_for(git_dir)
+    for _ in range(5):
+        value = None
+        for base in (git_dir, common):
+            try:
+                value = (base / ref).read_text(encoding="utf-8", errors="ignore").strip()
+                break
+            except Exception:
+                continue
+        if value is None:
+            return _packed_refs(common).get(ref)
+        if not value.startswith("ref: "):
+            return value or None
+        ref = value[5:]
+    return None
+
+
+OBJECT_KINDS = {b"commit": 1, b"tree": 2, b"blob": 3, b"tag": 4}
+PACK_OFS_DELTA = 6
+PACK_REF_DELTA = 7
+# delta を復元するために丸ごと展開する object の上限と、辿る delta chain の深さの上限 (git の既定は 50)。
+PACK_DELTA_MAX_SIZE = 1 << 20
+PACK_DELTA_MAX_DEPTH = 64
+# (pack のパス, offset) -> (型, 中身)。同じ base を持つ delta を続けて読むときに展開し直さない。
+pack_object_cache: OrderedDict[tuple[str, int], tuple[int, bytes]] = OrderedDict()
+pack_object_lock = threading.Lock()
+PACK_OBJECT_CACHE_SIZE = 64
+
+
+def read_object_head(common_dir: Path, oid: str, hash_size: int, max_size: int = 4096) -> tuple[int, bytes] | None:
+    """object の型と先頭 max_size バイトを返す。delta 化された pack object は base を辿って復元する。"""
+    loose = common_dir / "objects" / oid[:2] / oid[2:]
+    try:
+        with loose.open("rb") as handle:
+            raw = zlib.decompressobj().decompress(handle.read(max_size), max_size)
+    except FileNotFoundError:
+        raw = None
+    except Exception:
+        return None
+    if raw is not None:
+        header, _, body = raw.partition(b"\0")
+        return OBJECT_KINDS.get(header.split(b" ")[0], 0), body
+
+    found = _find_packed(common_dir, bytes.fromhex(oid), hash_size)
+    if found is None:
+        return None
+    try:
+        return _read_packed(common_dir, found[0], found[1], hash_size, max_size, 0)
+    except (OSError, ValueError, IndexError, zlib.error):
+        return None
+
+
+def _find_packed(common_dir: Path, binary: bytes, hash_size: int) -> tuple[Path, int] | None:
+    """pack index (v2) を二分探索し、object を含む pack と offset を返す。"""
+    for idx_path in (common_dir / "objects" / "pack").glob("*.idx"):
+        try:
+            with idx_path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as idx:
+                if idx[:8] != b"\377tOc\0\0\0\2":
+                    continue
+                lo = struct.unpack_from(">I", idx, 8 + (binary[0] - 1) * 4)[0] if binary[0] else 0
+                hi = struct.unpack_from(">I", idx, 8 + binary[0] * 4)[0]
+                total = struct.unpack_from(">I", idx, 8 + 255 * 4)[0]
+                names = 8 + 1024
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    current = idx[names + mid * hash_size : names + (mid + 1) * hash_size]
+                    if current < binary:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                if lo >= total or idx[names + lo * hash_size : names + (lo + 1) * hash_size] != binary:
+                    continue
+                offsets = names + total * hash_size + total * 4
+                offset = struct.unpack_from(">I", idx, offsets + lo * 4)[0]
+                if offset & 0x80000000:
+                    large = offsets + total * 4 + (offset & 0x7FFFFFFF) * 8
+                    offset = struct.unpack_from(">Q", idx, large)[0]
+                return idx_path.with_suffix(".pack"), offset
+        except Exception:
+            # git gc が書きかけの idx などは読めない。残りの pack を探し続ける。
+            continue
+    return None
+
+
+def _inflate(pack: Any, limit: int) -> bytes:
+    """pack の現在位置から zlib stream を展開し、先頭 limit バイトまでを返す。"""
+    inflater = zlib.decompressobj()
+    out = bytearray()
+    while len(out) < limit and not inflater.eof:
+        data = inflater.unconsumed_tail or pack.read(65536)
+        if not data:
+            break
+        out += inflater.decompress(data, limit - len(out))
+    return bytes(out)
+
+
+def _read_packed(common_dir: Path, pack_path: Path, offset: int, hash_size: int, max_size: int, depth: int) -> tuple[int, bytes] | None:
+    """pack 内 offset の object を読む。OFS_DELTA / REF_DELTA は base を再帰的に復元してから delta を当てる。"""
+    cache_key = (str(pack_path), offset)
+    with pack_object_lock:
+        cached = pack_object_cache.get(cache_key)
+        if cached is not None:
+            pack_object_cache.move_to_end(cache_key)
+    if cached is not None:
+        return cached[0], cached[1][:max_size]
+    with pack_path.open("rb") as pack:
+        pack.seek(offset)
+        # 型と size の可変長整数に、OFS_DELTA の距離か REF_DELTA の base oid が続く。
+        header = pack.read(64)
+        byte = header[0]
+        kind = (byte >> 4) & 7
+        size = byte & 15
+        shift = 4
+        pos = 1
+        while byte & 0x80:
+            byte = header[pos]
+            size |= (byte & 0x7F) << shift
+            shift += 7
+            pos += 1
+        if kind in (1, 2, 3, 4):
+            pack.seek(offset + pos)
+            return kind, _inflate(pack, max_size)
+        if kind not in (PACK_OFS_DELTA, PACK_REF_DELTA) or depth >= PACK_DELTA_MAX_DEPTH or size > PACK_DELTA_MAX_SIZE:
+            return None
+        if kind == PACK_OFS_DELTA:
+            # git の offset encoding: 継続 byte ごとに 1 を足してから 7 bit ずらす。
+            byte = header[pos]
+            pos += 1
+            distance = byte & 0x7F
+            while byte & 0x80:
+                byte = header[pos]
+                pos += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7F)
+            base_location: tuple[Path, int] | None = (pack_path, offset - distance)
+        else:
+            base_oid = header[pos : pos + hash_size]
+            pos += hash_size
+            base_location = _find_packed(common_dir, base_oid, hash_size)
+        pack.seek(offset + pos)
+        delta = _inflate(pack, size)
+    if base_location is None:
+        return None
+    base = _read_packed(common_dir, base_location[0], base_location[1], hash_size, PACK_DELTA_MAX_SIZE, depth + 1)
+    if base is None:
+        return None
+    body = _apply_delta(base[1], delta)
+    if body is None:
+        return None
+    with pack_object_lock:
+        pack_object_cache[cache_key] = (base[0], body)
+        if len(pack_object_cache) > PACK_OBJECT_CACHE_SIZE:
+            pack_object_cache.popitem(last=False)
+    return base[0], body[:max_size]
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes | None:
+    """git の delta (base の範囲を写す copy 命令と、delta 内のバイト列を足す insert 命令の列) を当てる。"""
+    pos = 0
+    sizes = []
+    for _ in range(2):
+        value = 0
+        shift = 0
+        while True:
+            byte = delta[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        sizes.append(value)
+    if sizes[0] != len(base) or sizes[1] > PACK_DELTA_MAX_SIZE:
+        return None
+    out = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            copy_offset = 0
+            copy_size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    copy_offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    copy_size |= delta[pos] << (8 * i)
+                    pos += 1
+            copy_size = copy_size or 0x10000
+            if copy_offset + copy_size > len(base):
+                return None
+            out += base[copy_offset : copy_offset + copy_size]
+        elif op:
+            out += delta[pos : pos + op]
+            pos += op
+        else:
+            return None
+    return bytes(out) if len(out) == sizes[1] else None
+
+
+def _commit_tree(common_dir: Path, oid: str, hash_size: int) -> bytes | None:
+    obj = read_object_head(common_dir, oid, hash_size)
+    if obj is None or obj[0] != 1 or not obj[1].startswith(b"tree "):
+        return None
+    try:
+        return bytes.fromhex(obj[1][5 : 5 + hash_size * 2].decode("ascii"))
+    except ValueError:
+        return None
+
+
+GRAPH_PARENT_NONE = 0x70000000
+GRAPH_EXTRA_EDGES = 0x80000000
+GRAPH_LAST_EDGE = 0x80000000
+# commit-graph に載っていない commit の世代番号。graph 外の commit は graph 内の commit より先に辿る。
+GENERATION_INFINITY = 0xFFFFFFFF
+
+
+class CommitGraph:
+    """objects/info/commit-graph (split chain を含む) から親と世代番号を引く。
+
+    layers は古い順。各 layer の位置は前の layer までの commit 数を足した通し番号で、
+    CDAT の親もこの通し番号で参照される。
+    """
+
+    def __init__(self, layers: list[tuple[mmap.mmap, dict[bytes, int], int]], hash_size: int) -> None:
+        self.hash_size = hash_size
+        self.layers: list[tuple[mmap.mmap, dict[bytes, int], int, int]] = []
+        base = 0
+        for data, chunks, count in layers:
+            self.layers.append((data, chunks, base, count))
+            base += count
+
+    def close(self) -> None:
+        """mmap を閉じる。walk の途中で閉じられた側は ValueError になり、結果を捨てて取り直す。"""
+        for data, *_ in self.layers:
+            data.close()
+
+    def find(self, oid: bytes) -> int | None:
+        size = self.hash_size
+        for data, chunks, base, count in self.layers:
+            fanout = chunks[b"OIDF"]
+            lo = struct.unpack_from(">I", data, fanout + (oid[0] - 1) * 4)[0] if oid[0] else 0
+            hi = struct.unpack_from(">I", data, fanout + oid[0] * 4)[0]
+            names = chunks[b"OIDL"]
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if data[names + mid * size : names + (mid + 1) * size] < oid:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < count and data[names + lo * size : names + (lo + 1) * size] == oid:
+                return base + lo
+        return None
+
+    def _layer(self, pos: int) -> tuple[mmap.mmap, dict[bytes, int], int]:
+        for data, chunks, base, count in self.layers:
+            if pos < base + count:
+                return data, chunks, pos - base
+        raise IndexError(pos)
+
+    def oid(self, pos: int) -> bytes:
+        data, chunks, local = self._layer(pos)
+        names = chunks[b"OIDL"]
+        return data[names + local * self.hash_size : names + (local + 1) * self.hash_size]
+
+    def commit(self, pos: int) -> tuple[int, int, list[int]]:
+        """(世代番号, commit time, 親の位置) を返す。"""
+        data, chunks, local = self._layer(pos)
+        offset = chunks[b"CDAT"] + local * (self.hash_size + 16) + self.hash_size
+        first, second, packed = struct.unpack_from(">IIQ", data, offset)
+        parents = []
+        if first != GRAPH_PARENT_NONE:
+            parents.append(first)
+        if second & GRAPH_EXTRA_EDGES:
+            edges = chunks.get(b"EDGE")
+            index = second & ~GRAPH_EXTRA_EDGES
+            while edges is not None:
+                edge = struct.unpack_from(">I", data, edges + index * 4)[0]
+                parents.append(edge & ~GRAPH_LAST_EDGE)
+                if edge & GRAPH_LAST_EDGE:
+                    break
+                index += 1
+        elif second != GRAPH_PARENT_NONE:
+            parents.append(second)
+        return packed >> 34, packed & ((1 << 34) - 1), parents
+
+
+def _read_graph_layer(path: Path, hash_size: int) -> tuple[mmap.mmap, dict[bytes, int], int] | None:
+    try:
+        with path.open("rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    # version 1 のみ。hash version は 1 = SHA-1, 2 = SHA-256。
+    if data[:4] != b"CGPH" or data[4] != 1 or data[5] != (2 if hash_size == 32 else 1):
+        data.close()
+        return None
+    chunks: dict[bytes, int] = {}
+    for i in range(data[6]):
+        chunk_id, offset = struct.unpack_from(">4sQ", data, 8 + i * 12)
+        chunks[chunk_id] = offset
+    if not {b"OIDF", b"OIDL", b"CDAT"} <= chunks.keys():
+        data.close()
+        return None
+    return data, chunks, struct.unpack_from(">I", data, chunks[b"OIDF"] + 255 * 4)[0]
+
+
+def _commit_graph(common: Path, hash_size: int) -> CommitGraph | None:
+    """commit-graph を mtime で検証しつつ使い回す。split chain があればそちらを優先する。"""
+    info = common / "objects" / "info"
+    chain = info / "commit-graphs" / "commit-graph-chain"
+    signature = []
+    for path in (chain, info / "commit-graph"):
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            signature.append(0)
+    cached = commit_graphs.get(str(common))
+    if cached is not None and cached[0] == tuple(signature):
+        return cached[1]
+
+    if signature[0]:
+        try:
+            names = chain.read_text(encoding="utf-8", errors="ignore").split()
+        except Exception:
+            names = []
+        paths = [info / "commit-graphs" / f"graph-{name}.graph" for name in names]
+    else:
+        paths = [info / "commit-graph"] if signature[1] else []
+    layers = [_read_graph_layer(path, hash_size) for path in paths]
+    if layers and all(layers):
+        graph = CommitGraph(layers, hash_size)  # type: ignore[arg-type]
+    else:
+        graph = None
+        for layer in layers:
+            if layer is not None:
+                layer[0].close()
+    drop_commit_graph(str(common))
+    commit_graphs[str(common)] = (tuple(signature), graph)
+    return graph
+
+
+def drop_commit_graph(key: str) -> None:
+    cached = commit_graphs.pop(key, None)
+    if cached is not None and cached[1] is not None:
+        cached[1].close()
+
+
+def _commit_parents(common: Path, graph: CommitGraph | None, oid: bytes, hash_size: int) -> tuple[int, int, list[bytes]] | None:
+    """(世代番号, commit time, 親 oid) を commit-graph → object の順に引く。"""
+    if graph is not None:
+        pos = graph.find(oid)
+        if pos is not None:
+            generation, when, parents = graph.commit(pos)
+            return generation, when, [graph.oid(parent) for parent in parents]
+    obj = read_object_head(common, oid.hex(), hash_size)
+    if obj is None or obj[0] != 1:
+        return None
+    parents = []
+    when = 0
+    for line in obj[1].split(b"\n"):
+        if not line:
+            break
+        if line.startswith(b"parent "):
+            try:
+                parents.append(bytes.fromhex(line[7 : 7 + hash_size * 2].decode("ascii")))
+            except ValueError:
+                return None
+        elif line.startswith(b"committer "):
+            try:
+                when = int(line.rsplit(b" ", 2)[1])
+            except (IndexError, ValueError):
+                pass
+    return GENERATION_INFINITY, when, parents
+
+
+def _count_ahead_behind(common: Path, head: bytes, upstream: bytes, hash_size: int) -> tuple[int, int] | None:
+    """HEAD と upstream の片側からだけ到達できる commit を数える (git rev-list --left-right --count 相当)。
+
+    世代番号 (graph 外は commit time、同値なら見つけた順) の新しい順に両側から同時に辿り、
+    キューに残る commit がすべて共通祖先になってから AHEAD_BEHIND_SLOP 歩で打ち切る。
+    時刻が前後していて辿り済みの commit に後から別の側が届いた場合は、既知の祖先へも塗り直す。
+    AHEAD_BEHIND_LIMIT 歩を超えたら None。
+    """
+    graph = _commit_graph(common, hash_size)
+    seq = itertools.count()
+    heap: list[tuple[int, int, int, bytes, list[bytes]]] = []
+    flags: dict[bytes, int] = {}
+    parents_of: dict[bytes, list[bytes]] = {}
+
+    def paint(oid: bytes, flag: int) -> bool:
+        stack = [oid]
+        while stack:
+            current = stack.pop()
+            seen = flags.get(current, 0)
+            if seen | flag == seen:
+                continue
+            flags[current] = seen | flag
+            if current in parents_of:
+                stack.extend(parents_of[current])
+            elif not seen:
+                info = _commit_parents(common, graph, current, hash_size)
+                if info is None:
+                    return False
+                heapq.heappush(heap, (-info[0], -info[1], next(seq), current, info[2]))
+        return True
+
+    if not paint(head, 1) or not paint(upstream, 2):
+        return None
+    slop = AHEAD_BEHIND_SLOP
+    for _ in range(AHEAD_BEHIND_LIMIT):
+        if not heap:
+            break
+        if all(flags[entry[3]] == 3 for entry in heap):
+            slop -= 1
+            if slop < 0:
+                break
+        else:
+            slop = AHEAD_BEHIND_SLOP
+        _, _, _, oid, parents = heapq.heappop(heap)
+        parents_of[oid] = parents
+        for parent in parents:
+            if not paint(parent, flags[oid]):
+                return None
+    else:
+        return None
+    ahead = sum(1 for flag in flags.values() if flag == 1)
+    behind = sum(1 for flag in flags.values() if flag == 2)
+    return ahead, behind
+
+
+def _upstream_ref(config: dict[str, str], branch: str) -> str | None:
+    """branch.<name>.remote / merge から upstream の追跡 ref を求める (fetch refspec は既定のものを仮定)。"""
+    remote = config.get(f"branch.{branch}.remote")
+    merge = config.get(f"branch.{branch}.merge")
+    if not remote or not merge:
+        return None
+    if remote == ".":
+        return merge
+    if merge.startswith("refs/heads/"):
+        return f"refs/remotes/{remote}/{merge[len('refs/heads/') :]}"
+    return None
+
+
+def ahead_behind(git_dir: Path) -> tuple[int, int] | None:
+    """HEAD が指す branch と upstream の差分を fork せずに求める。upstream が無ければ None。"""
+    try:
+        head_ref = (git_dir / "HEAD").read_text(encoding="utf-8", errors="ignore").strip()
+    except Exception:
+        return None
+    if not head_ref.startswith("ref: refs/heads/"):
+        return None
+    common = common_dir_for(git_dir)
+    config = read_git_config(common / "config")
+    upstream_ref = _upstream_ref(config, head_ref[len("ref: refs/heads/") :])
+    if upstream_ref is None:
+        return None
+    head = _resolve_ref(git_dir, head_ref[5:])
+    upstream = _resolve_ref(git_dir, upstream_ref)
+    if head is None or upstream is None:
+        return None
+    key = (str(common), head, upstream)
+    if key in ahead_behind_cache:
+        return ahead_behind_cache[key]
+    hash_size = 32 if config.get("extensions.objectformat", "").lower() == "sha256" else 20
+    try:
+        counts = (0, 0) if head == upstream else _count_ahead_behind(common, bytes.fromhex(head), bytes.fromhex(upstream), hash_size)
+    except (ValueError, IndexError, struct.error):
+        # 壊れた commit-graph のほか、walk の途中で差し替えられた graph の mmap が閉じられた場合も含む。
+        # 結果を覚えず、次回取り直す。
+        return None
+    if len(ahead_behind_cache) >= AHEAD_BEHIND_CACHE_SIZE:
+        ahead_behind_cache.clear()
+    ahead_behind_cache[key] = counts
+    return counts
+
+
+def _ignore_regex(pattern: str) -> re.Pattern[str]:
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+# IgnoreRule = (regex, negate, dir_only, anchored, base)。base は .gitignore の置かれた repo 相対ディレクトリ。
+IgnoreRule = tuple[re.Pattern[str], bool, bool, bool, str]
+
+
+def _parse_ignore_file(path: Path, base: str) -> list[IgnoreRule]:
+    try:
+        lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+    except Exception:
+        return []
+    rules: list[IgnoreRule] = []
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        rules.append((_ignore_regex(line.lstrip("/")), negate, dir_only, anchored, base))
+    return rules
+
+
+def _is_ignored(rules: list[IgnoreRule], path: str, name: str, is_dir: bool) -> bool:
+    for regex, negate, dir_only, anchored, base in reversed(rules):
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not path.startswith(base + "/"):
+                continue
+            relative = path[len(base) + 1 :]
+        else:
+            relative = path
+        if regex.match(relative if anchored else name):
+            return not negate
+    return False
+
+
+class DirtyScanner:
+    """git status を fork せずに worktree の dirty 判定を行う repo 単位の状態。
+
+    index の stat 情報と worktree を比較し、最初の差分で打ち切る。一度 hash で中身が
+    同じと確認した stat や、未追跡ファイルが無かったディレクトリの mtime を覚えておき、
+    次回以降は変化した部分だけを調べる。判断できない構成 (sparse index, filter 付き
+    .gitattributes など) や、stat 比較が DIRTY_SCAN_BUDGET に収まらない大きな index では
+    None を返し、呼び出し側は git status にフォールバックする。
+    同じ repo を 2 つの worker が同時に調べることがあるため、状態の読み書きは lock の中で行う。
+    """
+
+    def __init__(self, root: Path, git_dir: Path) -> None:
+        self.root = root
+        self.git_dir = git_dir
+        self.common_dir = common_dir_for(git_dir)
+        self.index_signature: tuple[int, int, int] | None = None
+        self.index: GitIndex | None = None
+        # path -> (mtime_ns, size, ino)。hash で index と同一と確認済みの stat。
+        self.verified: dict[str, tuple[int, int, int]] = {}
+        # dir -> ((dir mtime_ns, .gitignore mtime_ns), 再帰対象の子ディレクトリ)。未追跡なしを確認済み。
+        self.clean_dirs: dict[str, tuple[tuple[int, int], list[str]]] = {}
+        self.ignore_files: dict[Path, tuple[int, list[IgnoreRule]]] = {}
+        self.base_signature: tuple[int, ...] = ()
+        # 今の index では stat 比較が予算を超えた。index が書き換わるまで git status に任せる。
+        self.over_budget = False
+        self.lock = threading.Lock()
+
+    def _stat_signature(self, path: Path) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _load_config(self) -> dict[str, str]:
+        config = _global_git_config()
+        config.update(read_git_config(self.common_dir / "config"))
+        return config
+
+    def _refresh_index(self, hash_size: int) -> GitIndex | None:
+        try:
+            st = os.stat(self.git_dir / "index")
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            signature = (0, 0, 0)
+        if signature != self.index_signature or self.index is None:
+            self.index = load_index(self.git_dir, hash_size)
+            self.index_signature = signature
+            self.clean_dirs.clear()
+            self.over_budget = False
+        return self.index
+
+    def dirty(self) -> bool | None:
+        with self.lock:
+            return self._dirty()
+
+    def _dirty(self) -> bool | None:
+        config = self._load_config()
+        hash_size = 32 if config.get("extensions.objectformat", "").lower() == "sha256" else 20
+        index = self._refresh_index(hash_size)
+        if index is None or self.over_budget:
+            return None
+
+        if index.unmerged or index.intent_to_add:
+            return True
+        head = _resolve_ref(self.git_dir, "HEAD")
+        if head is None:
+            if index.entries:
+                return True
+        else:
+            if index.root_tree is None:
+                return None
+            tree = _commit_tree(self.common_dir, head, hash_size)
+            if tree is None:
+                return None
+            if tree != index.root_tree:
+                return True
+
+        modified = self._modified(index, config, hash_size)
+        if modified is not False:
+            return modified
+        if config.get("status.showuntrackedfiles", "").lower() == "no":
+            return False
+        return self._untracked(index, config)
+
+    def _hash_unreliable(self, config: dict[str, str]) -> bool:
+        if config.get("core.autocrlf", "false").lower() not in {"false", "0", "no", "off"}:
+            return True
+        index = self.index
+        names = {".gitattributes", *(index.attribute_files if index is not None else ())}
+        for path in [*(self.root / name for name in sorted(names)), self.common_dir / "info" / "attributes"]:
+            try:
+                text = path.read_text(encoding="utf-8", errors="ignore")
+            except Exception:
+                continue
+            if any(token in text for token in ("filter=", "eol=", "text", "ident", "working-tree-encoding")):
+                return True
+        return False
+
+    def _modified(self, index: GitIndex, config: dict[str, str], hash_size: int) -> bool | None:
+        trust_mode = _is_true(config.get("core.filemode", "true"))
+        index_mtime = self.index_signature[0] if self.index_signature else 0
+        hash_checked = None
+        deadline = time.monotonic() + DIRTY_SCAN_BUDGET
+        for count, (name, (mtime_s, mtime_ns, ino, mode, size, oid, flags)) in enumerate(index.entries.items(), 1):
+            if count % DIRTY_SCAN_CHECK_EVERY == 0 and time.monotonic() > deadline:
+                self.over_budget = True
+                return None
+            if flags & (INDEX_ASSUME_VALID | INDEX_SKIP_WORKTREE) or mode == GITLINK_MODE:
+                continue
+            try:
+                st = os.lstat(os.path.join(self.root, name))
+            except OSError:
+                return True
+            if mode == SYMLINK_MODE:
+                if not stat.S_ISLNK(st.st_mode):
+                    return True
+            elif not stat.S_ISREG(st.st_mode):
+                return True
+            elif trust_mode and (mode & 0o100) != (st.st_mode & 0o100):
+                return True
+            # git は racily clean なエントリの size を 0 にして書き戻す (smudge)。0 のときは size で判定せず hash まで進む。
+            if size and (st.st_size & 0xFFFFFFFF) != size:
+                return True
+            st_mtime_ns = st.st_mtime_ns
+            racy = st_mtime_ns >= index_mtime
+            if (
+                not racy
+                and st_mtime_ns // 1_000_000_000 == mtime_s
+                and st_mtime_ns % 1_000_000_000 == mtime_ns
+                and (st.st_ino & 0xFFFFFFFF) == ino
+            ):
+                continue
+            signature = (st_mtime_ns, st.st_size, st.st_ino)
+            if self.verified.get(name) == signature and not racy:
+                continue
+            if hash_checked is None:
+                hash_checked = not self._hash_unreliable(config)
+            if not hash_checked:
+                return None
+            try:
+                path = os.path.join(self.root, name)
+                content = os.fsencode(os.readlink(path)) if mode == SYMLINK_MODE else Path(path).read_bytes()
+            except OSError:
+                return True
+            digest = hashlib.sha256 if hash_size == 32 else hashlib.sha1
+            if digest(b"blob %d\0" % len(content) + content).digest() != oid:
+                return True
+            self.verified[name] = signature
+        return False
+
+    def _ignore_rules(self, path: Path, base: str) -> tuple[int, list[IgnoreRule]]:
+        mtime = self._stat_signature(path)
+        cached = self.ignore_files.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, _parse_ignore_file(path, base) if mtime else [])
+            self.ignore_files[path] = cached
+        return cached
+
+    def _untracked(self, index: GitIndex, config: dict[str, str]) -> bool:
+        xdg = Path(os.getenv("XDG_CONFIG_HOME") or Path.home() / ".config")
+        excludes = config.get("core.excludesfile")
+        global_path = Path(excludes).expanduser() if excludes else xdg / "git" / "ignore"
+        exclude_path = self.common_dir / "info" / "exclude"
+        global_mtime, global_rules = self._ignore_rules(global_path, "")
+        exclude_mtime, exclude_rules = self._ignore_rules(exclude_path, "")
+        if (global_mtime, exclude_mtime) != self.base_signature:
+            self.base_signature = (global_mtime, exclude_mtime)
+            self.clean_dirs.clear()
+        return self._scan_dir(index, "", [*global_rules, *exclude_rules], False)
+
+    def _scan_dir(self, index: GitIndex, rel: str, rules: list[IgnoreRule], force: bool) -> bool:
+        directory = self.root / rel if rel else self.root
+        try:
+            dir_mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return False
+        ignore_mtime, local_rules = self._ignore_rules(directory / ".gitignore", rel)
+        key = (dir_mtime, ignore_mtime)
+        cached = self.clean_dirs.get(rel)
+        # .gitignore が変わったディレクトリ配下は、mtime が同じでも判定をやり直す。
+        force = force or (cached is not None and cached[0][1] != ignore_mtime)
+        if local_rules:
+            rules = [*rules, *local_rules]
+        if cached is not None and cached[0] == key and not force:
+            return any(self._scan_dir(index, child, rules, False) for child in cached[1])
+
+        children: list[str] = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return False
+        for entry in entries:
+            name = entry.name
+            if not rel and name == ".git":
+                continue
+            child = f"{rel}/{name}" if rel else name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if child in index.entries:
+                    continue
+                if child not in index.dirs:
+                    if _is_ignored(rules, child, name, True):
+                        continue
+                    if os.path.exists(os.path.join(entry.path, ".git")):
+                        return True
+                if self._scan_dir(index, child, rules, force):
+                    return True
+                children.append(child)
+            elif child not in index.entries and not _is_ignored(rules, child, name, False):
+                return True
+        self.clean_dirs[rel] = (key, children)
+        return False
+
+
+def index_dirty(repo: Path, git_dir: Path) -> bool | None:
+    key = str(repo)
+    scanner = dirty_scanners.get(key)
+    if scanner is None or scanner.git_dir != git_dir:
+        scanner = DirtyScanner(repo, git_dir)
+        dirty_scanners[key] = scanner
+    try:
+        return scanner.dirty()
+    except Exception:
+        return None
+
+
+def forget(key: str) -> None:
+    """repo key (worktree root) に結び付いた状態を捨てる。"""
+    dirty_scanners.pop(key, None)
+
+
+def trim_caches(live: set[str] | dict[str, Any], limit: int) -> None:
+    """キャッシュを件数で上限内に収める。dirty_scanners は live に無い repo key のものから捨てる。"""
+    if len(dirty_scanners) > limit:
+        for key in [key for key in dirty_scanners if key not in live]:
+            del dirty_scanners[key]
+    if len(packed_refs_cache) > limit:
+        packed_refs_cache.clear()
+    if len(commit_graphs) > limit:
+        for key in list(commit_graphs):
+            drop_commit_graph(key)
+
+
+def close() -> None:
+    """commit-graph の mmap をすべて閉じる。"""
+    for key in list(commit_graphs):
+        drop_commit_graph(key)
@@ -0,0 +1,301 @@
+"""tab_bar.py の文字幅の計測・切り詰めと、中央タブ群のレイアウト計算。
+
+幅は書記素クラスタ単位に kitty の wcswidth で測る。kitty の外 (テストなど) では East Asian Width で近似する。
+セルは length(max_size) / icon_length / text_length_overhead / text を持つものなら何でもよい。
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import unicodedata
+from typing import Protocol
+
+try:
+    from kitty.fast_data_types import wcswidth
+except ImportError:
+
+    def wcswidth(text: str) -> int:
+        width = 0
+        for ch in text:
+            if ch == "\u200d" or unicodedata.combining(ch) or 0xFE00 <= ord(ch) <= 0xFE0F:
+                continue
+            width += 2 if unicodedata.east_asian_width(ch) in "WF" else 1
+        return width
+
+
+# cell.draw / cell.length に「クリップ不要」を伝えるための十分大きな値
+FULL_SIZE = 10_000
+
+
+class LayoutCell(Protocol):
+    """center_layout が測るセル。tab_bar.py の Cell がこれを満たす。"""
+
+    text: str | None
+    icon_length: int
+    text_length_overhead: int
+
+    def length(self, max_size: int) -> int: ...
+ZWJ = "\u200d"
+
+
+def _is_grapheme_extend(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        ch == ZWJ
+        or 0xFE00 <= code <= 0xFE0F  # variation selector
+        or 0x1F3FB <= code <= 0x1F3FF  # emoji skin tone modifier
+        or 0xE0020 <= code <= 0xE007F  # emoji tag sequence
+        or unicodedata.category(ch) in {"Mn", "Me", "Mc"}
+    )
+
+
+def _is_regional_indicator(ch: str) -> bool:
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+
+def _grapheme_offsets(text: str) -> list[int]:
+    """書記素クラスタ (結合文字, ZWJ 絵文字, 国旗) の境界となる文字 offset を返す。"""
+    offsets = [0]
+    i = 0
+    n = len(text)
+    while i < n:
+        j = i + 1
+        if j < n and _is_regional_indicator(text[i]) and _is_regional_indicator(text[j]):
+            j += 1
+        while j < n and (_is_grapheme_extend(text[j]) or text[j - 1] == ZWJ):
+            j += 1
+        offsets.append(j)
+        i = j
+    return offsets
+
+
+@functools.lru_cache(maxsize=4096)
+def _cluster_width(cluster: str) -> int:
+    return max(0, wcswidth(cluster))
+
+
+class TextMetrics:
+    """文字列を書記素クラスタ単位に分け、先頭からの累積セル幅を保持する。
+
+    offsets[i] はクラスタ i の開始位置、prefix[i] はクラスタ i より前の総セル幅。
+    いずれも単調増加なので「N セルに収まる最長の先頭/末尾」を二分探索で引ける。
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        if text.isascii() and text.isprintable():
+            self.offsets = list(range(len(text) + 1))
+            self.prefix = self.offsets
+        else:
+            self.offsets = _grapheme_offsets(text)
+            self.prefix = [0]
+            for start, end in zip(self.offsets, self.offsets[1:]):
+                self.prefix.append(self.prefix[-1] + _cluster_width(text[start:end]))
+        self.width = self.prefix[-1]
+
+    def head(self, max_size: int) -> str:
+        """幅 max_size 以内に収まる最長の先頭部分。"""
+        count = bisect.bisect_right(self.prefix, max_size) - 1
+        return self.text[: self.offsets[count]]
+
+    def tail(self, max_size: int) -> str:
+        """幅 max_size 以内に収まる最長の末尾部分。"""
+        count = bisect.bisect_left(self.prefix, self.width - max_size)
+        return self.text[self.offsets[count] :]
+
+
+@functools.lru_cache(maxsize=2048)
+def text_metrics(text: str) -> TextMetrics:
+    return TextMetrics(text)
+
+
+def text_width(text: str) -> int:
+    return text_metrics(text).width
+
+
+def clip_end(text: str, max_size: int) -> str | None:
+    if max_size < 1:
+        return None
+    metrics = text_metrics(text)
+    if metrics.width <= max_size:
+        return text
+    out = metrics.head(max_size - 1)
+    return out + "…" if out else None
+
+
+def clip_middle(text: str, max_size: int) -> str | None:
+    if max_size < 1:
+        return None
+    metrics = text_metrics(text)
+    if metrics.width <= max_size:
+        return text
+    if max_size <= 3:
+        return clip_end(text, max_size)
+    left_size = max(1, (max_size - 1) // 2)
+    right_size = max(1, max_size - 1 - left_size)
+    left = metrics.head(left_size - 1)
+    if not left:
+        return None
+    right = metrics.tail(right_size)
+    return f"{left}…{right}" if right else clip_end(text, max_size)
+
+
+def _layout_width(cells: list[LayoutCell], sizes: list[int]) -> int:
+    """sizes に従って中央タブ群を描画したときの総幅 (セパレータ込み) を返す。
+
+    sizes[i] は cell.draw に渡す max_size。負値はそのセルを非表示にする。
+    """
+    total = 0
+    first = True
+    for cell, size in zip(cells, sizes):
+        if size < 0:
+            continue
+        width = cell.length(size)
+        if width <= 0:
+            continue
+        total += width + (0 if first else 1)
+        first = False
+    return total
+
+
+def _uniform_sizes(cells: list[LayoutCell], k: int) -> list[int]:
+    return [cell.text_length_overhead + k for cell in cells]
+
+
+def _largest_fitting(cells: list[LayoutCell], low: int, high: int, max_width: int) -> tuple[int, int] | None:
+    """name を一律 k 桁に詰めたときの総幅は k について単調増加なので、
+
+    low..high のうち max_width に収まる最大の k を二分探索で求める。(k, 総幅) を返す。
+    """
+    best = None
+    while low <= high:
+        mid = (low + high) // 2
+        total = _layout_width(cells, _uniform_sizes(cells, mid))
+        if total <= max_width:
+            best = (mid, total)
+            low = mid + 1
+        else:
+            high = mid - 1
+    return best
+
+
+def _fair_share(cells: list[LayoutCell], max_width: int, active: int) -> tuple[list[int], int] | None:
+    """短い name はそのまま残し、長い name に残りの幅を均等に配る (water-filling)。
+
+    全タブの name 上限 c を二分探索し、c に収まらない長い name にだけ余った幅を
+    アクティブタブから順に 1 桁ずつ足す。
+    """
+    widths = [text_width(cell.text or "") for cell in cells]
+    fitted = _largest_fitting(cells, 1, max(widths), max_width)
+    if fitted is None:
+        return None
+    cap, total = fitted
+    sizes = _uniform_sizes(cells, cap)
+    order = [active, *(i for i in range(len(cells)) if i != active)]
+    for i in order:
+        if widths[i] <= cap:
+            continue
+        grown = sizes[i] + 1
+        delta = cells[i].length(grown) - cells[i].length(sizes[i])
+        if total + delta <= max_width:
+            sizes[i] = grown
+            total += delta
+    return sizes, total
+
+
+def center_layout(
+    cells: list[LayoutCell], max_width: int, active: int, abbrev: int, mode: str = "uniform"
+) -> tuple[list[int], int]:
+    """中央タブ群の各セルに割り当てる max_size のリストと総幅を返す。
+
+    優先順位 (= 中央をできる限り表示する戦略):
+      1. 全タブをフル名で表示できるならそうする
+      2. 入らないなら、全タブ一律に name を k 桁 (abbrev..1) まで詰めて最大 k で表示
+         (mode == "fair" なら短い name は残し、長い name だけを詰める)
+      3. それでも入らないなら icon のみ (index + AI マーカーは残る)
+      4. 限界ならアクティブタブ周辺の窓だけを表示し、左右に隠れたタブ数を出す (_viewport)
+
+    icon のみの総幅は name を測らずに求まるので、先にそれで 4 に落ちるかを判定する。
+    タブが非常に多いときは name の計測は窓の中のタブだけで済む。
+    """
+    n = len(cells)
+    if n == 0:
+        return [], 0
+
+    icons_width = sum(cell.icon_length for cell in cells) + n - 1
+    if icons_width > max_width:
+        return _viewport(cells, max_width, active, abbrev)
+
+    sizes = [FULL_SIZE] * n
+    total = _layout_width(cells, sizes)
+    if total <= max_width:
+        return sizes, total
+
+    if mode == "fair":
+        shared = _fair_share(cells, max_width, active)
+        if shared is not None:
+            return shared
+    else:
+        fitted = _largest_fitting(cells, 1, abbrev, max_width)
+        if fitted is not None:
+            return _uniform_sizes(cells, fitted[0]), fitted[1]
+
+    return [0] * n, icons_width
+
+
+def _overflow_width(hidden_left: int, hidden_right: int) -> int:
+    """"‹N " と " N›" の幅。隠れたタブが無い側は描かない。"""
+    width = 0
+    if hidden_left:
+        width += len(str(hidden_left)) + 2
+    if hidden_right:
+        width += len(str(hidden_right)) + 2
+    return width
+
+
+def _viewport(cells: list[LayoutCell], max_width: int, active: int, abbrev: int) -> tuple[list[int], int]:
+    """アクティブタブを中心に、左右へ交互に icon のみのタブを広げられるだけ広げる。
+
+    アクティブタブ (active 番目) はフル名 → abbrev 桁 → icon のみの順に入る大きさを選ぶ。
+    計測するのは窓に入ったタブと、入らなかった両隣の 1 つずつだけ。
+    """
+    n = len(cells)
+    active = min(max(active, 0), n - 1)
+    sizes = [-1] * n
+    cell = cells[active]
+    sizes[active] = 0
+    width = cell.icon_length
+    for size in (FULL_SIZE, cell.text_length_overhead + abbrev):
+        length = cell.length(size)
+        if length + _overflow_width(active, n - 1 - active) <= max_width:
+            sizes[active] = size
+            width = length
+            break
+
+    lo = hi = active
+    grew = True
+    while grew:
+        grew = False
+        if hi + 1 < n:
+            length = cells[hi + 1].icon_length
+            if width + 1 + length + _overflow_width(lo, n - 2 - hi) <= max_width:
+                hi += 1
+                sizes[hi] = 0
+                width += 1 + length
+                grew = True
+        if lo > 0:
+            length = cells[lo - 1].icon_length
+            if width + 1 + length + _overflow_width(lo - 1, n - 1 - hi) <= max_width:
+                lo -= 1
+                sizes[lo] = 0
+                width += 1 + length
+                grew = True
+    return sizes, width + _overflow_width(lo, n - 1 - hi)
+
+
+def visible_window(sizes: list[int]) -> tuple[int, int]:
+    """描画するタブの最初と最後の位置。center_layout の結果は常に連続した範囲になる。"""
+    lo = next((i for i, size in enumerate(sizes) if size >= 0), 0)
+    hi = next((i for i in range(len(sizes) - 1, -1, -1) if sizes[i] >= 0), -1)
+    return lo, hi
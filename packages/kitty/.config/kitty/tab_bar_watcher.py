@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Kitty watcher that tells the custom tab bar when a tab's process metadata changed.
+
+tab_bar.py caches each tab's cwd / foreground exe to avoid /proc reads on every
+redraw. Focus changes, title changes and command start/stop drop that cache so the
+next redraw re-reads it. Focus also drives repo status refreshes: a tab that gains
+focus or finishes a command has its repo refreshed right away, and refreshes pause
+while no kitty OS window has focus. Loaded globally with `watcher tab_bar_watcher.py`.
+"""
+
+import sys
+from typing import Any, Dict
+
+TAB_BAR_MODULE = "kitty_custom_tab_bar"
+
+
+def _tab_bar() -> Any:
+    return sys.modules.get(TAB_BAR_MODULE)
+
+
+def _invalidate(window: Any) -> None:
+    module = _tab_bar()
+    if module is None:
+        return
+    try:
+        module.invalidate_tab_meta(window.tab_id)
+    except Exception:
+        pass
+
+
+def _request_refresh(window: Any) -> None:
+    module = _tab_bar()
+    if module is None:
+        return
+    try:
+        module.request_refresh(window.tab_id)
+    except Exception:
+        pass
+
+
+def on_focus_change(boss: Any, window: Any, data: Dict[str, Any]) -> None:
+    _invalidate(window)
+    # OS window の focus が外れたときも、アクティブな window に focused=False が届く。
+    # イベントの順序は当てにならないので、kitty 全体の focus は tab_bar.py 側で問い合わせる。
+    module = _tab_bar()
+    focused = bool(data.get("focused"))
+    if module is not None:
+        try:
+            module.focus_changed(focused)
+        except Exception:
+            pass
+    if focused:
+        _request_refresh(window)
+
+
+def on_title_change(boss: Any, window: Any, data: Dict[str, Any]) -> None:
+    _invalidate(window)
+
+
+def on_cmd_startstop(boss: Any, window: Any, data: Dict[str, Any]) -> None:
+    # シェル統合が通知するコマンドの開始/終了。タイトルが変わらない場合もあるので再描画させる。
+    _invalidate(window)
+    if not data.get("is_start"):
+        # 終わったコマンドが commit や checkout をしたかもしれない。
+        _request_refresh(window)
+    tm = boss.active_tab_manager if boss is not None else None
+    if tm is not None:
+        tm.mark_tab_bar_dirty()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""Offline benchmark for packages/kitty/.config/kitty/tab_bar.py.
+
+tab_bar.py imports kitty.fast_data_types / kitty.tab_bar / kitty.rgb at module
+level, so it only loads inside kitty. This script installs minimal stand-ins for
+those modules, replays synthetic or recorded tab sessions through the same
+two-pass draw_tab protocol kitty uses (layout pass, then real pass) and reports
+per-draw latency percentiles, peak allocation, memory blocks still allocated
+after each draw (tracemalloc snapshot) and calls into the screen.
+
+    python3 scripts/bench_kitty_tab_bar.py
+    python3 scripts/bench_kitty_tab_bar.py --tabs 5 50 200 --columns 80 240 --frames 300
+    python3 scripts/bench_kitty_tab_bar.py --session session.json
+
+A recorded session is a JSON list of frames; each frame is a list of tabs:
+    [{"title": "...", "cwd": "...", "exe": "zsh", "active": true,
+      "activity": false, "attention": false}, ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import unicodedata
+from pathlib import Path
+from typing import Any, NamedTuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+TAB_BAR = ROOT_DIR / "packages" / "kitty" / ".config" / "kitty" / "tab_bar.py"
+
+TITLES = [
+    "zsh",
+    "claude",
+    "codex",
+    "nvim",
+    "作業ブランチ整理",
+    "レビュー対応と追加修正",
+    "#api-gateway",
+    "#migration-2024-q3-backfill",
+    "infra/terraform",
+    "👨‍👩‍👧 family photos",
+    "café",
+]
+EXES = ["zsh", "claude", "codex", "nvim", "python3"]
+
+
+def stub_wcswidth(text: str) -> int:
+    width = 0
+    for ch in text:
+        if unicodedata.combining(ch) or ch in "‍️":
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in "WF" else 1
+    return width
+
+
+class Cursor:
+    """kitty の Screen.cursor 相当。属性代入の回数を数える。"""
+
+    def __init__(self, screen: "Screen") -> None:
+        object.__setattr__(self, "screen", screen)
+        object.__setattr__(self, "x", 0)
+        for name in ("fg", "bg"):
+            object.__setattr__(self, name, 0)
+        for name in ("bold", "italic", "dim"):
+            object.__setattr__(self, name, False)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name != "x":
+            self.screen.attribute_sets += 1
+        object.__setattr__(self, name, value)
+
+
+class Screen:
+    def __init__(self, columns: int) -> None:
+        self.columns = columns
+        self.draw_calls = 0
+        self.attribute_sets = 0
+        self.cursor = Cursor(self)
+
+    def draw(self, text: str) -> None:
+        self.draw_calls += 1
+        self.cursor.x = min(self.columns, self.cursor.x + stub_wcswidth(text))
+
+
+class TabBarData(NamedTuple):
+    title: str
+    is_active: bool
+    needs_attention: bool
+    tab_id: int
+    num_windows: int = 1
+    num_window_groups: int = 1
+    layout_name: str = "splits"
+    has_activity_since_last_focus: bool = False
+    active_fg: int | None = None
+    active_bg: int | None = None
+    inactive_fg: int | None = None
+    inactive_bg: int | None = None
+    session_name: str = ""
+
+
+class ExtraData:
+    def __init__(self, for_layout: bool) -> None:
+        self.for_layout = for_layout
+        self.prev_tab = None
+        self.next_tab = None
+
+
+# tab_id -> {"cwd": ..., "exe": ...}。TabAccessor スタブが参照する。
+ACCESSOR_STATE: dict[int, dict[str, str]] = {}
+
+
+class TabAccessor:
+    def __init__(self, tab_id: int) -> None:
+        state = ACCESSOR_STATE.get(tab_id, {})
+        self.active_wd = state.get("cwd", "")
+        self.active_exe = state.get("exe", "")
+        self.active_oldest_exe = state.get("exe", "")
+
+
+class TabManager:
+    def mark_tab_bar_dirty(self) -> None:
+        pass
+
+
+class Boss:
+    active_tab_manager = TabManager()
+
+
+def install_kitty_stubs() -> None:
+    kitty = types.ModuleType("kitty")
+    fast_data_types = types.ModuleType("kitty.fast_data_types")
+    fast_data_types.Screen = Screen
+    fast_data_types.wcswidth = stub_wcswidth
+    fast_data_types.add_timer = lambda callback, interval, repeats: 1
+    fast_data_types.remove_timer = lambda timer_id: None
+    fast_data_types.current_focused_os_window_id = lambda: 1
+    fast_data_types.get_boss = lambda: Boss()
+
+    def get_options() -> Any:
+        raise RuntimeError("no kitty options outside kitty")
+
+    fast_data_types.get_options = get_options
+    rgb = types.ModuleType("kitty.rgb")
+    rgb.to_color = lambda value: tuple(int(value.lstrip("#")[i : i + 2], 16) for i in (0, 2, 4))
+    utils = types.ModuleType("kitty.utils")
+    utils.color_as_int = lambda color: (color[0] << 16) | (color[1] << 8) | color[2]
+    tab_bar = types.ModuleType("kitty.tab_bar")
+    tab_bar.DrawData = object
+    tab_bar.ExtraData = ExtraData
+    tab_bar.TabAccessor = TabAccessor
+    tab_bar.TabBarData = TabBarData
+    sys.modules.update(
+        {
+            "kitty": kitty,
+            "kitty.fast_data_types": fast_data_types,
+            "kitty.rgb": rgb,
+            "kitty.utils": utils,
+            "kitty.tab_bar": tab_bar,
+        }
+    )
+
+
+def load_tab_bar() -> dict[str, Any]:
+    """毎回読み直し、シナリオ間でキャッシュやレイアウト状態を持ち越さない。"""
+    return runpy.run_path(str(TAB_BAR))["draw_tab"].__globals__
+
+
+def synthetic_session(tabs: int, frames: int, churn: float, seed: int, cwd: str) -> list[list[dict[str, Any]]]:
+    rng = random.Random(seed)
+    base = [
+        {
+            "title": rng.choice(TITLES),
+            "cwd": os.path.join(cwd, f"project-{i % 17}"),
+            "exe": rng.choice(EXES),
+            "active": i == tabs // 2,
+            "activity": False,
+            "attention": False,
+        }
+        for i in range(tabs)
+    ]
+    session = []
+    for _ in range(frames):
+        frame = [dict(tab) for tab in base]
+        # エージェントが動いているタブの activity フラグが頻繁に反転する状況を再現する。
+        for tab in frame:
+            if rng.random() < churn:
+                tab["activity"] = not tab["activity"]
+        session.append(frame)
+        base = frame
+    return session
+
+
+def draw_frame(module: dict[str, Any], columns: int, frame: list[dict[str, Any]]) -> Screen:
+    tabs = []
+    for i, tab in enumerate(frame, 1):
+        ACCESSOR_STATE[i] = {"cwd": tab.get("cwd", ""), "exe": tab.get("exe", "")}
+        tabs.append(
+            TabBarData(
+                title=tab.get("title", ""),
+                is_active=bool(tab.get("active")),
+                needs_attention=bool(tab.get("attention")),
+                tab_id=i,
+                has_activity_since_last_focus=bool(tab.get("activity")),
+            )
+        )
+    draw_tab = module["draw_tab"]
+    screen = Screen(columns)
+    last = len(tabs)
+    for for_layout in (True, False):
+        screen.cursor.x = 0
+        for index, tab in enumerate(tabs, 1):
+            draw_tab(None, screen, tab, 0, 30, index, index == last, ExtraData(for_layout))
+    return screen
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_scenario(label: str, columns: int, session: list[list[dict[str, Any]]], warmup: int) -> dict[str, Any]:
+    module = load_tab_bar()
+    for frame in session[:warmup]:
+        draw_frame(module, columns, frame)
+
+    latencies: list[float] = []
+    draw_calls: list[int] = []
+    attribute_sets: list[int] = []
+    for frame in session:
+        start = time.perf_counter_ns()
+        screen = draw_frame(module, columns, frame)
+        latencies.append((time.perf_counter_ns() - start) / 1000)
+        draw_calls.append(screen.draw_calls)
+        attribute_sets.append(screen.attribute_sets)
+
+    # 描画 1 回ごとに trace を取り直し、確保の山 (peak) と、描画後も残ったメモリブロックの数を測る。
+    # 残ったブロックが毎回出るなら、描画のたびに作り直している (使い回せていない) オブジェクトがある。
+    own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    allocated: list[int] = []
+    blocks: list[int] = []
+    for frame in session:
+        tracemalloc.start()
+        draw_frame(module, columns, frame)
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(own)
+        tracemalloc.stop()
+        allocated.append(peak)
+        blocks.append(len(snapshot.traces))
+
+    return {
+        "scenario": label,
+        "columns": columns,
+        "frames": len(session),
+        "p50_us": percentile(latencies, 0.50),
+        "p90_us": percentile(latencies, 0.90),
+        "p99_us": percentile(latencies, 0.99),
+        "max_us": max(latencies),
+        "mean_us": statistics.fmean(latencies),
+        "peak_alloc_kib": statistics.fmean(allocated) / 1024,
+        "alloc_blocks": statistics.fmean(blocks),
+        "alloc_blocks_max": max(blocks),
+        "draw_calls": statistics.fmean(draw_calls),
+        "attribute_sets": statistics.fmean(attribute_sets),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tabs", type=int, nargs="+", default=[5, 50, 200])
+    parser.add_argument("--columns", type=int, nargs="+", default=[80, 240])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.1, help="Probability that a tab flips its activity flag per frame.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--session", type=Path, help="Replay a recorded JSON session instead of synthetic ones.")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per scenario.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="tab-bar-bench-") as tmp:
+        # 永続キャッシュや repo 検出がホームの状態に左右されないよう、隔離した場所で動かす。
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp, "cache")
+        os.environ["HOME"] = tmp
+        install_kitty_stubs()
+
+        scenarios: list[tuple[str, list[list[dict[str, Any]]]]] = []
+        if args.session:
+            scenarios.append((args.session.name, json.loads(args.session.read_text(encoding="utf-8"))))
+        else:
+            for tabs in args.tabs:
+                scenarios.append((f"{tabs} tabs", synthetic_session(tabs, args.frames, args.churn, args.seed, tmp)))
+
+        results = [
+            run_scenario(label, columns, session, args.warmup)
+            for label, session in scenarios
+            for columns in args.columns
+        ]
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result, sort_keys=True))
+        return 0
+
+    header = f"{'scenario':<16}{'cols':>6}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}{'alloc KiB':>11}{'blocks':>8}{'draws':>8}{'attrs':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<16}{r['columns']:>6}{r['p50_us']:>10.1f}{r['p90_us']:>10.1f}{r['p99_us']:>10.1f}"
+            f"{r['max_us']:>10.1f}{r['peak_alloc_kib']:>11.1f}{r['alloc_blocks']:>8.1f}{r['draw_calls']:>8.0f}{r['attribute_sets']:>8.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+"""tab_bar のテスト用の共通 fixture。
+
+tab_bar_git.py / tab_bar_text.py は kitty 無しで import できるので、kitty の設定ディレクトリを sys.path に入れるだけでよい。
+tab_bar.py 本体は kitty のモジュールを import するため、描画の確認に要る分だけのスタブを sys.modules に差し込んで読む。
+"""
+
+from __future__ import annotations
+
+import runpy
+import sys
+import types
+import unicodedata
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import pytest
+
+KITTY_DIR = Path(__file__).resolve().parent.parent / "packages" / "kitty" / ".config" / "kitty"
+if str(KITTY_DIR) not in sys.path:
+    sys.path.insert(0, str(KITTY_DIR))
+
+
+def wcswidth(text: str) -> int:
+    width = 0
+    for ch in text:
+        if ch == "‍" or unicodedata.combining(ch) or 0xFE00 <= ord(ch) <= 0xFE0F:
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in "WF" else 1
+    return width
+
+
+class Cursor:
+    def __init__(self) -> None:
+        self.x = 0
+        self.fg = 0
+        self.bg = 0
+        self.bold = False
+        self.italic = False
+        self.dim = False
+
+
+class Screen:
+    """kitty の Screen の代わり。1 行分の列に文字を書き、cursor.x を戻して描き直せば上書きする。"""
+
+    def __init__(self, columns: int) -> None:
+        self.columns = columns
+        self.cursor = Cursor()
+        # 列ごとの文字。まだ描いていない列と、幅 2 の文字の右半分は "" にする。
+        self.cells = [""] * columns
+
+    @property
+    def line(self) -> str:
+        return "".join(self.cells)
+
+    def width(self, text: str) -> int:
+        """この端末での表示幅。kitty と tab_bar の幅の食い違いを試すときに上書きする。"""
+        return wcswidth(text)
+
+    def draw(self, text: str) -> None:
+        for ch in text:
+            width = self.width(ch)
+            x = self.cursor.x
+            if width == 0:
+                # 結合文字や ZWJ は直前の文字に付ける。
+                while x > 0 and not self.cells[x - 1]:
+                    x -= 1
+                if x > 0:
+                    self.cells[x - 1] += ch
+                continue
+            # 右端からはみ出した分は kitty と同じく捨てる。
+            if x + width > self.columns:
+                break
+            self.cells[x : x + width] = [ch] + [""] * (width - 1)
+            self.cursor.x = x + width
+
+
+class TabBarData(NamedTuple):
+    title: str
+    is_active: bool
+    needs_attention: bool
+    tab_id: int
+    num_windows: int = 1
+    num_window_groups: int = 1
+    layout_name: str = "splits"
+    has_activity_since_last_focus: bool = False
+    active_fg: int | None = None
+    active_bg: int | None = None
+    inactive_fg: int | None = None
+    inactive_bg: int | None = None
+    session_name: str = ""
+
+
+class ExtraData:
+    def __init__(self, for_layout: bool) -> None:
+        self.for_layout = for_layout
+        self.prev_tab = None
+        self.next_tab = None
+
+
+class TabAccessor:
+    def __init__(self, tab_id: int) -> None:
+        self.active_wd = ""
+        self.active_exe = ""
+        self.active_oldest_exe = ""
+
+
+class Boss:
+    class active_tab_manager:
+        @staticmethod
+        def mark_tab_bar_dirty() -> None:
+            pass
+
+
+def _kitty_modules() -> dict[str, types.ModuleType]:
+    fast_data_types = types.ModuleType("kitty.fast_data_types")
+    fast_data_types.Screen = Screen
+    fast_data_types.wcswidth = wcswidth
+    fast_data_types.add_timer = lambda callback, interval, repeats: 1
+    fast_data_types.remove_timer = lambda timer_id: None
+    fast_data_types.current_focused_os_window_id = lambda: 1
+    fast_data_types.get_boss = Boss
+
+    def get_options() -> Any:
+        raise RuntimeError("kitty の外では options が無い")
+
+    fast_data_types.get_options = get_options
+    rgb = types.ModuleType("kitty.rgb")
+    rgb.to_color = lambda value: tuple(int(value.lstrip("#")[i : i + 2], 16) for i in (0, 2, 4))
+    utils = types.ModuleType("kitty.utils")
+    utils.color_as_int = lambda color: (color[0] << 16) | (color[1] << 8) | color[2]
+    tab_bar = types.ModuleType("kitty.tab_bar")
+    tab_bar.DrawData = object
+    tab_bar.ExtraData = ExtraData
+    tab_bar.TabAccessor = TabAccessor
+    tab_bar.TabBarData = TabBarData
+    return {
+        "kitty": types.ModuleType("kitty"),
+        "kitty.fast_data_types": fast_data_types,
+        "kitty.rgb": rgb,
+        "kitty.utils": utils,
+        "kitty.tab_bar": tab_bar,
+    }
+
+
+@pytest.fixture
+def tab_bar(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[dict[str, Any]]:
+    """kitty のスタブの上で読んだ tab_bar.py のグローバル。キャッシュや spool は tmp_path に置く。"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    for name, module in _kitty_modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    # tab_bar.py は自分と部品を sys.modules に登録するので、読む前の状態に戻す。
+    previous = {name: sys.modules.get(name) for name in ("kitty_custom_tab_bar", "tab_bar_git", "tab_bar_text")}
+    module = runpy.run_path(str(KITTY_DIR / "tab_bar.py"))["draw_tab"].__globals__
+    yield module
+    module["_shutdown"]()
+    for name, old in previous.items():
+        if old is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = old
@@ -0,0 +1,93 @@
+"""kitty のプロセス間で共有する repo status の永続キャッシュ。
+
+    python3 -m pytest tests/test_kitty_tab_bar_cache.py
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+def test_merge_takes_only_newer_repos(tab_bar: dict[str, Any]) -> None:
+    repo_cache = tab_bar["repo_cache"]
+    repo_cache["/old"] = {"branch": "main", "dirty": True, "updated_at": 200.0}
+    repo_cache["/new"] = {"branch": "main", "dirty": True, "updated_at": 100.0, "git_dir": "/new/.git"}
+    changed = tab_bar["_merge_cache"](
+        {
+            "repos": {
+                "/old": {"branch": "stale", "updated_at": 150.0},
+                "/new": {"branch": "topic", "dirty": False, "updated_at": 300.0, "unknown": 1},
+                "/other": {"branch": "dev", "updated_at": 50.0},
+            }
+        }
+    )
+    assert changed
+    assert repo_cache["/old"] == {"branch": "main", "dirty": True, "updated_at": 200.0}
+    # 永続化する項目だけを手元の status に重ねる。
+    assert repo_cache["/new"] == {"branch": "topic", "dirty": False, "updated_at": 300.0, "git_dir": "/new/.git"}
+    assert repo_cache["/other"] == {"branch": "dev", "updated_at": 50.0}
+    assert not tab_bar["_merge_cache"]({"repos": {"/old": {"branch": "stale", "updated_at": 200.0}}})
+
+
+def test_merge_takes_only_newer_pr_indexes(tab_bar: dict[str, Any]) -> None:
+    pr_indexes = tab_bar["pr_indexes"]
+    pr_indexes["github.com/a/b"] = (200.0, {"main": {"number": 1}})
+    changed = tab_bar["_merge_cache"](
+        {
+            "pr_indexes": {
+                "github.com/a/b": [100.0, {"main": {"number": 0}}],
+                "github.com/c/d": [300.0, {"topic": {"number": 2}}],
+            }
+        }
+    )
+    assert changed
+    assert pr_indexes["github.com/a/b"] == (200.0, {"main": {"number": 1}})
+    assert pr_indexes["github.com/c/d"] == (300.0, {"topic": {"number": 2}})
+
+
+def test_merge_skips_malformed_entries(tab_bar: dict[str, Any]) -> None:
+    data = {
+        "repos": {"/a": "branch", "/b": None},
+        "pr_indexes": {"x": [1.0], "y": [1.0, []], "z": "index"},
+    }
+    assert not tab_bar["_merge_cache"](data)
+    assert not tab_bar["_merge_cache"]({"repos": [], "pr_indexes": None})
+    assert not tab_bar["repo_cache"] and not tab_bar["pr_indexes"]
+
+
+def test_write_merges_other_process(tab_bar: dict[str, Any]) -> None:
+    cache_file = tab_bar["CACHE_FILE"]
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # 他プロセスが先に書いた、手元より新しい結果と手元に無い repo。
+    cache_file.write_text(
+        json.dumps(
+            {
+                "version": tab_bar["CACHE_VERSION"],
+                "repos": {"/a": {"branch": "theirs", "updated_at": 300.0}, "/b": {"branch": "b", "updated_at": 100.0}},
+                "pr_indexes": {"github.com/a/b": [300.0, {}]},
+            }
+        ),
+        encoding="utf-8",
+    )
+    tab_bar["repo_cache"]["/a"] = {"branch": "ours", "updated_at": 200.0, "git_dir": "/a/.git"}
+    tab_bar["repo_cache"]["/c"] = {"branch": "c", "updated_at": 250.0}
+    tab_bar["_write_persistent_cache"]()
+    data = json.loads(cache_file.read_text(encoding="utf-8"))
+    assert data["repos"] == {
+        "/a": {"branch": "theirs", "updated_at": 300.0},
+        "/c": {"branch": "c", "updated_at": 250.0},
+        "/b": {"branch": "b", "updated_at": 100.0},
+    }
+    assert data["pr_indexes"] == {"github.com/a/b": [300.0, {}]}
+    assert tab_bar["repo_cache"]["/a"]["git_dir"] == "/a/.git"
+    # 書いた本人は自分の書き込みを読み直さない。
+    assert not tab_bar["_load_persistent_cache"]()
+
+
+def test_other_version_is_ignored(tab_bar: dict[str, Any]) -> None:
+    cache_file = tab_bar["CACHE_FILE"]
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(json.dumps({"version": -1, "repos": {"/a": {"branch": "x", "updated_at": 1.0}}}), encoding="utf-8")
+    assert not tab_bar["_load_persistent_cache"]()
+    assert not tab_bar["repo_cache"]
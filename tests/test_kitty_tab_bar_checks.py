@@ -0,0 +1,135 @@
+"""PR の CI / review の取り込み (GraphQL の応答 -> PR 表) と、右端の chip の描画。
+
+    python3 -m pytest tests/test_kitty_tab_bar_checks.py
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import pytest
+
+COLUMNS = 80
+
+
+def graphql_response(rollup: str | None, review: str | None, number: int = 42) -> str:
+    commit = {"commit": {"statusCheckRollup": {"state": rollup} if rollup else None}}
+    pr = {"number": number, "isDraft": False, "isCrossRepository": False, "reviewDecision": review, "commits": {"nodes": [commit]}}
+    return json.dumps({"data": {"r0": {"b0": {"nodes": [pr]}}}})
+
+
+def render_right(tab_bar: dict[str, Any], repo: Any) -> tuple[str, list[list[Any]]]:
+    out = tab_bar["RenderList"]()
+    tab_bar["draw_right"](out, tab_bar["_right_cells"](repo, None, "12:00"), COLUMNS, COLUMNS)
+    screen = tab_bar["Screen"](COLUMNS)
+    tab_bar["_flush_runs"](screen, out.runs)
+    return screen.line, out.runs
+
+
+def make_repo(tab_bar: dict[str, Any], info: dict[str, Any]) -> Any:
+    repo = tab_bar["RepoSnapshot"]()
+    repo.branch = "main"
+    repo.pr_number = info["pr_number"]
+    repo.checks = info["checks"]
+    repo.review = info["review"]
+    return repo
+
+
+@pytest.mark.parametrize("rollup", ["SUCCESS", "FAILURE", "PENDING"])
+@pytest.mark.parametrize("review", [None, "APPROVED", "CHANGES_REQUESTED"])
+def test_checks_chip(tab_bar: dict[str, Any], rollup: str, review: str | None) -> None:
+    found = tab_bar["_parse_checks"](graphql_response(rollup, review), {"b0": ("/repo/.git", "main")})
+    info = found[("/repo/.git", "main")]
+    assert info["pr_number"] == 42
+    assert info["checks"] == tab_bar["CHECK_STATES"][rollup]
+    assert info["review"] == (tab_bar["REVIEW_STATES"][review] if review else None)
+
+    repo = make_repo(tab_bar, info)
+    line, runs = render_right(tab_bar, repo)
+    cell = tab_bar["_checks_cell"](repo)
+    icon = tab_bar["CHECK_ICONS"][info["checks"]]
+    assert cell.icon == icon
+    texts = [run[3] for run in runs]
+    # review の判定が無くても CI の icon は出る。
+    assert icon in texts
+    assert line.index("#42") < line.index(icon)
+    after = texts[texts.index(icon) + 1]
+    if info["review"]:
+        assert after == cell.separator + f" {info['review']}" or texts[texts.index(icon) + 2] == f" {info['review']}"
+    else:
+        assert after.startswith(cell.border[1])
+    if info["checks"] == "failure" or info["review"] == "changes":
+        expected = tab_bar["ERR_COLOR"]
+    elif info["checks"] == "pending":
+        expected = tab_bar["YELLOW"]
+    else:
+        expected = tab_bar["OK_COLOR"]
+    assert [(run[1], run[3]) for run in runs if icon in run[3]] == [(expected, icon)]
+    assert line.index(icon) < line.index("12:00")
+
+
+def test_review_without_checks(tab_bar: dict[str, Any]) -> None:
+    info = tab_bar["_parse_checks"](graphql_response(None, "APPROVED"), {"b0": ("/repo/.git", "main")})[("/repo/.git", "main")]
+    assert info["checks"] is None
+    line, runs = render_right(tab_bar, make_repo(tab_bar, info))
+    texts = [run[3] for run in runs]
+    assert tab_bar["CHECK_NONE_ICON"] in texts
+    assert " approved" in texts
+
+
+def test_no_chip_without_checks_or_review(tab_bar: dict[str, Any]) -> None:
+    info = tab_bar["_parse_checks"](graphql_response(None, None), {"b0": ("/repo/.git", "main")})[("/repo/.git", "main")]
+    line, _ = render_right(tab_bar, make_repo(tab_bar, info))
+    assert "#42" in line
+    assert tab_bar["CHECK_NONE_ICON"] not in line
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["not json", "[]", json.dumps({"errors": [{"message": "boom"}]}), json.dumps({"data": None})],
+)
+def test_parse_checks_rejects_broken_response(tab_bar: dict[str, Any], raw: str) -> None:
+    assert tab_bar["_parse_checks"](raw, {"b0": ("/repo/.git", "main")}) is None
+
+
+def test_parse_checks_skips_failed_repository_and_forks(tab_bar: dict[str, Any]) -> None:
+    fork = {"number": 7, "isCrossRepository": True, "reviewDecision": None, "commits": {"nodes": []}}
+    raw = json.dumps(
+        {
+            "data": {
+                "r0": None,
+                "r1": {"b1": {"nodes": [fork]}, "b2": {"nodes": []}, "unknown": {"nodes": [{"number": 1}]}},
+            }
+        }
+    )
+    aliases = {"b0": ("/a/.git", "main"), "b1": ("/b/.git", "fork"), "b2": ("/b/.git", "none")}
+    assert tab_bar["_parse_checks"](raw, aliases) == {}
+
+
+def test_store_checks_updates_pr_index(tab_bar: dict[str, Any]) -> None:
+    pr_indexes = tab_bar["pr_indexes"]
+    pr_indexes["/repo/.git"] = (100.0, {"main": {"pr_number": 42, "pr_state": "open", "checks": None, "review": None}})
+    info = {"pr_number": 42, "pr_state": "open", "checks": "success", "review": "approved"}
+    assert tab_bar["_store_checks"]({("/repo/.git", "main"): info}) is True
+    assert pr_indexes["/repo/.git"] == (100.0, {"main": info})
+    # 同じ内容なら変化なし。
+    assert tab_bar["_store_checks"]({("/repo/.git", "main"): dict(info)}) is False
+
+
+def test_store_checks_ignores_other_pr_number(tab_bar: dict[str, Any]) -> None:
+    pr_indexes = tab_bar["pr_indexes"]
+    table = {"main": {"pr_number": 41, "pr_state": "open", "checks": None, "review": None}}
+    pr_indexes["/repo/.git"] = (100.0, table)
+    info = {"pr_number": 42, "pr_state": "open", "checks": "failure", "review": None}
+    assert tab_bar["_store_checks"]({("/repo/.git", "main"): info}) is False
+    assert pr_indexes["/repo/.git"] == (100.0, table)
+
+
+def test_store_checks_creates_expired_index(tab_bar: dict[str, Any]) -> None:
+    info = {"pr_number": 42, "pr_state": "draft", "checks": "pending", "review": "review"}
+    assert tab_bar["_store_checks"]({("/new/.git", "topic"): info}) is True
+    fetched_at, table = tab_bar["pr_indexes"]["/new/.git"]
+    assert table == {"topic": info}
+    # 表が無かった repository は、次の要求で gh pr list を取り直させる。
+    assert tab_bar["time"].time() - fetched_at >= tab_bar["PR_INDEX_TTL"]
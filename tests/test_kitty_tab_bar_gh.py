@@ -0,0 +1,77 @@
+"""gh の失敗の分類と、全 repo 共通の circuit breaker。
+
+    python3 -m pytest tests/test_kitty_tab_bar_gh.py
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    ("returncode", "stderr", "reason"),
+    [
+        (0, "", None),
+        (None, "", "offline"),
+        (1, "error connecting to api.github.com", "offline"),
+        (1, "dial tcp: lookup api.github.com: no such host", "offline"),
+        (1, "Post https://api.github.com/graphql: net/http: TLS handshake timeout", "offline"),
+        (1, "GraphQL: API rate limit exceeded for user ID 1.", "rate_limit"),
+        (1, "You have triggered an abuse detection mechanism.", "rate_limit"),
+        (4, "", "auth"),
+        (1, "To get started with GitHub CLI, please run:  gh auth login", "auth"),
+        (1, "HTTP 401: Bad credentials (https://api.github.com/graphql)", "auth"),
+        # repository 固有の失敗は GitHub まで届いているので breaker を開かない。
+        (1, "no git remotes found", None),
+        (1, "GraphQL: Could not resolve to a Repository with the name 'owner/gone'.", None),
+    ],
+)
+def test_gh_failure(tab_bar: dict[str, Any], returncode: int | None, stderr: str, reason: str | None) -> None:
+    result = tab_bar["ProcessResult"](returncode, "", stderr)
+    assert tab_bar["_gh_failure"](result) == reason
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def breaker(tab_bar: dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> tuple[Any, Clock]:
+    clock = Clock()
+    monkeypatch.setattr(tab_bar["time"], "time", clock.time)
+    return tab_bar["CircuitBreaker"](30.0, 120.0), clock
+
+
+def test_breaker_backs_off_exponentially(breaker: tuple[Any, Clock]) -> None:
+    cb, clock = breaker
+    assert cb.allow()
+    waits = []
+    for _ in range(4):
+        cb.record("offline")
+        assert cb.is_open()
+        assert not cb.allow()
+        waits.append(cb.retry_at - clock.now)
+        clock.now = cb.retry_at
+        # 期限が来たら probe を 1 本だけ通す。
+        assert cb.allow()
+        assert not cb.allow()
+    assert waits == [30.0, 60.0, 120.0, 120.0]
+    cb.record(None)
+    assert not cb.is_open()
+    assert cb.allow() and cb.allow()
+
+
+def test_breaker_release_lets_next_probe_through(breaker: tuple[Any, Clock]) -> None:
+    cb, clock = breaker
+    cb.record("rate_limit")
+    clock.now = cb.retry_at
+    assert cb.allow()
+    cb.release()
+    assert cb.allow()
+    assert cb.snapshot() == {"failures": 1, "reason": "rate_limit", "retry_in": 0.0}
@@ -0,0 +1,276 @@
+"""tab_bar_git.py の fork しない git 読み取り (index / refs / pack) を、本物の git の結果と突き合わせる。
+
+    python3 -m pytest tests/test_kitty_tab_bar_git.py
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+import tab_bar_git
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git が無い")
+
+
+@pytest.fixture(autouse=True)
+def git_env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # 利用者の ~/.gitconfig や global ignore に結果を左右されないようにする。
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(home / ".config"))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "tab bar")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "tab-bar@example.com")
+
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, text=True).stdout
+
+
+def make_repo(path: Path, files: dict[str, str] | None = None) -> Path:
+    path.mkdir(parents=True)
+    git(path, "init", "-q", "-b", "main")
+    for name, content in (files or {"README": "hello\n", "src/app.py": "print(1)\n"}).items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_text(content)
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "initial")
+    return path
+
+
+def index_dirty(repo: Path) -> bool | None:
+    tab_bar_git.dirty_scanners.clear()
+    return tab_bar_git.index_dirty(repo, repo / ".git")
+
+
+def git_dirty(repo: Path) -> bool:
+    return bool(git(repo, "status", "--porcelain"))
+
+
+def ahead_behind(repo: Path) -> tuple[int, int] | None:
+    tab_bar_git.ahead_behind_cache.clear()
+    tab_bar_git.packed_refs_cache.clear()
+    tab_bar_git.commit_graphs.clear()
+    return tab_bar_git.ahead_behind(repo / ".git")
+
+
+def git_ahead_behind(repo: Path) -> tuple[int, int]:
+    ahead, behind = git(repo, "rev-list", "--left-right", "--count", "HEAD...@{u}").split()
+    return int(ahead), int(behind)
+
+
+@pytest.mark.parametrize(
+    "change",
+    ["clean", "modified", "same_size", "deleted", "untracked", "ignored", "staged", "untracked_in_new_dir"],
+)
+def test_dirty_matches_git_status(tmp_path: Path, change: str) -> None:
+    repo = make_repo(tmp_path / "repo", {"README": "hello\n", "src/app.py": "print(1)\n", ".gitignore": "*.log\n"})
+    if change == "modified":
+        (repo / "README").write_text("hello, world\n")
+    elif change == "same_size":
+        (repo / "src/app.py").write_text("print(2)\n")
+    elif change == "deleted":
+        (repo / "README").unlink()
+    elif change == "untracked":
+        (repo / "notes.txt").write_text("todo\n")
+    elif change == "ignored":
+        (repo / "debug.log").write_text("noise\n")
+    elif change == "staged":
+        (repo / "src/new.py").write_text("x = 1\n")
+        git(repo, "add", "src/new.py")
+    elif change == "untracked_in_new_dir":
+        (repo / "docs").mkdir()
+        (repo / "docs/guide.md").write_text("# guide\n")
+    if change == "staged":
+        # add で cache-tree のルートが無効になると HEAD の tree と比べられないので git status に任せる。
+        assert index_dirty(repo) in (None, git_dirty(repo))
+    else:
+        assert index_dirty(repo) == git_dirty(repo)
+
+
+def _smudge(repo: Path, name: str, staged: str, worktree: str) -> None:
+    """name を racily clean な状態で index に載せ、git に size を 0 へ書き換えさせる。
+
+    git は stat が index と一致するのに中身が違うエントリだけを smudge するので、worktree は同じ長さ・同じ mtime にする。
+    """
+    path = repo / name
+    future = os.stat(repo / ".git" / "index").st_mtime_ns + 3_600_000_000_000
+    path.write_text(staged)
+    os.utime(path, ns=(future, future))
+    git(repo, "add", name)
+    path.write_text(worktree)
+    os.utime(path, ns=(future, future))
+    # 別のファイルを add して index を書き直すと、mtime が index 以降の name は smudge される。
+    (repo / "other").write_text("other\n")
+    git(repo, "add", "other")
+    git(repo, "commit", "-q", "-m", "smudge")
+
+
+def test_racily_clean_smudged_entry(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo")
+    _smudge(repo, "racy.txt", "aaaa\n", "bbbb\n")
+    entries = dict(tab_bar_git.load_index(repo / ".git", 20).entries)
+    assert entries["racy.txt"][4] == 0
+    # git status は index を書き直すことがあるので、先にこちらで判定する。
+    assert index_dirty(repo) is True
+    assert git_dirty(repo)
+
+
+def test_smudged_entry_with_unchanged_content(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo")
+    _smudge(repo, "racy.txt", "aaaa\n", "bbbb\n")
+    # 中身を戻せば git は clean とみなす。size 0 だけを見て dirty にしてはいけない。
+    (repo / "racy.txt").write_text("aaaa\n")
+    assert dict(tab_bar_git.load_index(repo / ".git", 20).entries)["racy.txt"][4] == 0
+    assert index_dirty(repo) is False
+    assert not git_dirty(repo)
+
+
+def test_racy_same_size_edit(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo")
+    index_mtime = os.stat(repo / ".git" / "index").st_mtime_ns
+    (repo / "README").write_text("HELLO\n")
+    os.utime(repo / "README", ns=(index_mtime, index_mtime))
+    assert index_dirty(repo) is True
+    assert git_dirty(repo)
+
+
+def test_nested_gitattributes_defers_to_git(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo", {"README": "hello\n", "sub/.gitattributes": "*.txt eol=crlf\n", "sub/a.txt": "a\n"})
+    # 中身は同じで stat だけ違うので hash で確かめる段になるが、入れ子の eol= で hash は当てにならない。
+    os.utime(repo / "sub" / "a.txt", ns=(1_000_000_000, 1_000_000_000))
+    assert index_dirty(repo) is None
+
+
+def test_scan_over_budget_defers_to_git(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    repo = make_repo(tmp_path / "repo", {f"f{i:02d}": f"{i}\n" for i in range(8)})
+    monkeypatch.setattr(tab_bar_git, "DIRTY_SCAN_BUDGET", -1.0)
+    monkeypatch.setattr(tab_bar_git, "DIRTY_SCAN_CHECK_EVERY", 1)
+    assert index_dirty(repo) is None
+    # 予算を戻しても、index が書き換わるまでは stat 比較をやり直さない。
+    monkeypatch.setattr(tab_bar_git, "DIRTY_SCAN_BUDGET", 10.0)
+    assert tab_bar_git.index_dirty(repo, repo / ".git") is None
+    (repo / "f00").write_text("changed\n")
+    git(repo, "commit", "-q", "-am", "change")
+    assert tab_bar_git.index_dirty(repo, repo / ".git") is False
+    (repo / "f01").write_text("changed\n")
+    assert tab_bar_git.index_dirty(repo, repo / ".git") is True
+
+
+def test_split_index(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo", {f"f{i:02d}": f"{i}\n" for i in range(20)})
+    git(repo, "update-index", "--split-index")
+    (repo / "f03").write_text("changed\n")
+    (repo / "f10").write_text("also changed\n")
+    (repo / "new").write_text("new\n")
+    git(repo, "add", "f03", "f10", "new")
+    git(repo, "rm", "-q", "--cached", "f05")
+    assert list((repo / ".git").glob("sharedindex.*"))
+
+    index = tab_bar_git.load_index(repo / ".git", 20)
+    expected = {}
+    for line in git(repo, "ls-files", "-s").splitlines():
+        info, name = line.split("\t")
+        expected[name] = info.split()[1]
+    assert {name: entry[5].hex() for name, entry in index.entries.items()} == expected
+    assert index_dirty(repo) in (None, git_dirty(repo))
+
+    git(repo, "add", "f05")
+    git(repo, "commit", "-q", "-m", "split")
+    assert not git_dirty(repo)
+    assert index_dirty(repo) is False
+
+
+def make_tracking_pair(tmp_path: Path, ahead: int, behind: int, message: str = "") -> Path:
+    """upstream より ahead 個進み、behind 個遅れた clone を作る。"""
+    origin = make_repo(tmp_path / "origin")
+    clone = tmp_path / "clone"
+    subprocess.run(["git", "clone", "-q", str(origin), str(clone)], check=True)
+    for i in range(behind):
+        (origin / "upstream.txt").write_text(f"{i}\n")
+        git(origin, "add", "upstream.txt")
+        git(origin, "commit", "-q", "-m", f"upstream {i}\n\n{message}")
+    for i in range(ahead):
+        (clone / "local.txt").write_text(f"{i}\n")
+        git(clone, "add", "local.txt")
+        git(clone, "commit", "-q", "-m", f"local {i}\n\n{message}")
+    git(clone, "fetch", "-q")
+    return clone
+
+
+@pytest.mark.parametrize("ahead,behind", [(0, 0), (3, 0), (0, 2), (4, 5)])
+def test_ahead_behind_loose_refs(tmp_path: Path, ahead: int, behind: int) -> None:
+    clone = make_tracking_pair(tmp_path, ahead, behind)
+    assert ahead_behind(clone) == git_ahead_behind(clone) == (ahead, behind)
+
+
+def test_ahead_behind_packed_refs(tmp_path: Path) -> None:
+    clone = make_tracking_pair(tmp_path, 2, 3)
+    git(clone, "pack-refs", "--all")
+    assert not (clone / ".git" / "refs" / "remotes" / "origin" / "main").exists()
+    assert "refs/remotes/origin/main" in (clone / ".git" / "packed-refs").read_text()
+    assert ahead_behind(clone) == git_ahead_behind(clone) == (2, 3)
+
+
+def _delta_objects(repo: Path, kind: str) -> list[str]:
+    """pack 内で delta 化されている kind の object。verify-pack -v の delta 行は深さと base の列が付く。"""
+    found = []
+    for idx in (repo / ".git" / "objects" / "pack").glob("*.idx"):
+        for line in git(repo, "verify-pack", "-v", str(idx)).splitlines():
+            fields = line.split()
+            if len(fields) == 7 and fields[1] == kind:
+                found.append(fields[0])
+    return found
+
+
+def _repack_without_graph(repo: Path) -> None:
+    git(repo, "-c", "gc.writeCommitGraph=false", "repack", "-adfq", "--window=50", "--depth=50")
+    git(repo, "prune-packed")
+    for graph in (repo / ".git" / "objects" / "info").glob("commit-graph*"):
+        if graph.is_dir():
+            shutil.rmtree(graph)
+        else:
+            graph.unlink()
+
+
+def test_deltified_pack_without_commit_graph(tmp_path: Path) -> None:
+    # 長く似たメッセージの commit は repack で delta 化される。commit-graph を作らず pack だけから読ませる。
+    clone = make_tracking_pair(tmp_path, 3, 4, message="shared body line\n" * 200)
+    _repack_without_graph(clone)
+    assert _delta_objects(clone, "commit")
+    assert ahead_behind(clone) == git_ahead_behind(clone) == (3, 4)
+    assert index_dirty(clone) == git_dirty(clone)
+
+
+def test_read_deltified_objects(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo", {"big.txt": "".join(f"line {i}\n" for i in range(2000))})
+    for step in range(3):
+        text = (repo / "big.txt").read_text().replace(f"line {step * 100}\n", f"edited {step}\n")
+        (repo / "big.txt").write_text(text)
+        git(repo, "commit", "-q", "-am", f"edit {step}\n\n" + "same message body\n" * 100)
+    _repack_without_graph(repo)
+    deltas = _delta_objects(repo, "blob") + _delta_objects(repo, "commit")
+    assert deltas
+    kinds = {"commit": 1, "tree": 2, "blob": 3, "tag": 4}
+    for oid in deltas:
+        kind = git(repo, "cat-file", "-t", oid).strip()
+        content = subprocess.run(["git", "-C", str(repo), "cat-file", kind, oid], check=True, capture_output=True).stdout
+        assert tab_bar_git.read_object_head(repo / ".git", oid, 20) == (kinds[kind], content[:4096])
+
+
+def test_unreadable_idx_does_not_hide_other_packs(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path / "repo")
+    _repack_without_graph(repo)
+    head = git(repo, "rev-parse", "HEAD").strip()
+    pack_dir = repo / ".git" / "objects" / "pack"
+    # 書きかけの idx を模す。正しい magic の後ろが切れているので fanout を読めない。
+    for name in ("pack-0000", "pack-ffff"):
+        (pack_dir / f"{name}.idx").write_bytes(b"\377tOc\0\0\0\2")
+    content = subprocess.run(["git", "-C", str(repo), "cat-file", "commit", head], check=True, capture_output=True).stdout
+    assert tab_bar_git.read_object_head(repo / ".git", head, 20) == (1, content[:4096])
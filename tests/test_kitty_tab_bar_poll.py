@@ -0,0 +1,120 @@
+"""描画の無い間に tab_bar.py が起きる間隔 (_poll_interval) と、監視イベントの取り込み。
+
+    python3 -m pytest tests/test_kitty_tab_bar_poll.py
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(time, name)
+
+
+class FakeWatcher:
+    def __init__(self) -> None:
+        self.events: list[set[str]] = []
+        self.polls = 0
+
+    def poll(self) -> set[str]:
+        self.polls += 1
+        return self.events.pop(0) if self.events else set()
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def polling(tab_bar: dict[str, Any]) -> tuple[dict[str, Any], FakeClock, FakeWatcher]:
+    clock = FakeClock()
+    watcher = FakeWatcher()
+    tab_bar["time"] = clock
+    tab_bar["watcher"] = watcher
+    tab_bar["watched_repos"]["/repo"] = 1
+    return tab_bar, clock, watcher
+
+
+def wake(tab_bar: dict[str, Any], clock: FakeClock) -> float:
+    """次に起きる時刻まで時計を進めて _drain_pending を呼び、待った秒数を返す。"""
+    interval = tab_bar["_poll_interval"]()
+    assert interval is not None
+    clock.now += interval
+    tab_bar["_drain_pending"]()
+    return interval
+
+
+def test_watch_poll_backs_off_while_idle(polling: tuple[dict[str, Any], FakeClock, FakeWatcher]) -> None:
+    tab_bar, clock, watcher = polling
+    tab_bar["_drain_pending"]()
+    waits = [wake(tab_bar, clock) for _ in range(7)]
+    assert waits == [2.0, 4.0, 8.0, 16.0, 16.0, 16.0, 16.0]
+    assert watcher.polls == 8
+
+
+def test_watch_event_resets_backoff(polling: tuple[dict[str, Any], FakeClock, FakeWatcher]) -> None:
+    tab_bar, clock, watcher = polling
+    tab_bar["_drain_pending"]()
+    for _ in range(4):
+        wake(tab_bar, clock)
+    assert tab_bar["_poll_interval"]() == 16.0
+    watcher.events.append({"/repo"})
+    wake(tab_bar, clock)
+    assert tab_bar["_poll_interval"]() == tab_bar["WATCH_POLL_INTERVAL"]
+
+
+def test_draw_between_polls_does_not_shorten_wait(polling: tuple[dict[str, Any], FakeClock, FakeWatcher]) -> None:
+    tab_bar, clock, watcher = polling
+    tab_bar["_drain_pending"]()
+    wake(tab_bar, clock)
+    # 描画で _drain_pending が呼ばれても、間隔が来るまでは監視イベントを読まない。
+    clock.now += 0.5
+    tab_bar["_drain_pending"]()
+    assert watcher.polls == 2
+    assert tab_bar["_poll_interval"]() == pytest.approx(3.5)
+
+
+def test_no_watch_poll_without_watched_repos(polling: tuple[dict[str, Any], FakeClock, FakeWatcher]) -> None:
+    tab_bar, _, _ = polling
+    tab_bar["watched_repos"].clear()
+    assert tab_bar["_poll_interval"]() is None
+
+
+def test_no_watch_poll_while_unfocused(polling: tuple[dict[str, Any], FakeClock, FakeWatcher]) -> None:
+    tab_bar, _, watcher = polling
+    tab_bar["current_focused_os_window_id"] = lambda: 0
+    tab_bar["focus_changed"](False)
+    assert tab_bar["app_focused"] is False
+    assert tab_bar["_poll_interval"]() is None
+    assert watcher.polls == 0
+
+
+def test_focus_catches_up_once(polling: tuple[dict[str, Any], FakeClock, FakeWatcher]) -> None:
+    tab_bar, clock, watcher = polling
+    tab_bar["_drain_pending"]()
+    for _ in range(4):
+        wake(tab_bar, clock)
+    tab_bar["current_focused_os_window_id"] = lambda: 0
+    tab_bar["focus_changed"](False)
+    polls = watcher.polls
+    clock.now += 0.5
+    watcher.events.append({"/repo"})
+    tab_bar["current_focused_os_window_id"] = lambda: 1
+    tab_bar["focus_changed"](True)
+    # 間隔を待たずに溜まっていたイベントを読み、最小間隔から監視を再開する。
+    assert watcher.polls == polls + 1
+    assert not watcher.events
+    assert tab_bar["_poll_interval"]() == tab_bar["WATCH_POLL_INTERVAL"]
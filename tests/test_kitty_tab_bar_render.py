@@ -0,0 +1,176 @@
+"""tab_bar.py の 1 フレームの描画 (中央タブのレイアウト・窓表示・run の書き出し)。
+
+kitty と同じく、全タブのレイアウトパスの後に実描画パスを draw_tab で回す。
+
+    python3 -m pytest tests/test_kitty_tab_bar_render.py
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock(tab_bar: dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> None:
+    # 分の境界をまたいでも layout が作り直されないよう、時計を止める。
+    monkeypatch.setattr(tab_bar["time"], "strftime", lambda fmt, *args: "12:00")
+
+
+def draw_frame(tab_bar: dict[str, Any], screen: Any, titles: list[str], active: int) -> list[int]:
+    """titles のタブを 1 フレーム描き、各タブの draw_tab が返した x を返す。"""
+    tabs = [tab_bar["TabBarData"](title, i == active, False, i + 1) for i, title in enumerate(titles)]
+    ends: list[int] = []
+    for for_layout in (True, False):
+        screen.cursor.x = 0
+        for index, tab in enumerate(tabs, 1):
+            end = tab_bar["draw_tab"](None, screen, tab, 0, 30, index, index == len(tabs), tab_bar["ExtraData"](for_layout))
+            if not for_layout:
+                ends.append(end)
+    return ends
+
+
+def cells_text(screen: Any, start: int, end: int) -> str:
+    """画面の start..end 列に描かれた文字列。"""
+    text = ""
+    x = 0
+    for ch in screen.line:
+        if start <= x < end:
+            text += ch
+        x += screen.width(ch)
+    return text
+
+
+@pytest.mark.parametrize("columns", [80, 160, 240])
+@pytest.mark.parametrize("count", [1, 5, 30])
+def test_frame_fills_the_line(tab_bar: dict[str, Any], columns: int, count: int) -> None:
+    screen = tab_bar["Screen"](columns)
+    titles = [f"title {i}" for i in range(count)]
+    ends = draw_frame(tab_bar, screen, titles, count // 2)
+    assert screen.width(screen.line) == columns
+    assert ends[-1] == columns
+    ranges = [tab_bar["center_tab_ranges"][index] for index in sorted(tab_bar["center_tab_ranges"])]
+    # 中央タブの範囲は重ならずに左から並ぶ。
+    assert all(start < end <= next_start for (start, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+
+def test_tabs_fit_with_full_names(tab_bar: dict[str, Any]) -> None:
+    screen = tab_bar["Screen"](200)
+    titles = ["alpha", "bravo", "charlie"]
+    draw_frame(tab_bar, screen, titles, 1)
+    ranges = tab_bar["center_tab_ranges"]
+    assert sorted(ranges) == [1, 2, 3]
+    for index, title in enumerate(titles, 1):
+        text = cells_text(screen, *ranges[index])
+        assert text.startswith(tab_bar["Cell"]("", None).border[0]) and title in text
+        assert all(other not in text for other in titles if other != title)
+    # 中央タブ群は画面の中央に寄せる。
+    assert abs((ranges[1][0] + ranges[3][1]) / 2 - 100) <= 2
+
+
+def test_names_are_abbreviated_before_dropped(tab_bar: dict[str, Any]) -> None:
+    screen = tab_bar["Screen"](100)
+    titles = [f"feature-branch-number-{i}" for i in range(6)]
+    draw_frame(tab_bar, screen, titles, 0)
+    assert "feature-branch-number-0" not in screen.line
+    assert "…" in screen.line
+    assert screen.width(screen.line) == 100
+
+
+def test_viewport_shows_hidden_tab_counts(tab_bar: dict[str, Any]) -> None:
+    screen = tab_bar["Screen"](80)
+    titles = [f"tab {i}" for i in range(200)]
+    draw_frame(tab_bar, screen, titles, 100)
+    left, right = tab_bar["OVERFLOW_LEFT"], tab_bar["OVERFLOW_RIGHT"]
+    hidden_left = int(screen.line.split(left)[1].split()[0])
+    hidden_right = int(screen.line.split(right)[0].split()[-1])
+    # 窓の外のタブは範囲を持たず、窓は隠れた数の間に連続して並ぶ。
+    visible = sorted(tab_bar["center_tab_ranges"])
+    assert visible == list(range(hidden_left + 1, len(titles) - hidden_right + 1))
+    assert visible[0] <= 101 <= visible[-1]
+    assert "tab 100" in cells_text(screen, *tab_bar["center_tab_ranges"][101])
+    assert screen.width(screen.line) == 80
+
+
+def test_layout_is_reused_until_something_changes(tab_bar: dict[str, Any]) -> None:
+    counters = tab_bar["stats"].counters
+    titles = ["alpha", "bravo"]
+    for _ in range(3):
+        draw_frame(tab_bar, tab_bar["Screen"](120), titles, 0)
+    assert counters.get("layout.computed") == 1
+    assert counters.get("layout.reused") == 2
+    draw_frame(tab_bar, tab_bar["Screen"](120), ["alpha", "bravo", "charlie"], 0)
+    assert counters.get("layout.computed") == 2
+
+
+def test_width_mismatch_is_realigned(tab_bar: dict[str, Any]) -> None:
+    class WideStarScreen(tab_bar["Screen"]):  # type: ignore[misc]
+        """"★" を tab_bar の見積もりより 1 桁広く描く端末。"""
+
+        def width(self, text: str) -> int:
+            return super().width(text) + text.count("★")
+
+    titles = ["alpha", "★ star", "charlie"]
+    narrow = tab_bar["Screen"](120)
+    draw_frame(tab_bar, narrow, titles, 0)
+    expected = dict(tab_bar["center_tab_ranges"])
+    wide = WideStarScreen(120)
+    draw_frame(tab_bar, wide, titles, 0)
+    ranges = dict(tab_bar["center_tab_ranges"])
+    assert tab_bar["stats"].counters.get("layout.realigned") == 1
+    # ★ を含むタブより後ろの境界は 1 桁ずれ、右端の chip は列揃えの空白を詰めて最終列に収める。
+    assert ranges[1] == expected[1]
+    assert ranges[2] == (expected[2][0], expected[2][1] + 1)
+    assert ranges[3] == (expected[3][0] + 1, expected[3][1] + 1)
+    assert "charlie" in cells_text(wide, *ranges[3])
+    assert wide.width(wide.line) == 120
+    assert wide.line.endswith(narrow.line[-10:])
+    # 合わせ直した run 列はこの layout の間使い回す。
+    again = WideStarScreen(120)
+    draw_frame(tab_bar, again, titles, 0)
+    assert again.line == wide.line
+    assert tab_bar["center_tab_ranges"] == ranges
+    assert tab_bar["stats"].counters.get("layout.realigned") == 1
+
+
+def test_render_list_merges_runs(tab_bar: dict[str, Any]) -> None:
+    out = tab_bar["RenderList"]()
+    out.put(1, 2, False, "ab")
+    out.put(1, 2, False, "cd")
+    # 空白だけの run は bg が同じなら fg / bold を問わず繋げる。
+    out.put(3, 2, True, "  ")
+    out.put(4, 2, True, "ef")
+    out.put(4, 5, True, "gh")
+    assert [run[:5] for run in out.runs] == [[1, 2, False, "abcd  ", 6], [4, 2, True, "ef", 8], [4, 5, True, "gh", 10]]
+    assert out.x == 10
+
+
+def test_render_list_exact_keeps_boundaries(tab_bar: dict[str, Any]) -> None:
+    out = tab_bar["RenderList"](exact=True)
+    out.put(1, 2, False, "ab")
+    start = out.mark()
+    out.put(1, 2, False, "cd")
+    end = out.mark()
+    out.pad_to(10)
+    out.put(1, 2, False, "ef")
+    assert (start, end) == (2, 4)
+    assert [run[3:] for run in out.runs] == [["ab", 2, False], ["cd", 4, False], ["      ", 10, True], ["ef", 12, False]]
+
+
+def test_align_runs_shrinks_padding(tab_bar: dict[str, Any]) -> None:
+    class WideScreen(tab_bar["Screen"]):  # type: ignore[misc]
+        def width(self, text: str) -> int:
+            return super().width(text) + text.count("★")
+
+    out = tab_bar["RenderList"](exact=True)
+    out.put(1, 2, False, "★")
+    boundary = out.mark()
+    out.pad_to(8)
+    out.put(1, 2, False, "end")
+    screen = WideScreen(11)
+    actual = tab_bar["_align_runs"](screen, out.runs)
+    assert actual[boundary] == 2
+    assert actual[8] == 8
+    assert screen.line == "★      end"
+    assert screen.cursor.x == 11
@@ -0,0 +1,154 @@
+"""tab_bar_text.py の文字幅・切り詰めと、中央タブ群のレイアウト計算。
+
+    python3 -m pytest tests/test_kitty_tab_bar_text.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+import tab_bar_text
+from tab_bar_text import FULL_SIZE, center_layout, clip_end, clip_middle, text_width, visible_window
+
+
+class FakeCell:
+    """tab_bar.py の Cell と同じ測り方をする LayoutCell。icon の後ろに " {text}" を描く。"""
+
+    def __init__(self, icon: str, text: str | None) -> None:
+        self.text = text
+        self.icon_length = text_width(icon)
+        self.text_length_overhead = self.icon_length + 1
+
+    def length(self, max_size: int) -> int:
+        if self.text is None:
+            return 0
+        clipped = clip_end(self.text, max_size - self.text_length_overhead)
+        return self.icon_length if not clipped else text_width(clipped) + self.text_length_overhead
+
+
+def layout_width(cells: list[FakeCell], sizes: list[int]) -> int:
+    widths = [cell.length(size) for cell, size in zip(cells, sizes) if size >= 0]
+    return sum(widths) + len(widths) - 1 if widths else 0
+
+
+@pytest.mark.parametrize(
+    ("text", "width"),
+    [("abc", 3), ("作業", 4), ("café", 4), ("é", 1), ("🇯🇵", 2), ("", 0)],
+)
+def test_text_width(text: str, width: int) -> None:
+    assert text_width(text) == width
+
+
+@pytest.mark.parametrize(
+    ("text", "size", "expected"),
+    [
+        ("feature", 10, "feature"),
+        ("feature", 7, "feature"),
+        ("feature", 5, "feat…"),
+        ("feature", 1, None),
+        ("feature", 0, None),
+        # 全角の途中で切らず、収まらない分は詰めずに狭く残す。
+        ("作業ブランチ", 6, "作業…"),
+        ("作業ブランチ", 5, "作業…"),
+        # ZWJ で繋がった絵文字は 1 つの書記素として扱い、途中で切らない。
+        ("👨‍👩‍👧 photos", text_width("👨‍👩‍👧") + 1, "👨‍👩‍👧…"),
+        ("👨‍👩‍👧 photos", text_width("👨‍👩‍👧"), None),
+        ("🇯🇵🇺🇸", 3, "🇯🇵…"),
+    ],
+)
+def test_clip_end(text: str, size: int, expected: str | None) -> None:
+    clipped = clip_end(text, size)
+    assert clipped == expected
+    if clipped is not None:
+        assert text_width(clipped) <= size
+
+
+@pytest.mark.parametrize(
+    ("text", "size", "expected"),
+    [
+        ("~/src/github.com/owner/repo", 40, "~/src/github.com/owner/repo"),
+        ("~/src/github.com/owner/repo", 11, "~/sr…/repo"),
+        ("~/src/github.com/owner/repo", 12, "~/sr…r/repo"),
+        ("abcdefghij", 3, "ab…"),
+        ("作業ディレクトリ", 10, "作…トリ"),
+    ],
+)
+def test_clip_middle(text: str, size: int, expected: str | None) -> None:
+    clipped = clip_middle(text, size)
+    assert clipped == expected
+    assert clipped is None or text_width(clipped) <= size
+
+
+def test_layout_full_names_when_they_fit() -> None:
+    cells = [FakeCell("1", "zsh"), FakeCell("2", "nvim")]
+    sizes, total = center_layout(cells, 40, 0, 6)
+    assert sizes == [FULL_SIZE, FULL_SIZE]
+    assert total == len("1 zsh 2 nvim")
+
+
+def test_layout_uniform_abbreviation() -> None:
+    cells = [FakeCell(str(i), f"branch-{i}-long-title") for i in range(4)]
+    sizes, total = center_layout(cells, 30, 0, 6)
+    assert len(set(sizes)) == 1
+    assert total == layout_width(cells, sizes) <= 30
+    # 一律にもう 1 桁増やすと入らない。
+    assert layout_width(cells, [size + 1 for size in sizes]) > 30
+    # 余裕があっても abbrev 桁より長くは残さない。
+    sizes, total = center_layout(cells, 60, 0, 6)
+    assert sizes == [cells[0].text_length_overhead + 6] * 4
+
+
+def test_layout_fair_keeps_short_names() -> None:
+    cells = [FakeCell("1", "zsh"), FakeCell("2", "a-very-long-branch-name"), FakeCell("3", "another-long-title")]
+    sizes, total = center_layout(cells, 30, 1, 6, "fair")
+    assert total == layout_width(cells, sizes) <= 30
+    assert cells[0].length(sizes[0]) == len("1 zsh")
+    # 余った幅はアクティブタブから配る。
+    assert cells[1].length(sizes[1]) >= cells[2].length(sizes[2])
+
+
+def test_layout_icons_only() -> None:
+    cells = [FakeCell(str(i), "title") for i in range(5)]
+    sizes, total = center_layout(cells, 10, 0, 6)
+    assert [cell.length(size) for cell, size in zip(cells, sizes)] == [1] * 5
+    assert total == 5 + 4
+
+
+@pytest.mark.parametrize("active", [0, 17, 49])
+def test_viewport_around_active_tab(active: int) -> None:
+    cells = [FakeCell(str(i), f"tab {i}") for i in range(50)]
+    sizes, total = center_layout(cells, 40, active, 6)
+    lo, hi = visible_window(sizes)
+    assert lo <= active <= hi
+    assert all(size >= 0 for size in sizes[lo : hi + 1])
+    assert all(size < 0 for size in sizes[:lo] + sizes[hi + 1 :])
+    assert total <= 40
+    assert total == layout_width(cells, sizes) + tab_bar_text._overflow_width(lo, len(cells) - 1 - hi)
+    # アクティブタブは名前を残せるなら残す。
+    assert sizes[active] > 0
+
+
+def test_viewport_fills_the_width() -> None:
+    cells = [FakeCell(str(i % 10), "x") for i in range(100)]
+    sizes, total = center_layout(cells, 30, 50, 6)
+    lo, hi = visible_window(sizes)
+    assert total <= 30
+    # どちらの隣のタブを足しても入らないところまで広げている。
+    base = layout_width(cells, sizes) + 2
+    assert base + tab_bar_text._overflow_width(lo - 1, len(cells) - 1 - hi) > 30
+    assert base + tab_bar_text._overflow_width(lo, len(cells) - 2 - hi) > 30
+
+
+def test_layout_always_fits_random() -> None:
+    rng = random.Random(7)
+    words = ["zsh", "nvim", "作業ブランチ整理", "#api-gateway", "👨‍👩‍👧 family", "infra/terraform"]
+    for _ in range(300):
+        cells = [FakeCell(str(i + 1), rng.choice(words)) for i in range(rng.randint(1, 60))]
+        max_width = rng.randint(10, 200)
+        active = rng.randrange(len(cells))
+        for mode in ("uniform", "fair"):
+            sizes, total = center_layout(cells, max_width, active, 6, mode)
+            lo, hi = visible_window(sizes)
+            assert lo <= active <= hi
+            assert total <= max_width or sizes[active] == 0 and lo == hi == active
@@ -0,0 +1,75 @@
+"""repo status を取る常駐 worker の入れ替え。
+
+    python3 -m pytest tests/test_kitty_tab_bar_workers.py
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def hanging(tab_bar: dict[str, Any]) -> Any:
+    """"/hang" の要求だけ release が set されるまで戻らない _worker に差し替える。"""
+    release = threading.Event()
+    done: list[str] = []
+
+    def worker(repo: Path, git_dir: Path, priority: int = 0) -> None:
+        if str(repo) == "/hang":
+            release.wait(10)
+        done.append(str(repo))
+
+    tab_bar["_worker"] = worker
+    tab_bar["IN_FLIGHT_DEADLINE"] = 0.05
+    tab_bar["tracked_keys"].update({"/hang", "/a", "/b", "/c"})
+    yield release, done
+    release.set()
+
+
+def submit(tab_bar: dict[str, Any], key: str) -> None:
+    tab_bar["work_queue"].put((0, -next(tab_bar["work_seq"]), key, Path(key), Path(key) / ".git"))
+
+
+def test_hung_worker_is_replaced(tab_bar: dict[str, Any], hanging: Any) -> None:
+    release, done = hanging
+    tab_bar["_ensure_workers"]()
+    submit(tab_bar, "/hang")
+    wait_for(lambda: bool(tab_bar["worker_started"]))
+    time.sleep(0.1)
+    tab_bar["_ensure_workers"]()
+    workers = tab_bar["workers"]
+    assert len(workers) == tab_bar["WORKER_COUNT"] + 1
+
+    for key in ("/a", "/b"):
+        submit(tab_bar, key)
+    wait_for(lambda: done == ["/a", "/b"] or done == ["/b", "/a"])
+
+    # 戻ってきた worker の分だけ減らし、常駐数を WORKER_COUNT に戻す。
+    release.set()
+    wait_for(lambda: "/hang" in done)
+    wait_for(lambda: len(workers) == tab_bar["WORKER_COUNT"])
+
+
+def test_spare_workers_are_capped(tab_bar: dict[str, Any], hanging: Any) -> None:
+    tab_bar["_ensure_workers"]()
+    limit = tab_bar["WORKER_COUNT"] + tab_bar["WORKER_SPARE_LIMIT"]
+    for _ in range(limit + 1):
+        submit(tab_bar, "/hang")
+    for count in range(1, limit + 1):
+        wait_for(lambda: len(tab_bar["worker_started"]) >= min(count, limit))
+        time.sleep(0.1)
+        tab_bar["_ensure_workers"]()
+    assert len(tab_bar["worker_started"]) == limit
+    assert len(tab_bar["workers"]) == limit